@@ -0,0 +1,130 @@
+# app/cli.py
+"""Library maintenance from the command line
+
+    python -m app.cli import books.csv --errors rejected.jsonl
+    python -m app.cli import books.jsonl --batch-size 10000
+    python -m app.cli export library.csv
+    python -m app.cli export - --format jsonl | gzip > library.jsonl.gz
+    python -m app.cli shelf-stats --check
+    python -m app.cli shelf-stats
+    python -m app.cli build-static
+
+Works on the book store at BOOKS_DB_PATH, also while the server runs.
+build-static writes the precompressed .gz / .br copies of static/ served
+to browsers that accept them; run it after changing a file there.
+Imported books are queued for Google Sheets when a sheet is configured;
+the server writes them on its next flush.
+"""
+import argparse
+import json
+import sys
+
+from app import config
+from app.services.book_store import BookStore
+from app.services.book_io import FORMATS, IMPORT_BATCH_SIZE, ImportFormatError, import_books, export_books, format_of
+from app.services.sheets_service import SheetsWAL, CREATE
+from utils.http_cache import precompress, brotli
+
+
+def import_command(args, store):
+    fmt = args.format or format_of(args.file)
+    if fmt is None:
+        sys.exit(f"Cannot tell the format of {args.file}; pass --format")
+    sheets_log = None
+    if config.GOOGLE_SHEETS_CREDENTIALS and config.GOOGLE_SHEET_ID:
+        sheets_log = SheetsWAL(config.SHEETS_WAL_PATH)
+    errors = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+
+    def save(books):
+        created = store.bulk_insert(books)
+        if sheets_log is not None:
+            sheets_log.append([(book.id, CREATE, book.model_dump(mode="json")) for book in created])
+
+    def report(error):
+        errors.write(json.dumps(error) + "\n")
+
+    try:
+        with open(args.file, "rb") as file:
+            result = import_books(file, fmt, save, batch_size=args.batch_size, on_error=report, max_errors=0)
+    except ImportFormatError as e:
+        sys.exit(str(e))
+    finally:
+        if errors is not sys.stderr:
+            errors.close()
+        if sheets_log is not None:
+            sheets_log.close()
+    print(f"Imported {result['imported']} books, rejected {result['rejected']} rows", file=sys.stderr)
+    return 1 if result["rejected"] else 0
+
+
+def export_command(args, store):
+    fmt = args.format or format_of(args.file, default="csv")
+    output = sys.stdout if args.file == "-" else open(args.file, "w", encoding="utf-8", newline="")
+    try:
+        for chunk in export_books(store.iter_books(batch_size=5000), fmt):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def shelf_stats_command(args, store):
+    drifted = store.rebuild_shelf_stats(check_only=args.check)
+    for shelf, counters in drifted.items():
+        for counter, (stored, recounted) in counters.items():
+            print(f"{shelf or '(no shelf)'}: {counter} was {stored}, recounted {recounted}", file=sys.stderr)
+    if not drifted:
+        print("Shelf statistics match the books", file=sys.stderr)
+    elif args.check:
+        print(f"{len(drifted)} shelves have drifted; run without --check to repair them", file=sys.stderr)
+    else:
+        print(f"Repaired the statistics of {len(drifted)} shelves", file=sys.stderr)
+    return 1 if drifted and args.check else 0
+
+
+def build_static_command(args, store):
+    written = precompress(args.directory)
+    for path in written:
+        print(path, file=sys.stderr)
+    print(f"Wrote {len(written)} compressed files"
+          + ("" if brotli is not None else " (gzip only: install brotli for .br)"), file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="add the books of a CSV or JSON Lines file")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=FORMATS, help="taken from the file extension by default")
+    importer.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows validated and committed together")
+    importer.add_argument("--errors", help="write rejected rows here as JSON Lines instead of to stderr")
+    importer.set_defaults(run=import_command)
+
+    exporter = commands.add_parser("export", help="write every book to a CSV or JSON Lines file")
+    exporter.add_argument("file", help="output file, - for stdout")
+    exporter.add_argument("--format", choices=FORMATS, help="taken from the file extension by default, else csv")
+    exporter.set_defaults(run=export_command)
+
+    stats = commands.add_parser("shelf-stats", help="recount the per-shelf statistics and repair any that drifted")
+    stats.add_argument("--check", action="store_true", help="only report differences; exit 1 if there are any")
+    stats.set_defaults(run=shelf_stats_command)
+
+    static = commands.add_parser("build-static", help="precompress the static files for HTTP_CACHING")
+    static.add_argument("directory", nargs="?", default="static")
+    static.set_defaults(run=build_static_command, store=False)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, "store", True):
+        return args.run(args, None)
+    store = BookStore(config.BOOKS_DB_PATH)
+    try:
+        return args.run(args, store)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
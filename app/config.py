@@ -0,0 +1,149 @@
+# app/config.py
+import os
+import time
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_language_sets(name: str, default: str):
+    """Parse language sets like "en;en,ja" into [("en",), ("en", "ja")]"""
+    raw = os.environ.get(name, default)
+    sets = []
+    for group in raw.split(";"):
+        languages = tuple(lang.strip() for lang in group.split(",") if lang.strip())
+        if languages:
+            sets.append(languages)
+    return sets
+
+
+def _env_cpu_list(name: str):
+    """Parse a CPU list like "0-3,6" into [0, 1, 2, 3, 6], or None when unset"""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return None
+    cpus = set()
+    for part in raw.split(","):
+        first, _, last = part.strip().partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+# Server (see run.py)
+WEB_ONLY = _env_bool("WEB_ONLY")  # serve the library without OCR or barcode scanning, importing neither
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 5000))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 0))  # worker processes, 0 = pick from WEB_ONLY and CPUs
+RELOAD = _env_bool("RELOAD")  # development only: restart on code changes, single process
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "info")
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")  # proxies trusted for X-Forwarded-*
+KEEP_ALIVE_TIMEOUT = int(os.environ.get("KEEP_ALIVE_TIMEOUT", 5))  # seconds
+# When the server was launched; run.py sets it once for all workers, so each
+# can tell jobs interrupted by a restart from jobs a sibling is running
+STARTED_AT = float(os.environ.get("BOOKKEEPER_STARTED_AT") or time.time())
+
+# OCR engine pool
+OCR_POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE", 1))  # warm readers per language set
+OCR_WARM_LANGUAGES = _env_language_sets("OCR_WARM_LANGUAGES", "en")  # loaded at startup
+OCR_DEFAULT_LANGUAGES = OCR_WARM_LANGUAGES[0] if OCR_WARM_LANGUAGES else ("en",)
+OCR_USE_GPU = _env_bool("OCR_USE_GPU")
+OCR_CHECKOUT_TIMEOUT = float(os.environ.get("OCR_CHECKOUT_TIMEOUT", 30))  # seconds
+OCR_READER_MEMORY_BUDGET_MB = int(os.environ.get("OCR_READER_MEMORY_BUDGET_MB", 4096))  # 0 = unlimited
+OCR_READER_MEMORY_ESTIMATE_MB = int(os.environ.get("OCR_READER_MEMORY_ESTIMATE_MB", 500))  # until measured
+OCR_AUTO_LANGUAGES = [lang.strip() for lang in os.environ.get("OCR_AUTO_LANGUAGES", "ja,ko,zh").split(",")
+                      if lang.strip()]  # candidates when target_language=auto and Latin text is unconvincing
+OCR_AUTO_MIN_CONFIDENCE = float(os.environ.get("OCR_AUTO_MIN_CONFIDENCE", 0.6))
+OCR_AUTO_SAMPLE_BOXES = int(os.environ.get("OCR_AUTO_SAMPLE_BOXES", 3))  # largest boxes read to classify the script
+OCR_PREPROCESS_PROFILE = os.environ.get("OCR_PREPROCESS_PROFILE", "standard")  # see utils/image_processing.py
+OCR_MIN_CONFIDENCE = float(os.environ["OCR_MIN_CONFIDENCE"]) if os.environ.get("OCR_MIN_CONFIDENCE") else None  # else the profile's
+OCR_FIELD_RULES_PATH = os.environ.get("OCR_FIELD_RULES_PATH") or None  # extra rules, see app/services/field_rules.json
+
+# OCR worker threads and admission control
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", OCR_POOL_SIZE))  # concurrent OCR jobs
+OCR_MAX_QUEUE = int(os.environ.get("OCR_MAX_QUEUE", 8))  # jobs allowed to wait for a worker
+OCR_RETRY_AFTER = int(os.environ.get("OCR_RETRY_AFTER", 5))  # seconds, sent when the queue is full
+OCR_REQUEST_TIMEOUT = float(os.environ.get("OCR_REQUEST_TIMEOUT", 60))  # seconds per request
+
+# OCR worker service (see ocr_worker.py); when OCR_WORKER_SOCKET is set the web
+# tier sends OCR there instead of loading readers itself
+OCR_WORKER_SOCKET = os.environ.get("OCR_WORKER_SOCKET") or None  # Unix socket path
+OCR_WORKER_PROCESSES = int(os.environ.get("OCR_WORKER_PROCESSES", 0))  # 0 = one per OCR_WORKER_THREADS cores
+OCR_WORKER_THREADS = int(os.environ.get("OCR_WORKER_THREADS", 0))  # torch threads per process, 0 = cores / processes
+OCR_WORKER_CPUS = _env_cpu_list("OCR_WORKER_CPUS")  # cores the workers are pinned to, e.g. "2-7"; default all
+
+# HTTP caching and compression (see utils/http_cache.py)
+HTTP_CACHING = _env_bool("HTTP_CACHING", True)  # ETags, compression, content-hashed static URLs
+HTTP_COMPRESS_MIN_BYTES = int(os.environ.get("HTTP_COMPRESS_MIN_BYTES", 500))  # smaller responses are sent as is
+HTTP_GZIP_LEVEL = int(os.environ.get("HTTP_GZIP_LEVEL", 6))  # 1-9, for responses compressed on the fly
+HTTP_BROTLI_QUALITY = int(os.environ.get("HTTP_BROTLI_QUALITY", 4))  # 0-11; static files are precompressed at 11
+
+# Local data (SQLite databases)
+DATA_DIR = os.environ.get("BOOKKEEPER_DATA_DIR", "data")
+
+# OCR result cache
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", 256))  # in-memory entries, 0 disables the cache
+OCR_CACHE_TTL = float(os.environ.get("OCR_CACHE_TTL", 7 * 24 * 3600))  # seconds
+OCR_CACHE_DISK = _env_bool("OCR_CACHE_DISK")  # also keep results in SQLite across restarts
+OCR_CACHE_PATH = os.environ.get("OCR_CACHE_PATH", os.path.join(DATA_DIR, "ocr_cache.sqlite3"))
+OCR_CACHE_PERCEPTUAL = _env_bool("OCR_CACHE_PERCEPTUAL")  # match near-duplicate photos too
+OCR_CACHE_MAX_DISTANCE = int(os.environ.get("OCR_CACHE_MAX_DISTANCE", 4))  # dHash bits
+
+# Batch OCR
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", 8))  # images per detector/recognizer pass
+OCR_BATCH_MAX_IMAGES = int(os.environ.get("OCR_BATCH_MAX_IMAGES", 500))  # per request
+OCR_BATCH_TIMEOUT = float(os.environ.get("OCR_BATCH_TIMEOUT", 1800))  # seconds per batch request
+
+# Image uploads (see utils/validators.py)
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 20 * 2**20))  # per image
+UPLOAD_MAX_PIXELS = int(os.environ.get("UPLOAD_MAX_PIXELS", 50_000_000))  # width x height, read from the header
+UPLOAD_REQUEST_MAX_BYTES = int(os.environ.get("UPLOAD_REQUEST_MAX_BYTES", 512 * 2**20))  # whole OCR/barcode request
+
+# Background OCR jobs (async mode)
+OCR_JOBS_PATH = os.environ.get("OCR_JOBS_PATH", os.path.join(DATA_DIR, "ocr_jobs.sqlite3"))
+OCR_JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", 1))  # jobs processed concurrently
+OCR_JOB_MAX_PENDING = int(os.environ.get("OCR_JOB_MAX_PENDING", 1000))
+OCR_JOB_RETENTION = float(os.environ.get("OCR_JOB_RETENTION", 24 * 3600))  # seconds to keep finished jobs
+
+# Offline capture queue of the upload page (see static/js/capture_queue.js)
+OCR_CAPTURE_MAX_EDGE = int(os.environ.get("OCR_CAPTURE_MAX_EDGE", 0))  # px the browser shrinks photos to, 0 = the profile's
+OCR_CAPTURE_JPEG_QUALITY = float(os.environ.get("OCR_CAPTURE_JPEG_QUALITY", 0.85))  # 0-1, for the re-encoded JPEG
+OCR_CAPTURE_SYNC_BATCH = int(os.environ.get("OCR_CAPTURE_SYNC_BATCH", 8))  # queued photos uploaded per request
+
+# Barcode scanning and ISBN metadata
+BARCODE_FAST_PATH = _env_bool("BARCODE_FAST_PATH", True)  # OCR uploads try an ISBN barcode first
+BARCODE_FAST_MAX_SIDE = int(os.environ.get("BARCODE_FAST_MAX_SIDE", 1024))  # first, downscaled decode pass
+BOOK_API_TIMEOUT = float(os.environ.get("BOOK_API_TIMEOUT", 5))  # seconds per catalogue request
+BOOK_API_TIMEOUTS = {  # per-provider overrides
+    name: float(os.environ[var])
+    for name, var in (("openlibrary", "OPEN_LIBRARY_TIMEOUT"), ("google", "GOOGLE_BOOKS_TIMEOUT"))
+    if os.environ.get(var)
+}
+BOOK_API_BREAKER_FAILURES = int(os.environ.get("BOOK_API_BREAKER_FAILURES", 5))  # consecutive, to open
+BOOK_API_BREAKER_RESET = float(os.environ.get("BOOK_API_BREAKER_RESET", 60))  # seconds before a retry
+ISBN_CACHE_PATH = os.environ.get("ISBN_CACHE_PATH", os.path.join(DATA_DIR, "isbn_cache.sqlite3"))
+ISBN_CACHE_TTL = float(os.environ.get("ISBN_CACHE_TTL", 30 * 24 * 3600))  # seconds, found books
+ISBN_NEGATIVE_TTL = float(os.environ.get("ISBN_NEGATIVE_TTL", 24 * 3600))  # seconds, unknown ISBNs
+
+# Google Sheets sync
+GOOGLE_SHEETS_CREDENTIALS = os.environ.get("GOOGLE_SHEETS_CREDENTIALS") or None  # service-account JSON file
+GOOGLE_SHEET_ID = os.environ.get("GOOGLE_SHEET_ID") or None  # spreadsheet key from its URL
+GOOGLE_SHEET_WORKSHEET = os.environ.get("GOOGLE_SHEET_WORKSHEET", "Books")
+GOOGLE_SHEETS_FAKE = _env_bool("GOOGLE_SHEETS_FAKE")  # sync into an in-memory sheet, for development
+SHEETS_WAL_PATH = os.environ.get("SHEETS_WAL_PATH", os.path.join(DATA_DIR, "sheets_wal.sqlite3"))
+SHEETS_FLUSH_INTERVAL = float(os.environ.get("SHEETS_FLUSH_INTERVAL", 30))  # seconds between batched writes
+SHEETS_REQUESTS_PER_MINUTE = float(os.environ.get("SHEETS_REQUESTS_PER_MINUTE", 50))  # quota is 60 per user
+SHEETS_MAX_RETRIES = int(os.environ.get("SHEETS_MAX_RETRIES", 5))  # per request, on 429 and 5xx
+SHEETS_BATCH_SIZE = int(os.environ.get("SHEETS_BATCH_SIZE", 1000))  # logged changes per flush
+
+# Book store
+BOOKS_DB_PATH = os.environ.get("BOOKS_DB_PATH", os.path.join(DATA_DIR, "books.sqlite3"))
+BOOKS_PAGE_SIZE = int(os.environ.get("BOOKS_PAGE_SIZE", 50))  # default page size of book listings
+BOOKS_MAX_PAGE_SIZE = int(os.environ.get("BOOKS_MAX_PAGE_SIZE", 500))
+BOOKS_BULK_MAX = int(os.environ.get("BOOKS_BULK_MAX", 50000))  # books per bulk insert request
+BOOKS_IMPORT_MAX_ERRORS = int(os.environ.get("BOOKS_IMPORT_MAX_ERRORS", 1000))  # row errors returned by an import
+BOOK_DUPLICATE_MIN_SCORE = float(os.environ.get("BOOK_DUPLICATE_MIN_SCORE", 0.8))  # 0-1, see app/services/dedup.py
@@ -3,37 +3,194 @@ from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 
-# Import routers
-from app.routes.ocr_routes import router as ocr_router
+from app import config
+from app.services.book_api_service import BookAPIService, ISBNCache, default_providers
+from app.services.book_store import BookStore
+from app.services.sheets_service import SheetsSync, SheetsWAL, GspreadBackend, FakeSheetsBackend
+from utils.validators import RequestSizeLimit
+from utils.http_cache import CachedStaticFiles, ConditionalGet, Compress, assets, static_url
+
+# Import routers; the OCR and barcode ones are imported in create_app unless WEB_ONLY
+from app.routes.health_routes import router as health_router
+from app.routes.metrics_routes import router as metrics_router
+from app.routes.book_routes import router as book_router
+from app.routes.shelf_routes import router as shelf_router
+
+def create_sheets_sync(book_store: BookStore):
+    """The Sheets sync engine, or None when no spreadsheet is configured"""
+    if config.GOOGLE_SHEETS_FAKE:
+        backend = FakeSheetsBackend()
+    elif config.GOOGLE_SHEETS_CREDENTIALS and config.GOOGLE_SHEET_ID:
+        backend = GspreadBackend(
+            config.GOOGLE_SHEETS_CREDENTIALS, config.GOOGLE_SHEET_ID, worksheet=config.GOOGLE_SHEET_WORKSHEET
+        )
+    else:
+        return None
+    return SheetsSync(
+        backend,
+        SheetsWAL(config.SHEETS_WAL_PATH),
+        requests_per_minute=config.SHEETS_REQUESTS_PER_MINUTE,
+        max_retries=config.SHEETS_MAX_RETRIES,
+        batch_size=config.SHEETS_BATCH_SIZE,
+        book_lookup=book_store.get
+    )
+
+async def start_ocr(app: FastAPI):
+    """Build the OCR engine pool, workers, cache, job queue and barcode scanner
+
+    Returns the background warm-up future. The OCR and CV modules are
+    imported here, so a WEB_ONLY process never loads them. With
+    OCR_WORKER_SOCKET set, the readers and the result cache live in the OCR
+    worker service (see ocr_worker.py) and this process only forwards to it.
+    """
+    from app.services.ocr_pool import OCREnginePool
+    from app.services.ocr_workers import OCRWorkerClient
+    from app.services.ocr_executor import OCRExecutor
+    from app.services.ocr_cache import OCRResultCache
+    from app.services.ocr_jobs import OCRJobStore, OCRJobQueue
+    from app.services.barcode_service import BarcodeService
+    
+    if config.OCR_WORKER_SOCKET:
+        ocr_pool = OCRWorkerClient(config.OCR_WORKER_SOCKET)
+    else:
+        ocr_pool = OCREnginePool(
+            size=config.OCR_POOL_SIZE,
+            gpu=config.OCR_USE_GPU,
+            warm_languages=config.OCR_WARM_LANGUAGES,
+            default_languages=config.OCR_DEFAULT_LANGUAGES,
+            profile=config.OCR_PREPROCESS_PROFILE,
+            memory_budget_mb=config.OCR_READER_MEMORY_BUDGET_MB,
+            reader_memory_estimate_mb=config.OCR_READER_MEMORY_ESTIMATE_MB
+        )
+    app.state.ocr_pool = ocr_pool
+    app.state.ocr_executor = OCRExecutor(
+        max_workers=config.OCR_WORKERS,
+        max_queue=config.OCR_MAX_QUEUE,
+        retry_after=config.OCR_RETRY_AFTER
+    )
+    app.state.ocr_cache = None
+    if config.OCR_CACHE_SIZE > 0 and not config.OCR_WORKER_SOCKET:
+        app.state.ocr_cache = OCRResultCache(
+            max_entries=config.OCR_CACHE_SIZE,
+            ttl=config.OCR_CACHE_TTL,
+            disk_path=config.OCR_CACHE_PATH if config.OCR_CACHE_DISK else None,
+            perceptual=config.OCR_CACHE_PERCEPTUAL,
+            max_distance=config.OCR_CACHE_MAX_DISTANCE
+        )
+    app.state.barcode_service = BarcodeService(fast_max_side=config.BARCODE_FAST_MAX_SIDE)
+    
+    app.state.ocr_jobs = OCRJobQueue(
+        OCRJobStore(config.OCR_JOBS_PATH), ocr_pool, app.state.ocr_executor, app.state.ocr_cache,
+        workers=config.OCR_JOB_WORKERS,
+        chunk_size=config.OCR_BATCH_SIZE,
+        max_pending=config.OCR_JOB_MAX_PENDING,
+        timeout=config.OCR_BATCH_TIMEOUT,
+        retention=config.OCR_JOB_RETENTION
+    )
+    # Purges expired jobs and picks up jobs left pending by the previous run
+    await app.state.ocr_jobs.start(interrupted_before=config.STARTED_AT)
+    
+    # Warm up in the background so liveness checks answer while models load;
+    # /health/ready reports 503 until this finishes
+    return asyncio.get_running_loop().run_in_executor(None, ocr_pool.warm_up)
+
+async def stop_ocr(app: FastAPI, warm_up):
+    await app.state.ocr_jobs.stop()
+    app.state.ocr_executor.shutdown()
+    if config.OCR_WORKER_SOCKET:
+        # Stop waiting for a worker service that never came up
+        app.state.ocr_pool.close()
+    await warm_up
+    app.state.ocr_jobs.store.close()
+    if app.state.ocr_cache is not None:
+        app.state.ocr_cache.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the stores and, unless WEB_ONLY, start the OCR engine pool and workers once per process"""
+    app.state.ocr_pool = app.state.ocr_executor = app.state.ocr_cache = app.state.ocr_jobs = None
+    app.state.barcode_service = None
+    app.state.book_api = BookAPIService(
+        providers=default_providers(
+            timeout=config.BOOK_API_TIMEOUT,
+            timeouts=config.BOOK_API_TIMEOUTS,
+            failure_threshold=config.BOOK_API_BREAKER_FAILURES,
+            reset_timeout=config.BOOK_API_BREAKER_RESET
+        ),
+        cache=ISBNCache(config.ISBN_CACHE_PATH, ttl=config.ISBN_CACHE_TTL, negative_ttl=config.ISBN_NEGATIVE_TTL)
+    )
+    app.state.book_api.cache.purge()
+    app.state.book_store = BookStore(config.BOOKS_DB_PATH)
+    app.state.sheets_sync = create_sheets_sync(app.state.book_store)
+    if app.state.sheets_sync is not None:
+        # Changes logged before a restart are flushed on the first tick
+        await app.state.sheets_sync.start(config.SHEETS_FLUSH_INTERVAL)
+    
+    warm_up = None if config.WEB_ONLY else await start_ocr(app)
+    try:
+        yield
+    finally:
+        if warm_up is not None:
+            await stop_ocr(app, warm_up)
+        app.state.book_api.close()
+        if app.state.sheets_sync is not None:
+            await app.state.sheets_sync.stop()
+            app.state.sheets_sync.wal.close()
+        app.state.book_store.close()
 
 def create_app():
     """Application factory pattern"""
     app = FastAPI(
         title="BookKeeper",
         description="Home library service",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
     
     # Setup logging
     logging.basicConfig(level=logging.INFO)
     
-    # Mount static files
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    # Mount static files; with HTTP_CACHING, under content-hashed URLs and precompressed
+    assets.hashed = config.HTTP_CACHING
+    if config.HTTP_CACHING:
+        app.mount("/static", CachedStaticFiles(directory="static", assets=assets), name="static")
+    else:
+        app.mount("/static", StaticFiles(directory="static"), name="static")
     
     # Setup templates
     templates = Jinja2Templates(directory="app/templates")
+    templates.env.globals["static_url"] = static_url
+    
+    # Oversized photo uploads are refused while they stream in, before the form is parsed
+    app.add_middleware(RequestSizeLimit, max_bytes=config.UPLOAD_REQUEST_MAX_BYTES, prefixes=("/ocr/", "/barcode/"))
+    
+    # Pages and API responses: ETag / 304, then brotli or gzip (the last added runs first)
+    if config.HTTP_CACHING:
+        app.add_middleware(ConditionalGet)
+        app.add_middleware(Compress, minimum_size=config.HTTP_COMPRESS_MIN_BYTES,
+                           gzip_level=config.HTTP_GZIP_LEVEL, brotli_quality=config.HTTP_BROTLI_QUALITY)
     
     # Include routers
-    app.include_router(ocr_router, prefix="/ocr", tags=["OCR"])
+    if not config.WEB_ONLY:
+        from app.routes.ocr_routes import router as ocr_router
+        from app.routes.barcode_routes import router as barcode_router
+        app.include_router(ocr_router, prefix="/ocr", tags=["OCR"])
+        app.include_router(barcode_router, prefix="/barcode", tags=["Barcode"])
+    app.include_router(book_router, prefix="/books", tags=["Books"])
+    app.include_router(shelf_router, prefix="/shelves", tags=["Shelves"])
+    app.include_router(health_router, prefix="/health", tags=["Health"])
+    app.include_router(metrics_router, prefix="/metrics", tags=["Health"])
     
     # Main routes
     @app.get("/", response_class=HTMLResponse)
     async def index(request: Request):
         """Home page with options to add books"""
-        return templates.TemplateResponse("index.html", {"request": request})
+        return templates.TemplateResponse("index.html", {"request": request, "ocr_enabled": not config.WEB_ONLY})
     
     @app.get("/add-book", response_class=HTMLResponse)
     async def add_book(request: Request):
@@ -47,12 +204,11 @@ def create_app():
 
     @app.exception_handler(500)
     async def internal_error_handler(request: Request, exc):
-        return templates.TemplateResponse("500.html", {"request": request}, status_code=500)
+        return HTMLResponse("<h1>500 - Internal Server Error</h1><a href='/'>← Back to BookKeeper</a>", status_code=500)
     
     return app
 
-# For development
+# For development; run.py is the launcher for production
 if __name__ == "__main__":
     import uvicorn
-    app = create_app()
-    uvicorn.run(app, host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:create_app", factory=True, host="0.0.0.0", port=5000, reload=True)
\ No newline at end of file
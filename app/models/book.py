@@ -1,6 +1,6 @@
 # app/models/book.py
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Literal, List
 from enum import Enum
 
 class ReadingStatus(str, Enum):
@@ -40,6 +40,7 @@ class BookBase(BaseModel):
     personal_rating: Optional[int] = Field(None, ge=1, le=5, description="Personal rating 1-5")
     tags: Optional[str] = Field(None, description="Comma-separated tags")
     remarks: Optional[str] = Field(None, description="Additional notes")
+    isbn: Optional[str] = Field(None, description="ISBN-13, when known")
 
 class BookCreate(BookBase):
     """Model for creating a new book"""
@@ -61,6 +62,15 @@ class BookUpdate(BaseModel):
     personal_rating: Optional[int] = Field(None, ge=1, le=5)
     tags: Optional[str] = None
     remarks: Optional[str] = None
+    isbn: Optional[str] = None
+
+    @field_validator("book_type", "reading_status", "fiction_type", "on_shelf")
+    @classmethod
+    def not_null(cls, value):
+        # Leave these out to keep the stored value; every book has one
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
 
 class Book(BookBase):
     """Complete book model with ID"""
@@ -68,12 +78,134 @@ class Book(BookBase):
     created_at: str = Field(..., description="Creation timestamp")
     updated_at: str = Field(..., description="Last update timestamp")
 
+class BookPage(BaseModel):
+    """One page of a book listing"""
+    items: List[Book] = []
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page; null on the last")
+
+class BookSearchHit(BaseModel):
+    """A search match and its relevance"""
+    score: float = Field(..., description="Relevance from 0 to 1; 1 = the query appears as written")
+    book: Book
+
+class BookSearchResult(BaseModel):
+    """Search matches, most relevant first"""
+    query: str
+    items: List[BookSearchHit] = []
+    elapsed_ms: float = 0.0
+
+class DuplicateMatch(BaseModel):
+    """A stored book that is probably the one being added"""
+    score: float = Field(..., description="Likelihood from 0 to 1; 1 = same ISBN or same title and author")
+    book: Book
+
+class DuplicateCheckResult(BaseModel):
+    """Likely duplicates of a book, most likely first"""
+    items: List[DuplicateMatch] = []
+
+class BulkInsertResult(BaseModel):
+    """Books created by one bulk insert"""
+    success: bool
+    inserted: int = 0
+    ids: List[str] = []
+    error: Optional[str] = None
+
+class ImportRowError(BaseModel):
+    """Why one row of an imported file was rejected"""
+    row: int = Field(..., description="Line of the file the row starts on")
+    errors: List[str] = []
+
+class ImportResult(BaseModel):
+    """Outcome of a file import; valid rows are stored even when others fail"""
+    success: bool
+    imported: int = 0
+    rejected: int = 0
+    errors: List[ImportRowError] = Field([], description="Rejected rows, the first BOOKS_IMPORT_MAX_ERRORS")
+    error: Optional[str] = None
+
 class OCRResult(BaseModel):
     """OCR processing result"""
     success: bool
     book_info: Optional[dict] = None
     raw_text: Optional[list] = None
     detected_language: Optional[str] = None
+    source: Optional[str] = Field(None, description='"barcode" when the ISBN barcode answered instead of OCR')
+    error: Optional[str] = None
+
+class BatchOCRItem(BaseModel):
+    """OCR result for one image of a batch"""
+    filename: str
+    result: OCRResult
+    elapsed_ms: float = Field(..., description="Processing time attributed to this image")
+
+class BatchOCRResult(BaseModel):
+    """Batch OCR processing result, one item per image in upload order"""
+    success: bool
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_ms: float = 0.0
+    items: List[BatchOCRItem] = []
+    error: Optional[str] = None
+
+class OCRJobStatus(BaseModel):
+    """Status of an asynchronous OCR job"""
+    job_id: str
+    status: Literal["pending", "running", "completed", "failed"]
+    total: int = Field(..., description="Number of images in the job")
+    completed: int = Field(0, description="Images processed so far")
+    created_at: float
+    updated_at: float
+    error: Optional[str] = None
+
+class OCRJobResult(BaseModel):
+    """Results of an asynchronous OCR job (finished images so far)"""
+    job_id: str
+    status: Literal["pending", "running", "completed", "failed"]
+    items: List[BatchOCRItem] = []
+    error: Optional[str] = None
+
+class CaptureStatus(BaseModel):
+    """A photo queued by the web client, known by the ID the client gave it"""
+    capture_id: str
+    status: Literal["unknown", "rejected", "pending", "running", "completed", "failed"] = Field(
+        ..., description="unknown: never received, so the client should upload it"
+    )
+    job_id: Optional[str] = None
+    result: Optional[OCRResult] = None
+    elapsed_ms: Optional[float] = None
+    error: Optional[str] = None
+
+class CaptureSyncResult(BaseModel):
+    """Outcome of a capture sync: one item per capture ID sent, in order"""
+    success: bool
+    accepted: int = Field(0, description="Captures queued for OCR by this request")
+    duplicates: int = Field(0, description="Captures the server already had; not processed again")
+    items: List[CaptureStatus] = []
+    error: Optional[str] = None
+
+class BarcodeResult(BaseModel):
+    """Barcode scan result, with catalogue metadata when the code is an ISBN"""
+    success: bool
+    isbn: Optional[str] = None
+    barcodes: List[dict] = []
+    book_info: Optional[dict] = None
+    attempts: int = Field(0, description="Decode passes: 1 = downscaled image, 2 = also full resolution")
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+class BatchBarcodeItem(BaseModel):
+    """Barcode scan result for one image of a batch"""
+    filename: str
+    result: BarcodeResult
+
+class BatchBarcodeResult(BaseModel):
+    """Batch barcode scan result, one item per image in upload order"""
+    success: bool
+    total: int = 0
+    found: int = 0
+    elapsed_ms: float = 0.0
+    items: List[BatchBarcodeItem] = []
     error: Optional[str] = None
 
 class APIResponse(BaseModel):
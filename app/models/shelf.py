@@ -0,0 +1,50 @@
+# app/models/shelf.py
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+
+class ShelfStats(BaseModel):
+    """Counts over the books on a shelf, kept current as books change"""
+    books: int = 0
+    on_shelf: int = Field(0, description="Books physically on the shelf")
+    lent_out: int = Field(0, description="Books away from the shelf (lent out, misplaced)")
+    rated: int = Field(0, description="Books with a personal rating")
+    average_rating: Optional[float] = Field(None, description="Mean personal rating of the rated books")
+    reading_status: Dict[str, int] = {}
+    book_type: Dict[str, int] = {}
+    fiction_type: Dict[str, int] = {}
+
+class ShelfBase(BaseModel):
+    """Base shelf model"""
+    name: str = Field(..., min_length=1, max_length=100, description="Shelf name, as stored in a book's shelf_number")
+    description: Optional[str] = Field(None, description="Where the shelf is, or what goes on it")
+
+class ShelfCreate(ShelfBase):
+    """Model for creating a new shelf"""
+    pass
+
+class ShelfUpdate(BaseModel):
+    """Model for renaming or describing a shelf; a new name moves its books with it"""
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    description: Optional[str] = None
+
+class Shelf(ShelfBase):
+    """Complete shelf model with its statistics"""
+    created_at: str = Field(..., description="Creation timestamp")
+    updated_at: str = Field(..., description="Last update timestamp")
+    stats: ShelfStats = ShelfStats()
+
+class ShelfList(BaseModel):
+    """Every shelf and the totals over the whole library"""
+    items: List[Shelf] = []
+    totals: ShelfStats = ShelfStats()
+    unshelved: ShelfStats = Field(ShelfStats(), description="Books without a shelf_number")
+
+class MoveBooksRequest(BaseModel):
+    """Books to put on a shelf"""
+    book_ids: List[str] = Field(..., min_length=1, max_length=10000)
+
+class MoveBooksResult(BaseModel):
+    """Outcome of moving books to a shelf"""
+    success: bool
+    moved: int = 0
+    missing: List[str] = Field([], description="IDs of books that do not exist")
@@ -0,0 +1,98 @@
+# app/routes/barcode_routes.py
+from fastapi import APIRouter, Request, File, UploadFile, HTTPException, Depends
+from starlette.concurrency import run_in_threadpool
+from typing import List
+import asyncio
+import time
+
+from app.config import OCR_BATCH_MAX_IMAGES
+from app.services.barcode_service import BarcodeService, BarcodeUnavailable
+from app.services.book_api_service import BookAPIService
+from app.models.book import BarcodeResult, BatchBarcodeItem, BatchBarcodeResult
+from app.routes.ocr_routes import read_image
+from utils.validators import UploadRejected
+
+router = APIRouter()
+
+def get_barcode_service(request: Request) -> BarcodeService:
+    return request.app.state.barcode_service
+
+def get_book_api(request: Request) -> BookAPIService:
+    return request.app.state.book_api
+
+async def lookup_isbns(book_api: BookAPIService, isbns) -> dict:
+    """Catalogue metadata for each distinct ISBN, looked up concurrently"""
+    isbns = sorted(set(isbn for isbn in isbns if isbn))
+    found = await asyncio.gather(*(book_api.lookup(isbn) for isbn in isbns))
+    return dict(zip(isbns, found))
+
+def scan_all(barcode_service: BarcodeService, images) -> list:
+    """Scan ``[(filename, bytes), ...]`` one after another on a single thread"""
+    return [barcode_service.scan(image) for _, image in images]
+
+@router.post("/api/scan", response_model=BarcodeResult)
+async def api_scan_barcode(
+    photo: UploadFile = File(..., description="Photo of the barcode"),
+    barcode_service: BarcodeService = Depends(get_barcode_service),
+    book_api: BookAPIService = Depends(get_book_api)
+):
+    """Decode an ISBN barcode and look the book up"""
+    
+    try:
+        image = await read_image(photo)
+    except UploadRejected as e:
+        return BarcodeResult(success=False, error=str(e))
+    
+    try:
+        result = await run_in_threadpool(barcode_service.scan, image)
+    except BarcodeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if result.get("isbn"):
+        result["book_info"] = (await lookup_isbns(book_api, [result["isbn"]]))[result["isbn"]]
+    return BarcodeResult(**result)
+
+@router.post("/api/scan-batch", response_model=BatchBarcodeResult)
+async def api_scan_barcodes(
+    photos: List[UploadFile] = File([], description="Photos of barcodes"),
+    barcode_service: BarcodeService = Depends(get_barcode_service),
+    book_api: BookAPIService = Depends(get_book_api)
+):
+    """Decode many barcodes in one request, e.g. a stack of books scanned in a row"""
+    
+    started = time.perf_counter()
+    if not photos:
+        return BatchBarcodeResult(success=False, error="No files uploaded")
+    if len(photos) > OCR_BATCH_MAX_IMAGES:
+        return BatchBarcodeResult(
+            success=False, error=f"Too many images, the limit is {OCR_BATCH_MAX_IMAGES} per request"
+        )
+    
+    images, results = [], {}
+    for position, photo in enumerate(photos):
+        try:
+            images.append((position, await read_image(photo)))
+        except UploadRejected as e:
+            results[position] = {"success": False, "error": str(e)}
+    
+    try:
+        scanned = await run_in_threadpool(scan_all, barcode_service, images)
+    except BarcodeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    results.update((position, result) for (position, _), result in zip(images, scanned))
+    
+    metadata = await lookup_isbns(book_api, [result.get("isbn") for result in results.values()])
+    items = []
+    for position, photo in enumerate(photos):
+        result = results[position]
+        if result.get("isbn"):
+            result["book_info"] = metadata.get(result["isbn"])
+        items.append(BatchBarcodeItem(filename=photo.filename or "", result=BarcodeResult(**result)))
+    
+    return BatchBarcodeResult(
+        success=True,
+        total=len(items),
+        found=sum(1 for item in items if item.result.isbn),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        items=items
+    )
@@ -0,0 +1,255 @@
+# app/routes/book_routes.py
+from fastapi import APIRouter, Request, Query, HTTPException, Depends, File, UploadFile, Form
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import List, Optional
+import time
+
+from app.config import (
+    BOOKS_PAGE_SIZE, BOOKS_MAX_PAGE_SIZE, BOOKS_BULK_MAX, BOOKS_IMPORT_MAX_ERRORS, BOOK_DUPLICATE_MIN_SCORE
+)
+from app.services.book_store import BookStore, InvalidCursor, SORT_KEYS
+from app.services.book_io import ImportFormatError, import_books, export_books, format_of
+from app.services.sheets_service import SheetsSync
+from app.models.book import (
+    Book, BookCreate, BookUpdate, BookPage, BookSearchHit, BookSearchResult, BulkInsertResult,
+    DuplicateMatch, DuplicateCheckResult, ImportResult,
+    ReadingStatus, BookType, APIResponse
+)
+from utils.http_cache import static_url
+
+router = APIRouter()
+templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["static_url"] = static_url
+
+def get_book_store(request: Request) -> BookStore:
+    return request.app.state.book_store
+
+def get_sheets_sync(request: Request) -> Optional[SheetsSync]:
+    return request.app.state.sheets_sync
+
+def save_books(book_store: BookStore, sheets_sync: Optional[SheetsSync], books) -> list:
+    """Store new books and queue them for the sheet. Blocking."""
+    created = book_store.bulk_insert(books)
+    if sheets_sync is not None:
+        sheets_sync.record_creates(created)
+    return created
+
+def save_update(book_store: BookStore, sheets_sync: Optional[SheetsSync], book_id, update: BookUpdate):
+    """Apply an update and queue it for the sheet; None if the book is unknown. Blocking."""
+    book = book_store.update(book_id, update)
+    if book is not None and sheets_sync is not None:
+        sheets_sync.record_update(book_id, update, updated_at=book.updated_at)
+    return book
+
+def save_delete(book_store: BookStore, sheets_sync: Optional[SheetsSync], book_id) -> bool:
+    """Delete a book and queue the removal of its row; False if it is unknown. Blocking."""
+    deleted = book_store.delete(book_id)
+    if deleted and sheets_sync is not None:
+        sheets_sync.record_delete(book_id)
+    return deleted
+
+async def list_books(book_store: BookStore, limit, cursor, sort, order, tag, **filters):
+    if sort not in SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_KEYS)}")
+    try:
+        return await run_in_threadpool(
+            book_store.page, limit=limit, cursor=cursor, sort=sort, descending=order == "desc", tag=tag, **filters
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/save")
+async def save_book_form(
+    request: Request,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Save the book confirmed on confirm_book.html"""
+    
+    form = await request.form()
+    # Blank inputs mean "not set", so the model defaults apply
+    fields = {name: value.strip() for name, value in form.items() if isinstance(value, str) and value.strip()}
+    try:
+        book = BookCreate(**fields)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid book details: {e.errors()[0]['msg']}")
+    
+    await run_in_threadpool(save_books, book_store, sheets_sync, [book])
+    return RedirectResponse("/books/library", status_code=303)
+
+@router.get("/library", response_class=HTMLResponse)
+async def library_page(
+    request: Request,
+    cursor: Optional[str] = None,
+    sort: str = "title",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    shelf_number: Optional[str] = None,
+    reading_status: Optional[ReadingStatus] = None,
+    tag: Optional[str] = None,
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Browse the library one page at a time"""
+    
+    books, next_cursor = await list_books(
+        book_store, BOOKS_PAGE_SIZE, cursor, sort, order, tag or None,
+        shelf_number=shelf_number or None, reading_status=reading_status
+    )
+    next_url = str(request.url.include_query_params(cursor=next_cursor)) if next_cursor else None
+    return templates.TemplateResponse("library.html", {
+        "request": request,
+        "books": books,
+        "next_url": next_url,
+        "filters": {"sort": sort, "order": order, "shelf_number": shelf_number or "",
+                    "reading_status": reading_status.value if reading_status else "", "tag": tag or ""},
+        "sort_keys": list(SORT_KEYS)
+    })
+
+@router.get("/api", response_model=BookPage)
+async def api_list_books(
+    limit: int = Query(BOOKS_PAGE_SIZE, ge=1, le=BOOKS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    sort: str = Query("title", description="title, author, created_at or updated_at"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    shelf_number: Optional[str] = None,
+    reading_status: Optional[ReadingStatus] = None,
+    book_type: Optional[BookType] = None,
+    author: Optional[str] = None,
+    isbn: Optional[str] = None,
+    on_shelf: Optional[bool] = None,
+    tag: Optional[str] = Query(None, description="Books carrying this tag (case-insensitive)"),
+    book_store: BookStore = Depends(get_book_store)
+):
+    """List books with keyset pagination: follow next_cursor until it is null"""
+    
+    books, next_cursor = await list_books(
+        book_store, limit, cursor, sort, order, tag,
+        shelf_number=shelf_number, reading_status=reading_status, book_type=book_type,
+        author=author, isbn=isbn, on_shelf=on_shelf
+    )
+    return BookPage(items=books, next_cursor=next_cursor)
+
+@router.post("/api", response_model=Book, status_code=201)
+async def api_create_book(
+    book: BookCreate,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Add one book"""
+    return (await run_in_threadpool(save_books, book_store, sheets_sync, [book]))[0]
+
+@router.post("/api/bulk", response_model=BulkInsertResult)
+async def api_bulk_insert(
+    books: List[BookCreate],
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Add many books in one transaction: either all are stored or none"""
+    
+    if len(books) > BOOKS_BULK_MAX:
+        return BulkInsertResult(success=False, error=f"Too many books, the limit is {BOOKS_BULK_MAX} per request")
+    
+    created = await run_in_threadpool(save_books, book_store, sheets_sync, books)
+    return BulkInsertResult(success=True, inserted=len(created), ids=[book.id for book in created])
+
+@router.post("/api/import", response_model=ImportResult)
+async def api_import_books(
+    file: UploadFile = File(..., description="CSV with a header row, or JSON Lines (one book object per line)"),
+    format: Optional[str] = Form(None, pattern="^(csv|jsonl)$", description="Taken from the file name when omitted"),
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Add every valid row of a file; rejected rows are reported by line with their errors"""
+    
+    fmt = format or format_of(file.filename)
+    if fmt is None:
+        return ImportResult(success=False, error="Unknown file type: name it .csv or .jsonl, or pass format")
+    
+    # The upload is spooled to disk; rows are read and stored a batch at a time
+    try:
+        result = await run_in_threadpool(
+            import_books, file.file, fmt, lambda books: save_books(book_store, sheets_sync, books),
+            max_errors=BOOKS_IMPORT_MAX_ERRORS
+        )
+    except ImportFormatError as e:
+        return ImportResult(success=False, error=str(e))
+    return ImportResult(success=True, **result)
+
+@router.get("/api/export")
+async def api_export_books(
+    format: str = Query("csv", pattern="^(csv|jsonl)$"),
+    shelf_number: Optional[str] = None,
+    reading_status: Optional[ReadingStatus] = None,
+    tag: Optional[str] = None,
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Download the library (or the books matching the filters) as CSV or JSON Lines, streamed"""
+    
+    books = book_store.iter_books(tag=tag, shelf_number=shelf_number, reading_status=reading_status)
+    return StreamingResponse(
+        export_books(books, format),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="library.{format}"'}
+    )
+
+@router.get("/api/search", response_model=BookSearchResult)
+async def api_search_books(
+    q: str = Query(..., min_length=1, description="Words from the title, author, translator, publisher, tags or remarks"),
+    limit: int = Query(20, ge=1, le=100),
+    min_score: float = Query(0.3, ge=0, le=1, description="Drop matches less relevant than this"),
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Typo-tolerant search, e.g. q=Harry Pottcr still finds Harry Potter"""
+    
+    started = time.perf_counter()
+    hits = await run_in_threadpool(book_store.search, q, limit=limit, min_score=min_score)
+    return BookSearchResult(
+        query=q,
+        items=[BookSearchHit(score=score, book=book) for score, book in hits],
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+    )
+
+@router.post("/api/duplicates", response_model=DuplicateCheckResult)
+async def api_find_duplicates(
+    book: BookCreate,
+    limit: int = Query(5, ge=1, le=50),
+    min_score: float = Query(BOOK_DUPLICATE_MIN_SCORE, ge=0, le=1),
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Stored books that are probably this one: same ISBN, or a near-identical title and author"""
+    
+    matches = await run_in_threadpool(book_store.find_duplicates, book, limit=limit, min_score=min_score)
+    return DuplicateCheckResult(items=[DuplicateMatch(score=score, book=match) for score, match in matches])
+
+@router.get("/api/{book_id}", response_model=Book)
+async def api_get_book(book_id: str, book_store: BookStore = Depends(get_book_store)):
+    book = await run_in_threadpool(book_store.get, book_id)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book
+
+@router.patch("/api/{book_id}", response_model=Book)
+async def api_update_book(
+    book_id: str,
+    update: BookUpdate,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Change the fields present in the request body"""
+    
+    book = await run_in_threadpool(save_update, book_store, sheets_sync, book_id, update)
+    if book is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book
+
+@router.delete("/api/{book_id}", response_model=APIResponse)
+async def api_delete_book(
+    book_id: str,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    if not await run_in_threadpool(save_delete, book_store, sheets_sync, book_id):
+        raise HTTPException(status_code=404, detail="Book not found")
+    return APIResponse(success=True, message="Book deleted")
@@ -0,0 +1,25 @@
+# app/routes/health_routes.py
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """Healthy only once the OCR engine pool has finished warming up (at once when WEB_ONLY)"""
+    ocr_pool = request.app.state.ocr_pool
+    if ocr_pool is None:
+        return {"status": "ready", "ocr": None}
+    stats = ocr_pool.stats()
+    stats["executor"] = request.app.state.ocr_executor.stats()
+    ocr_cache = request.app.state.ocr_cache
+    stats["cache"] = ocr_cache.stats() if ocr_cache is not None else None
+    if ocr_pool.ready:
+        return {"status": "ready", "ocr": stats}
+    status = "failed" if ocr_pool.warm_up_error else "warming_up"
+    return JSONResponse({"status": status, "ocr": stats}, status_code=503)
@@ -0,0 +1,112 @@
+# app/routes/metrics_routes.py
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.services.metrics import REGISTRY, gauge_family
+
+router = APIRouter()
+
+# Starlette appends "; charset=utf-8"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+def pool_metrics(ocr_pool) -> list:
+    """Reader pool utilisation, one series per language set"""
+    stats = ocr_pool.stats()
+    pools = [({"languages": "+".join(pool["languages"])}, pool) for pool in stats["pools"]]
+    
+    def family(name, documentation, key, kind="gauge"):
+        return gauge_family(name, documentation, [(labels, pool[key]) for labels, pool in pools], kind)
+    
+    return [
+        *gauge_family("bookkeeper_ocr_pool_ready", "1 once the warm reader sets are loaded",
+                      [({}, int(stats["ready"]))]),
+        *gauge_family("bookkeeper_ocr_pool_evictions_total", "Reader sets unloaded to stay within the memory budget",
+                      [({}, stats["evictions"])], "counter"),
+        *family("bookkeeper_ocr_pool_size", "Readers per language set", "size"),
+        *family("bookkeeper_ocr_pool_loaded", "Readers loaded", "loaded"),
+        *family("bookkeeper_ocr_pool_in_use", "Readers checked out", "in_use"),
+        *family("bookkeeper_ocr_pool_waiting", "Callers waiting for a reader", "queue_depth"),
+        *family("bookkeeper_ocr_pool_memory_megabytes", "Estimated reader memory", "memory_mb"),
+        *family("bookkeeper_ocr_pool_checkouts_total", "Reader checkouts", "checkouts", "counter"),
+        *family("bookkeeper_ocr_pool_timeouts_total", "Checkouts that timed out", "timeouts", "counter"),
+        *family("bookkeeper_ocr_pool_wait_seconds_total", "Time spent waiting for a reader",
+                "wait_seconds_total", "counter"),
+    ]
+
+def executor_metrics(ocr_executor) -> list:
+    stats = ocr_executor.stats()
+    return [
+        *gauge_family("bookkeeper_ocr_executor_workers", "OCR worker threads", [({}, stats["max_workers"])]),
+        *gauge_family("bookkeeper_ocr_executor_in_flight", "OCR jobs admitted and not yet finished",
+                      [({}, stats["in_flight"])]),
+        *gauge_family("bookkeeper_ocr_executor_finished_abnormally_total", "OCR jobs refused or abandoned",
+                      [({"reason": reason}, stats[reason]) for reason in ("rejected", "timeouts", "cancelled")],
+                      "counter"),
+    ]
+
+def cache_metrics(ocr_cache) -> list:
+    stats = ocr_cache.stats()
+    return [
+        *gauge_family("bookkeeper_ocr_cache_lookups_total", "OCR result cache lookups by outcome",
+                      [({"result": key}, stats[key]) for key in ("hits", "near_hits", "disk_hits", "misses")],
+                      "counter"),
+        *gauge_family("bookkeeper_ocr_cache_entries", "Results held in memory", [({}, stats["memory_entries"])]),
+    ]
+
+def job_metrics(ocr_jobs) -> list:
+    stats = ocr_jobs.stats()
+    return [
+        *gauge_family("bookkeeper_ocr_jobs_queued", "Background OCR jobs waiting for a worker", [({}, stats["queued"])]),
+        *gauge_family("bookkeeper_ocr_jobs_subscribers", "Jobs with open event streams",
+                      [({}, stats["subscribers"])]),
+    ]
+
+def book_api_metrics(book_api) -> list:
+    stats = book_api.stats()
+    providers = stats["providers"]
+    return [
+        *gauge_family("bookkeeper_isbn_lookups_total", "ISBN metadata lookups by how they were answered",
+                      [({"result": key}, stats[key])
+                       for key in ("cache_hits", "coalesced", "found", "not_found", "unavailable")], "counter"),
+        *gauge_family("bookkeeper_isbn_provider_requests_total", "Requests sent to each catalogue",
+                      [({"provider": name}, p["requests"]) for name, p in providers.items()], "counter"),
+        *gauge_family("bookkeeper_isbn_provider_failures_total", "Failed or timed-out catalogue requests",
+                      [({"provider": name}, p["failures"]) for name, p in providers.items()], "counter"),
+        *gauge_family("bookkeeper_isbn_provider_circuit_open", "1 while a catalogue's circuit breaker is open",
+                      [({"provider": name}, int(p["circuit"] == "open")) for name, p in providers.items()]),
+    ]
+
+def sheets_metrics(sheets_sync) -> list:
+    stats = sheets_sync.stats()
+    return [
+        *gauge_family("bookkeeper_sheets_pending_changes", "Book changes logged and not yet in the sheet",
+                      [({}, stats["pending"])]),
+        *gauge_family("bookkeeper_sheets_requests_total", "Sheets API requests, including retries",
+                      [({}, stats["requests"])], "counter"),
+        *gauge_family("bookkeeper_sheets_retries_total", "Sheets API requests retried after 429 or 5xx",
+                      [({}, stats["retries"])], "counter"),
+        *gauge_family("bookkeeper_sheets_failed_flushes_total", "Flushes that gave up, leaving changes logged",
+                      [({}, stats["failures"])], "counter"),
+        *gauge_family("bookkeeper_sheets_cells_written_total", "Cells rewritten in existing rows",
+                      [({}, stats["cells_written"])], "counter"),
+        *gauge_family("bookkeeper_sheets_rows_appended_total", "Rows appended", [({}, stats["rows_appended"])],
+                      "counter"),
+        *gauge_family("bookkeeper_sheets_rows_deleted_total", "Rows removed for deleted books",
+                      [({}, stats["rows_deleted"])], "counter"),
+    ]
+
+@router.get("", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint"""
+    state = request.app.state
+    lines = REGISTRY.render()
+    if state.ocr_pool is not None:
+        lines += pool_metrics(state.ocr_pool)
+        lines += executor_metrics(state.ocr_executor)
+        lines += job_metrics(state.ocr_jobs)
+    if state.ocr_cache is not None:
+        lines += cache_metrics(state.ocr_cache)
+    lines += book_api_metrics(state.book_api)
+    if state.sheets_sync is not None:
+        lines += sheets_metrics(state.sheets_sync)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
@@ -1,39 +1,244 @@
 # app/routes/ocr_routes.py
-from fastapi import APIRouter, Request, File, UploadFile, Form, HTTPException, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Request, Response, File, UploadFile, Form, Query, HTTPException, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from app.services.ocr_service import OCRService
-from app.models.book import OCRResult, BookCreate
-import uuid
-import os
-import aiofiles
-from typing import Optional
+from app.config import (
+    OCR_REQUEST_TIMEOUT, OCR_BATCH_MAX_IMAGES, OCR_BATCH_TIMEOUT, BARCODE_FAST_PATH, BOOK_DUPLICATE_MIN_SCORE,
+    UPLOAD_MAX_BYTES, UPLOAD_MAX_PIXELS, OCR_PREPROCESS_PROFILE, OCR_CAPTURE_MAX_EDGE, OCR_CAPTURE_JPEG_QUALITY,
+    OCR_CAPTURE_SYNC_BATCH, OCR_JOB_RETENTION
+)
+from app.services.ocr_pool import OCREnginePool, PoolTimeout
+from app.services.ocr_executor import OCRExecutor, OCRQueueFull, OCRTimeout
+from app.services.ocr_service import OCRCancelled
+from app.services.ocr_cache import OCRResultCache
+from app.services.metrics import StageTimer, OCR_RESULTS
+from app.services import ocr_runner
+from app.services.ocr_jobs import OCRJobQueue, JobQueueFull, COMPLETED, FAILED
+from app.models.book import (
+    OCRResult, BatchOCRItem, BatchOCRResult, OCRJobStatus, OCRJobResult, CaptureStatus, CaptureSyncResult, BookCreate
+)
+from utils.image_processing import get_profile
+from utils.validators import UploadRejected, allowed_file, check_image, check_size, read_image_upload
+from utils.http_cache import static_url
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import asyncio
+import json
+import re
+import time
+import zipfile
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["static_url"] = static_url
 
-# Dependency injection for OCR service
-def get_ocr_service() -> OCRService:
-    return OCRService()
+# Dependency injection for the process-wide OCR engine pool (built in the app lifespan)
+def get_ocr_pool(request: Request) -> OCREnginePool:
+    return request.app.state.ocr_pool
 
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "tiff", "webp"}
-UPLOAD_FOLDER = "static/uploads"
+def get_ocr_executor(request: Request) -> OCRExecutor:
+    return request.app.state.ocr_executor
 
-def allowed_file(filename: str) -> bool:
-    """Check if file extension is allowed"""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+def get_ocr_cache(request: Request) -> Optional[OCRResultCache]:
+    return request.app.state.ocr_cache
+
+def get_ocr_jobs(request: Request) -> OCRJobQueue:
+    return request.app.state.ocr_jobs
+
+# Requests sent with this header get their OCR stage times back as Server-Timing
+TRACE_HEADER = "X-OCR-Trace"
+
+def trace_timer(request: Request) -> Optional[StageTimer]:
+    if request.headers.get(TRACE_HEADER, "").lower() in ("1", "true", "yes", "on"):
+        return StageTimer()
+    return None
+
+def trace_headers(timer: Optional[StageTimer]) -> dict:
+    if timer is None or not timer.stages:
+        return {}
+    return {"Server-Timing": timer.server_timing()}
+
+async def run_ocr(request: Request, ocr_pool: OCREnginePool, ocr_executor: OCRExecutor,
+                  image, target_language=None, ocr_cache: Optional[OCRResultCache] = None,
+                  timer: Optional[StageTimer] = None):
+    """Process a book cover on the OCR worker threads, keeping the event loop free
+
+    Results are looked up in ``ocr_cache`` by image content first, so a
+    re-uploaded cover skips preprocessing, detection and recognition.
+    """
+    return await ocr_executor.submit(
+        ocr_runner.run_cover, ocr_pool, ocr_cache, image, target_language,
+        timeout=OCR_REQUEST_TIMEOUT, request=request, timer=timer
+    )
+
+async def run_batch_ocr(request: Request, ocr_pool: OCREnginePool, ocr_executor: OCRExecutor,
+                        images, target_language=None, ocr_cache: Optional[OCRResultCache] = None,
+                        timer: Optional[StageTimer] = None):
+    """Process ``[(filename, image), ...]`` as one job on a single warm reader"""
+    return await ocr_executor.submit(
+        ocr_runner.run_covers, ocr_pool, ocr_cache, images, target_language,
+        timeout=OCR_BATCH_TIMEOUT, request=request, timer=timer
+    )
+
+async def barcode_fast_path(request: Request, image):
+    """Try the ISBN barcode before OCR: ``(result or None, isbn or None, image)``
+
+    One downscaled zbar pass costs milliseconds against seconds of EasyOCR.
+    When it finds an ISBN that a catalogue knows, that metadata is the
+    result; otherwise the decoded image is handed back for OCR to reuse.
+    """
+    barcode_service = request.app.state.barcode_service
+    if not BARCODE_FAST_PATH or not barcode_service.available:
+        return None, None, image
+    try:
+        isbn, image = await run_in_threadpool(barcode_service.find_isbn, image)
+    except ValueError:
+        # Undecodable upload; the OCR path reports it
+        return None, None, image
+    if isbn is None:
+        return None, None, image
+    
+    book_info = await request.app.state.book_api.lookup(isbn)
+    if book_info is None:
+        return None, isbn, image
+    OCR_RESULTS.inc(outcome="barcode")
+    return {
+        "success": True,
+        "book_info": book_info,
+        "raw_text": [],
+        "detected_language": book_info["language"] or None,
+        "source": "barcode"
+    }, isbn, image
+
+def with_isbn(result: dict, isbn) -> dict:
+    """Add a barcode's ISBN to an OCR result (a copy: results may be shared by the cache)"""
+    if not isbn or not result.get("success"):
+        return result
+    return {**result, "book_info": {**result["book_info"], "isbn": isbn}}
+
+async def submit_ocr_job(ocr_jobs: OCRJobQueue, images, target_language=None, rejected=()):
+    """Queue images for background OCR and answer 202 with the job's URLs"""
+    try:
+        job_id = await ocr_jobs.submit(images, target_language)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    return JSONResponse({
+        "success": True,
+        "job_id": job_id,
+        "status": "pending",
+        "status_url": f"/ocr/api/jobs/{job_id}",
+        "result_url": f"/ocr/api/jobs/{job_id}/result",
+        "events_url": f"/ocr/api/jobs/{job_id}/events",
+        "rejected": [{"filename": filename, "error": error} for _, filename, error in rejected]
+    }, status_code=202)
+
+def job_item(item: dict) -> BatchOCRItem:
+    return BatchOCRItem(
+        filename=item["filename"], result=OCRResult(**item["result"]), elapsed_ms=item["elapsed_ms"] or 0.0
+    )
+
+def read_zip_images(archive, max_images: int, start: int = 0):
+    """Read allowed image files out of an uploaded zip archive: ``(images, rejected)``
+
+    Entries are checked like uploads; oversized ones are refused from their
+    declared size without being inflated. Rejected entries are
+    ``(position, name, error)``, counting positions from ``start`` over the
+    archive's images in order.
+    """
+    images, rejected = [], []
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not allowed_file(name):
+                continue
+            if len(images) >= max_images:
+                raise ValueError(f"Too many images, the limit is {max_images} per request")
+            try:
+                check_size(info.file_size, UPLOAD_MAX_BYTES)
+                data = zf.read(info)
+                check_image(data, max_pixels=UPLOAD_MAX_PIXELS)
+            except UploadRejected as e:
+                rejected.append((start + len(images) + len(rejected), name, str(e)))
+                continue
+            images.append((name, data))
+    return images, rejected
+
+def ocr_http_error(e: Exception) -> HTTPException:
+    """Map OCR backpressure, timeout and cancellation errors onto HTTP errors"""
+    if isinstance(e, OCRQueueFull):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if isinstance(e, PoolTimeout):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    if isinstance(e, OCRTimeout):
+        return HTTPException(status_code=504, detail=str(e))
+    if isinstance(e, OCRCancelled):
+        # Client has gone away; nobody will read this response
+        return HTTPException(status_code=499, detail=str(e))
+    return HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+OCR_HTTP_ERRORS = (OCRQueueFull, PoolTimeout, OCRTimeout, OCRCancelled)
+
+# IDs the web client gives queued captures (crypto.randomUUID() or similar)
+CAPTURE_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def capture_settings() -> dict:
+    """How upload_photo.html shrinks photos before sending them
+
+    By default the long edge of the preprocessing profile: the server would
+    scale a larger photo down to it anyway. 0 (the legacy profile) keeps the
+    camera's resolution and only re-encodes.
+    """
+    return {
+        "max_edge": OCR_CAPTURE_MAX_EDGE or get_profile(OCR_PREPROCESS_PROFILE).max_long_edge or 0,
+        "quality": OCR_CAPTURE_JPEG_QUALITY,
+        "batch": max(1, min(OCR_CAPTURE_SYNC_BATCH, OCR_BATCH_MAX_IMAGES)),
+        "retention_ms": int(OCR_JOB_RETENTION * 1000),  # the server forgets capture IDs after this
+    }
+
+def capture_status(capture_id, stored: Optional[dict]) -> CaptureStatus:
+    if stored is None:
+        return CaptureStatus(capture_id=capture_id, status="unknown")
+    return CaptureStatus(
+        capture_id=capture_id,
+        status=stored["status"],
+        job_id=stored["job_id"],
+        result=OCRResult(**stored["result"]) if stored["result"] else None,
+        elapsed_ms=stored["elapsed_ms"],
+        error=stored["error"]
+    )
+
+async def read_image(photo: UploadFile) -> bytes:
+    """The upload's bytes, once its size, type and dimensions pass (see utils/validators.py)"""
+    return await read_image_upload(photo, UPLOAD_MAX_BYTES, UPLOAD_MAX_PIXELS)
 
 @router.get("/upload-photo", response_class=HTMLResponse)
 async def upload_photo_page(request: Request):
     """Display photo upload page"""
-    return templates.TemplateResponse("upload_photo.html", {"request": request})
+    return templates.TemplateResponse("upload_photo.html", {"request": request, "capture": capture_settings()})
+
+async def confirm_page(request: Request, result: dict, headers=None):
+    """confirm_book.html for a successful OCR result, warning about likely duplicates"""
+    duplicates = await run_in_threadpool(
+        request.app.state.book_store.find_duplicates, result["book_info"], min_score=BOOK_DUPLICATE_MIN_SCORE
+    )
+    return templates.TemplateResponse("confirm_book.html", {
+        "request": request,
+        "book_data": result["book_info"],
+        "source": result.get("source", "ocr"),
+        "raw_text": result["raw_text"],
+        "detected_language": result["detected_language"],
+        "duplicates": duplicates
+    }, headers=headers)
 
 @router.post("/upload-photo", response_class=HTMLResponse)
 async def process_photo_upload(
     request: Request,
     photo: UploadFile = File(..., description="Book cover image"),
     target_language: Optional[str] = Form(None, description="Target language for OCR"),
-    ocr_service: OCRService = Depends(get_ocr_service)
+    ocr_pool: OCREnginePool = Depends(get_ocr_pool),
+    ocr_executor: OCRExecutor = Depends(get_ocr_executor),
+    ocr_cache: Optional[OCRResultCache] = Depends(get_ocr_cache)
 ):
     """Handle photo upload and OCR processing"""
     
@@ -41,57 +246,48 @@ async def process_photo_upload(
     if not photo.filename:
         raise HTTPException(status_code=400, detail="No file selected")
     
-    if not allowed_file(photo.filename):
-        raise HTTPException(
-            status_code=400, 
-            detail="Invalid file type. Please upload an image file (PNG, JPG, JPEG, GIF, BMP, TIFF, WEBP)"
-        )
+    try:
+        content = await read_image(photo)
+    except UploadRejected as e:
+        detail = str(e)
+        if e.status_code == 415:
+            detail = "Invalid file type. Please upload an image file (PNG, JPG, JPEG, GIF, BMP, TIFF, WEBP)"
+        raise HTTPException(status_code=e.status_code, detail=detail)
     
     try:
-        # Create unique filename
-        file_extension = photo.filename.split(".")[-1].lower()
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
         
-        # Ensure upload directory exists
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        # An ISBN barcode in the photo beats OCR
+        result, isbn, image = await barcode_fast_path(request, content)
         
-        # Save uploaded file asynchronously
-        async with aiofiles.open(filepath, "wb") as buffer:
-            content = await photo.read()
-            await buffer.write(content)
-        
-        # Process with OCR
-        result = ocr_service.process_book_cover(filepath, target_language)
-        
-        # Clean up uploaded file
-        try:
-            os.remove(filepath)
-        except:
-            pass
+        # Process with OCR off the event loop
+        timer = trace_timer(request)
+        if result is None:
+            result = with_isbn(
+                await run_ocr(request, ocr_pool, ocr_executor, image, target_language, ocr_cache, timer), isbn
+            )
         
         if result["success"]:
             # Return confirmation page with extracted data
-            return templates.TemplateResponse("confirm_book.html", {
-                "request": request,
-                "book_data": result["book_info"],
-                "source": "ocr",
-                "raw_text": result["raw_text"],
-                "detected_language": result["detected_language"]
-            })
+            return await confirm_page(request, result, trace_headers(timer))
         else:
             raise HTTPException(status_code=500, detail=f"OCR failed: {result['error']}")
             
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+        raise ocr_http_error(e)
 
 @router.post("/api/process-photo", response_model=OCRResult)
 async def api_process_photo(
+    request: Request,
+    response: Response,
     photo: UploadFile = File(..., description="Book cover image"),
     target_language: Optional[str] = Form(None, description="Target language for OCR"),
-    ocr_service: OCRService = Depends(get_ocr_service)
+    async_mode: bool = Form(False, description="Return a job ID immediately instead of waiting"),
+    ocr_pool: OCREnginePool = Depends(get_ocr_pool),
+    ocr_executor: OCRExecutor = Depends(get_ocr_executor),
+    ocr_cache: Optional[OCRResultCache] = Depends(get_ocr_cache),
+    ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)
 ):
     """API endpoint for photo processing (for AJAX calls)"""
     
@@ -100,156 +296,258 @@ async def api_process_photo(
         if not photo.filename:
             return OCRResult(success=False, error="No file uploaded")
         
-        if not allowed_file(photo.filename):
-            return OCRResult(success=False, error="Invalid file type")
-        
-        # Save and process file
-        file_extension = photo.filename.split(".")[-1].lower()
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        try:
+            content = await read_image(photo)
+        except UploadRejected as e:
+            return OCRResult(success=False, error=str(e))
         
-        async with aiofiles.open(filepath, "wb") as buffer:
-            content = await photo.read()
-            await buffer.write(content)
+        if async_mode:
+            return await submit_ocr_job(ocr_jobs, [(photo.filename, content)], target_language)
         
-        # Process with OCR
-        result = ocr_service.process_book_cover(filepath, target_language)
+        result, isbn, image = await barcode_fast_path(request, content)
+        if result is not None:
+            return OCRResult(**result)
         
-        # Clean up
-        try:
-            os.remove(filepath)
-        except:
-            pass
+        # Process the upload from memory, off the event loop
+        timer = trace_timer(request)
+        result = with_isbn(
+            await run_ocr(request, ocr_pool, ocr_executor, image, target_language, ocr_cache, timer), isbn
+        )
+        response.headers.update(trace_headers(timer))
         
         return OCRResult(**result)
         
+    except HTTPException:
+        raise
+    except OCR_HTTP_ERRORS as e:
+        # Overload, timeouts and disconnects are HTTP errors, not OCR results
+        raise ocr_http_error(e)
     except Exception as e:
         return OCRResult(success=False, error=str(e))
 
-@router.get("/test-ocr", response_class=HTMLResponse)
-async def test_ocr(request: Request):
-    """Test route for OCR functionality"""
-    return templates.TemplateResponse("test_ocr.html", {"request": request})# app/routes/ocr_routes.py
-from fastapi import APIRouter, Request, File, UploadFile, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from app.services.ocr_service import OCRService
-import uuid
-import os
-import aiofiles
-from typing import Optional
-
-router = APIRouter()
-ocr_service = OCRService()
-templates = Jinja2Templates(directory="app/templates")
-
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "tiff", "webp"}
-UPLOAD_FOLDER = "static/uploads"
-
-def allowed_file(filename: str) -> bool:
-    """Check if file extension is allowed"""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-@router.get("/upload-photo", response_class=HTMLResponse)
-async def upload_photo_page(request: Request):
-    """Display photo upload page"""
-    return templates.TemplateResponse("upload_photo.html", {"request": request})
-
-@router.post("/upload-photo", response_class=HTMLResponse)
-async def process_photo_upload(
+@router.post("/api/process-batch", response_model=BatchOCRResult)
+async def api_process_batch(
     request: Request,
-    photo: UploadFile = File(...),
-    target_language: Optional[str] = Form(None)
+    response: Response,
+    photos: List[UploadFile] = File([], description="Book cover images"),
+    archive: Optional[UploadFile] = File(None, description="Zip file of book cover images"),
+    target_language: Optional[str] = Form(None, description="Target language for OCR"),
+    async_mode: bool = Form(False, description="Return a job ID immediately instead of waiting"),
+    ocr_pool: OCREnginePool = Depends(get_ocr_pool),
+    ocr_executor: OCRExecutor = Depends(get_ocr_executor),
+    ocr_cache: Optional[OCRResultCache] = Depends(get_ocr_cache),
+    ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)
 ):
-    """Handle photo upload and OCR processing"""
+    """API endpoint for whole-shelf imports: many covers (or a zip) in one request"""
     
-    # Validate file
-    if not photo.filename:
-        raise HTTPException(status_code=400, detail="No file selected")
-    
-    if not allowed_file(photo.filename):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image file.")
+    started = time.perf_counter()
+    images = []
+    rejected = []  # (upload position, filename, error) for files that never reach OCR
     
     try:
-        # Create unique filename
-        file_extension = photo.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
-        # Ensure upload directory exists
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # Save uploaded file
-        async with aiofiles.open(filepath, "wb") as buffer:
-            content = await photo.read()
-            await buffer.write(content)
+        for position, photo in enumerate(photos or []):
+            try:
+                images.append((photo.filename, await read_image(photo)))
+            except UploadRejected as e:
+                rejected.append((position, photo.filename or "", str(e)))
         
-        # Process with OCR
-        result = ocr_service.process_book_cover(filepath, target_language)
-        
-        # Clean up uploaded file
-        try:
-            os.remove(filepath)
-        except:
-            pass
-        
-        if result["success"]:
-            # Return confirmation page with extracted data
-            return templates.TemplateResponse("confirm_book.html", {
-                "request": request,
-                "book_data": result["book_info"],
-                "source": "ocr",
-                "raw_text": result["raw_text"]
-            })
-        else:
-            raise HTTPException(status_code=500, detail=f"OCR failed: {result['error']}")
-            
+        if archive is not None and archive.filename:
+            archived, archive_rejected = await run_in_threadpool(
+                read_zip_images, archive.file, OCR_BATCH_MAX_IMAGES - len(images), len(images) + len(rejected)
+            )
+            images.extend(archived)
+            rejected.extend(archive_rejected)
+    except (zipfile.BadZipFile, ValueError) as e:
+        return BatchOCRResult(success=False, error=str(e))
+    
+    if not images and not rejected:
+        return BatchOCRResult(success=False, error="No files uploaded")
+    if len(images) > OCR_BATCH_MAX_IMAGES:
+        return BatchOCRResult(
+            success=False, error=f"Too many images, the limit is {OCR_BATCH_MAX_IMAGES} per request"
+        )
+    
+    if async_mode and images:
+        return await submit_ocr_job(ocr_jobs, images, target_language, rejected)
+    
+    timer = trace_timer(request)
+    try:
+        outcomes = await run_batch_ocr(request, ocr_pool, ocr_executor, images, target_language, ocr_cache, timer)
+    except OCR_HTTP_ERRORS as e:
+        raise ocr_http_error(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+        return BatchOCRResult(success=False, error=str(e))
+    
+    items = [
+        BatchOCRItem(filename=filename, result=OCRResult(**result), elapsed_ms=round(elapsed * 1000, 1))
+        for (filename, _), (result, elapsed) in zip(images, outcomes)
+    ]
+    # Back into upload order: each rejected file goes in at its position, earliest first
+    for position, filename, error in rejected:
+        items.insert(position, BatchOCRItem(
+            filename=filename, result=OCRResult(success=False, error=error), elapsed_ms=0.0
+        ))
+    succeeded = sum(1 for item in items if item.result.success)
+    response.headers.update(trace_headers(timer))
+    
+    return BatchOCRResult(
+        success=True,
+        total=len(items),
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        items=items
+    )
 
-@router.post("/api/process-photo")
-async def api_process_photo(
-    photo: UploadFile = File(...),
-    target_language: Optional[str] = Form(None)
+@router.post("/api/captures", response_model=CaptureSyncResult)
+async def api_sync_captures(
+    photos: List[UploadFile] = File(..., description="Queued cover photos, already resized by the client"),
+    capture_ids: List[str] = Form(..., description="Client-generated ID of each photo, in the same order"),
+    target_language: Optional[str] = Form(None, description="Target language for OCR"),
+    ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)
 ):
-    """API endpoint for photo processing (for AJAX calls)"""
+    """Upload photos the web client queued while offline; safe to retry
+    
+    A capture ID the server has seen before is never processed again: the
+    photo is ignored and the capture's current status returned, so a sync
+    repeated after a lost response costs no OCR run.
+    """
+    
+    if len(capture_ids) != len(photos):
+        return CaptureSyncResult(success=False, error="Send one capture ID per photo")
+    if len(photos) > OCR_BATCH_MAX_IMAGES:
+        return CaptureSyncResult(
+            success=False, error=f"Too many images, the limit is {OCR_BATCH_MAX_IMAGES} per request"
+        )
+    
+    captures = []
+    rejected = {}  # capture_id -> error, for photos that never reach OCR
+    for capture_id, photo in zip(capture_ids, photos):
+        if not CAPTURE_ID.match(capture_id):
+            rejected[capture_id] = "Invalid capture ID"
+            continue
+        try:
+            captures.append((capture_id, photo.filename or f"{capture_id}.jpg", await read_image(photo)))
+        except UploadRejected as e:
+            rejected[capture_id] = str(e)
     
     try:
-        # Validate file
-        if not photo.filename:
-            return JSONResponse({"success": False, "error": "No file uploaded"})
-        
-        if not allowed_file(photo.filename):
-            return JSONResponse({"success": False, "error": "Invalid file type"})
-        
-        # Save and process file
-        file_extension = photo.filename.split(".")[-1]
-        filename = f"{uuid.uuid4()}.{file_extension}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        async with aiofiles.open(filepath, "wb") as buffer:
-            content = await photo.read()
-            await buffer.write(content)
-        
-        # Process with OCR
-        result = ocr_service.process_book_cover(filepath, target_language)
-        
-        # Clean up
+        created = await ocr_jobs.submit_captures(captures, target_language) if captures else []
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    stored = await asyncio.to_thread(ocr_jobs.store.captures, [capture_id for capture_id, _, _ in captures])
+    items = [
+        CaptureStatus(capture_id=capture_id, status="rejected", error=rejected[capture_id])
+        if capture_id in rejected else capture_status(capture_id, stored.get(capture_id))
+        for capture_id in capture_ids
+    ]
+    return CaptureSyncResult(
+        success=True, accepted=len(created), duplicates=len(captures) - len(created), items=items
+    )
+
+@router.get("/api/captures", response_model=CaptureSyncResult)
+async def api_capture_status(
+    ids: List[str] = Query(..., description="Capture IDs to look up"),
+    ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)
+):
+    """Status and results of queued captures; ``unknown`` ones still have to be uploaded"""
+    
+    if len(ids) > OCR_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Too many IDs, the limit is {OCR_BATCH_MAX_IMAGES} per request")
+    stored = await asyncio.to_thread(ocr_jobs.store.captures, [i for i in ids if CAPTURE_ID.match(i)])
+    return CaptureSyncResult(success=True, items=[capture_status(i, stored.get(i)) for i in ids])
+
+@router.get("/captures/{capture_id}", response_class=HTMLResponse)
+async def capture_confirm_page(request: Request, capture_id: str, ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)):
+    """Confirmation page for a synced capture, from its stored OCR result"""
+    
+    stored = (await asyncio.to_thread(ocr_jobs.store.captures, [capture_id])).get(capture_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    if stored["result"] is None:
+        if stored["status"] == FAILED:
+            raise HTTPException(status_code=500, detail=f"OCR failed: {stored['error']}")
+        raise HTTPException(status_code=409, detail="Still processing, try again shortly")
+    if not stored["result"].get("success"):
+        raise HTTPException(status_code=500, detail=f"OCR failed: {stored['result'].get('error')}")
+    return await confirm_page(request, stored["result"])
+
+@router.get("/api/jobs/{job_id}", response_model=OCRJobStatus)
+async def get_job_status(job_id: str, ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)):
+    """Poll the status of an asynchronous OCR job"""
+    job = await asyncio.to_thread(ocr_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return OCRJobStatus(job_id=job_id, **{k: job[k] for k in (
+        "status", "total", "completed", "created_at", "updated_at", "error"
+    )})
+
+@router.get("/api/jobs/{job_id}/result", response_model=OCRJobResult)
+async def get_job_result(job_id: str, ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)):
+    """Results of an asynchronous OCR job; partial while it is still running"""
+    job = await asyncio.to_thread(ocr_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    items = await asyncio.to_thread(ocr_jobs.store.items, job_id)
+    return OCRJobResult(
+        job_id=job_id, status=job["status"], items=[job_item(item) for item in items], error=job["error"]
+    )
+
+@router.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, ocr_jobs: OCRJobQueue = Depends(get_ocr_jobs)):
+    """Server-Sent Events: one ``item`` event per finished image, then a final ``status`` event"""
+    job = await asyncio.to_thread(ocr_jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    
+    async def events():
+        # Subscribe before replaying stored items so nothing finishes unseen in between
+        queue = ocr_jobs.subscribe(job_id)
         try:
-            os.remove(filepath)
-        except:
-            pass
-        
-        return JSONResponse(result)
-        
-    except Exception as e:
-        return JSONResponse({"success": False, "error": str(e)})
+            sent = set()
+            for item in await asyncio.to_thread(ocr_jobs.store.items, job_id):
+                sent.add(item["position"])
+                yield sse("item", job_item(item).model_dump() | {"position": item["position"]})
+            
+            job = await asyncio.to_thread(ocr_jobs.store.get, job_id)
+            while job["status"] not in (COMPLETED, FAILED):
+                try:
+                    kind, payload = await asyncio.wait_for(queue.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # A job run by another server process publishes nothing here; read its progress
+                    for item in await asyncio.to_thread(ocr_jobs.store.items, job_id):
+                        if item["position"] not in sent:
+                            sent.add(item["position"])
+                            yield sse("item", job_item(item).model_dump() | {"position": item["position"]})
+                    job = await asyncio.to_thread(ocr_jobs.store.get, job_id)
+                    yield ": keep-alive\n\n"
+                    continue
+                if kind == "status":
+                    job = payload
+                elif payload["position"] not in sent:
+                    sent.add(payload["position"])
+                    yield sse("item", job_item(payload).model_dump() | {"position": payload["position"]})
+            
+            # Items that finished between the replay and the status check
+            while not queue.empty():
+                kind, payload = queue.get_nowait()
+                if kind == "item" and payload["position"] not in sent:
+                    sent.add(payload["position"])
+                    yield sse("item", job_item(payload).model_dump() | {"position": payload["position"]})
+            
+            yield sse("status", {k: job[k] for k in ("status", "total", "completed", "error")})
+        finally:
+            ocr_jobs.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @router.get("/test-ocr", response_class=HTMLResponse)
 async def test_ocr(request: Request):
     """Test route for OCR functionality"""
-    return templates.TemplateResponse("test_ocr.html", {"request": request})
\ No newline at end of file
+    return templates.TemplateResponse("test_ocr.html", {"request": request})
@@ -0,0 +1,178 @@
+# app/routes/shelf_routes.py
+from fastapi import APIRouter, Request, Query, HTTPException, Depends, Form
+from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from typing import Optional
+from urllib.parse import quote
+
+from app.services.book_store import BookStore, ShelfExists, ShelfNotEmpty
+from app.services.sheets_service import SheetsSync
+from app.routes.book_routes import get_book_store, get_sheets_sync
+from app.models.book import BookUpdate, APIResponse
+from app.models.shelf import Shelf, ShelfCreate, ShelfUpdate, ShelfList, MoveBooksRequest, MoveBooksResult
+from utils.http_cache import static_url
+
+router = APIRouter()
+templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["static_url"] = static_url
+
+def record_moves(sheets_sync: Optional[SheetsSync], books):
+    """Queue the new shelf_number of moved books for the sheet"""
+    if sheets_sync is not None:
+        for book in books:
+            sheets_sync.record_update(book.id, BookUpdate(shelf_number=book.shelf_number), updated_at=book.updated_at)
+
+def save_shelf_update(book_store: BookStore, sheets_sync: Optional[SheetsSync], name, update: ShelfUpdate):
+    """Rename or describe a shelf and queue its moved books; None if unknown. Blocking."""
+    shelf, moved = book_store.update_shelf(name, update)
+    record_moves(sheets_sync, moved)
+    return shelf
+
+def remove_shelf(book_store: BookStore, sheets_sync: Optional[SheetsSync], name, move_to) -> bool:
+    """Delete a shelf, moving its books to move_to, and queue them. Blocking."""
+    deleted, moved = book_store.delete_shelf(name, move_to=move_to)
+    record_moves(sheets_sync, moved)
+    return deleted
+
+def move_to_shelf(book_store: BookStore, sheets_sync: Optional[SheetsSync], name, book_ids):
+    """Move books and queue them for the sheet. Blocking."""
+    moved, missing = book_store.move_books(book_ids, name)
+    record_moves(sheets_sync, moved)
+    return moved, missing
+
+def error_query(error) -> str:
+    """A form error for the redirect back to manage_shelves.html"""
+    text = error.errors()[0]["msg"] if isinstance(error, ValidationError) else str(error)
+    return "?error=" + quote(text)
+
+@router.get("/manage", response_class=HTMLResponse)
+async def manage_shelves_page(
+    request: Request,
+    error: Optional[str] = None,
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Create, rename and remove shelves, with what is on each"""
+    
+    shelves, totals, unshelved = await run_in_threadpool(book_store.list_shelves)
+    return templates.TemplateResponse("manage_shelves.html", {
+        "request": request,
+        "shelves": shelves,
+        "totals": totals,
+        "unshelved": unshelved,
+        "error": error
+    })
+
+@router.post("/save")
+async def save_shelf_form(
+    name: str = Form(...),
+    description: Optional[str] = Form(None),
+    book_store: BookStore = Depends(get_book_store)
+):
+    """Create the shelf submitted on manage_shelves.html"""
+    
+    try:
+        shelf = ShelfCreate(name=name.strip(), description=(description or "").strip() or None)
+        await run_in_threadpool(book_store.create_shelf, shelf)
+    except (ValidationError, ShelfExists) as e:
+        return RedirectResponse("/shelves/manage" + error_query(e), status_code=303)
+    return RedirectResponse("/shelves/manage", status_code=303)
+
+@router.post("/rename")
+async def rename_shelf_form(
+    name: str = Form(...),
+    new_name: str = Form(...),
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Rename a shelf from manage_shelves.html; its books move with it"""
+    
+    try:
+        update = ShelfUpdate(name=new_name.strip())
+        await run_in_threadpool(save_shelf_update, book_store, sheets_sync, name, update)
+    except (ValidationError, ShelfExists) as e:
+        return RedirectResponse("/shelves/manage" + error_query(e), status_code=303)
+    return RedirectResponse("/shelves/manage", status_code=303)
+
+@router.post("/delete")
+async def delete_shelf_form(
+    name: str = Form(...),
+    move_to: Optional[str] = Form(None),
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Remove a shelf from manage_shelves.html, moving its books to another one"""
+    
+    try:
+        await run_in_threadpool(remove_shelf, book_store, sheets_sync, name, (move_to or "").strip() or None)
+    except ShelfNotEmpty as e:
+        return RedirectResponse("/shelves/manage" + error_query(e), status_code=303)
+    return RedirectResponse("/shelves/manage", status_code=303)
+
+@router.get("/api", response_model=ShelfList)
+async def api_list_shelves(book_store: BookStore = Depends(get_book_store)):
+    """Every shelf with its statistics, and totals for the library; read from precomputed counters"""
+    
+    shelves, totals, unshelved = await run_in_threadpool(book_store.list_shelves)
+    return ShelfList(items=shelves, totals=totals, unshelved=unshelved)
+
+@router.post("/api", response_model=Shelf, status_code=201)
+async def api_create_shelf(shelf: ShelfCreate, book_store: BookStore = Depends(get_book_store)):
+    """Add an empty shelf (storing a book on a new shelf_number also creates one)"""
+    try:
+        return await run_in_threadpool(book_store.create_shelf, shelf)
+    except ShelfExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/api/{name}", response_model=Shelf)
+async def api_get_shelf(name: str, book_store: BookStore = Depends(get_book_store)):
+    """One shelf and its statistics"""
+    shelf = await run_in_threadpool(book_store.get_shelf, name)
+    if shelf is None:
+        raise HTTPException(status_code=404, detail="Shelf not found")
+    return shelf
+
+@router.patch("/api/{name}", response_model=Shelf)
+async def api_update_shelf(
+    name: str,
+    update: ShelfUpdate,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Rename or describe a shelf; renaming moves its books to the new name"""
+    
+    try:
+        shelf = await run_in_threadpool(save_shelf_update, book_store, sheets_sync, name, update)
+    except ShelfExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if shelf is None:
+        raise HTTPException(status_code=404, detail="Shelf not found")
+    return shelf
+
+@router.delete("/api/{name}", response_model=APIResponse)
+async def api_delete_shelf(
+    name: str,
+    move_to: Optional[str] = Query(None, min_length=1, description="Shelf to move the books to; required unless empty"),
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    try:
+        deleted = await run_in_threadpool(remove_shelf, book_store, sheets_sync, name, move_to)
+    except ShelfNotEmpty as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Shelf not found")
+    return APIResponse(success=True, message="Shelf deleted")
+
+@router.post("/api/{name}/books", response_model=MoveBooksResult)
+async def api_move_books(
+    name: str,
+    request: MoveBooksRequest,
+    book_store: BookStore = Depends(get_book_store),
+    sheets_sync: Optional[SheetsSync] = Depends(get_sheets_sync)
+):
+    """Put books on this shelf, creating it if needed"""
+    
+    moved, missing = await run_in_threadpool(move_to_shelf, book_store, sheets_sync, name, request.book_ids)
+    return MoveBooksResult(success=not missing, moved=len(moved), missing=missing)
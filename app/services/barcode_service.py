@@ -0,0 +1,128 @@
+# app/services/barcode_service.py
+"""EAN-13 / ISBN barcode decoding with pyzbar, entirely in memory
+
+Decoding a downscaled grayscale copy takes milliseconds, so it is tried
+first; the full-resolution image is only scanned when that finds nothing.
+"""
+import logging
+import time
+
+import cv2
+
+from utils.image_processing import load_image, downscale
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyzbar.pyzbar import decode as zbar_decode, ZBarSymbol
+except ImportError as e:  # pyzbar installed without the zbar shared library, or not at all
+    zbar_decode = ZBarSymbol = None
+    logger.warning(f"Barcode scanning disabled: {e}")
+
+ISBN_PREFIXES = ("978", "979")
+
+
+class BarcodeUnavailable(Exception):
+    """Raised when pyzbar or the zbar library is missing"""
+
+
+def ean13_is_valid(code: str) -> bool:
+    if len(code) != 13 or not code.isdigit():
+        return False
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(code[:12]))
+    return (10 - total % 10) % 10 == int(code[12])
+
+
+def isbn10_to_isbn13(code: str):
+    """ISBN-13 for a valid ISBN-10, else None"""
+    code = code.replace("-", "").upper()
+    if len(code) != 10 or not code[:9].isdigit() or not (code[9].isdigit() or code[9] == "X"):
+        return None
+    check = sum((10 - i) * (10 if d == "X" else int(d)) for i, d in enumerate(code))
+    if check % 11:
+        return None
+    body = "978" + code[:9]
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def normalize_isbn(code: str):
+    """ISBN-13 for an ISBN-10/13 string (hyphens allowed), else None"""
+    digits = code.replace("-", "").replace(" ", "").upper()
+    if len(digits) == 10:
+        return isbn10_to_isbn13(digits)
+    if digits.startswith(ISBN_PREFIXES) and ean13_is_valid(digits):
+        return digits
+    return None
+
+
+class BarcodeService:
+    def __init__(self, fast_max_side=1024):
+        """``fast_max_side`` bounds the longer side of the first, cheap attempt"""
+        self.fast_max_side = fast_max_side
+        self.symbols = None
+        if ZBarSymbol is not None:
+            self.symbols = [ZBarSymbol.EAN13, ZBarSymbol.ISBN13, ZBarSymbol.ISBN10, ZBarSymbol.UPCA, ZBarSymbol.EAN8]
+
+    @property
+    def available(self) -> bool:
+        return zbar_decode is not None
+
+    def decode(self, gray):
+        """``[{"type", "data"}, ...]`` for every barcode zbar finds in a grayscale image"""
+        if zbar_decode is None:
+            raise BarcodeUnavailable("Barcode scanning needs pyzbar and the zbar shared library")
+        return [
+            {"type": symbol.type, "data": symbol.data.decode("ascii", "replace")}
+            for symbol in zbar_decode(gray, symbols=self.symbols)
+        ]
+
+    def scan(self, image, full_resolution=True) -> dict:
+        """Find barcodes, trying a downscaled copy before the full image
+
+        ``image`` is anything ``load_image`` accepts. Returns ``success``, the
+        first ISBN found as ``isbn`` (ISBN-13), every barcode and the passes
+        needed. ``full_resolution=False`` makes it a single cheap attempt.
+        """
+        started = time.perf_counter()
+        try:
+            img = load_image(image)
+        except (ValueError, TypeError) as e:
+            return {"success": False, "error": f"Processing failed: {str(e)}"}
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+        small = downscale(gray, self.fast_max_side)
+        passes = [small]
+        if full_resolution and small.shape != gray.shape:
+            passes.append(gray)
+
+        barcodes = []
+        for attempt, candidate in enumerate(passes, start=1):
+            barcodes = self.decode(candidate)
+            if barcodes:
+                break
+
+        isbn = next((normalize_isbn(b["data"]) for b in barcodes if normalize_isbn(b["data"])), None)
+        return {
+            "success": bool(barcodes),
+            "isbn": isbn,
+            "barcodes": barcodes,
+            "attempts": attempt,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+            "error": None if barcodes else "No barcode found",
+        }
+
+    def find_isbn(self, image):
+        """``(isbn or None, decoded image)``: one cheap pass, for the OCR upload fast path
+
+        Returns the decoded image so OCR can reuse it when no ISBN is found.
+        """
+        img = load_image(image)
+        if zbar_decode is None:
+            return None, img
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        for barcode in self.decode(downscale(gray, self.fast_max_side)):
+            isbn = normalize_isbn(barcode["data"])
+            if isbn:
+                return isbn, img
+        return None, img
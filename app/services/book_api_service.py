@@ -0,0 +1,298 @@
+# app/services/book_api_service.py
+"""Book metadata by ISBN from public catalogues
+
+``BookAPIService.lookup`` is async: concurrent lookups of one ISBN share a
+single upstream request, answers (including "not found") are kept in SQLite,
+and providers are tried in order, each with its own pooled session, timeout
+and circuit breaker. HTTP itself runs on worker threads via ``requests``.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OPEN_LIBRARY_URL = "https://openlibrary.org/api/books"
+GOOGLE_BOOKS_URL = "https://www.googleapis.com/books/v1/volumes"
+
+LANGUAGE_NAMES = {
+    "en": "English", "eng": "English", "es": "Spanish", "spa": "Spanish", "fr": "French", "fre": "French",
+    "de": "German", "ger": "German", "it": "Italian", "ita": "Italian", "pt": "Portuguese", "por": "Portuguese",
+    "ja": "Japanese", "jpn": "Japanese", "ko": "Korean", "kor": "Korean", "zh": "Chinese", "chi": "Chinese",
+}
+
+
+def book_info(isbn, title="", authors=(), publisher="", language=""):
+    """Metadata in the shape of ``OCRService.parse_book_info`` output, plus the ISBN"""
+    return {
+        "title": title or "",
+        "author": ", ".join(authors),
+        "translator": "",
+        "publisher": publisher or "",
+        "language": LANGUAGE_NAMES.get(language, language or ""),
+        "isbn": isbn,
+    }
+
+
+def parse_open_library(isbn, data):
+    entry = data.get(f"ISBN:{isbn}")
+    if not entry:
+        return None
+    publishers = entry.get("publishers") or [{}]
+    languages = [lang.get("key", "").rsplit("/", 1)[-1] for lang in entry.get("languages", [])]
+    return book_info(
+        isbn,
+        title=entry.get("title"),
+        authors=[author.get("name", "") for author in entry.get("authors", [])],
+        publisher=publishers[0].get("name"),
+        language=languages[0] if languages else "",
+    )
+
+
+def parse_google_books(isbn, data):
+    items = data.get("items") or []
+    if not items:
+        return None
+    volume = items[0].get("volumeInfo", {})
+    title = volume.get("title", "")
+    if volume.get("subtitle"):
+        title = f"{title}: {volume['subtitle']}"
+    return book_info(
+        isbn,
+        title=title,
+        authors=volume.get("authors", []),
+        publisher=volume.get("publisher"),
+        language=volume.get("language", ""),
+    )
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider errors, times out or has its circuit open"""
+
+
+class CircuitBreaker:
+    """Stop calling a provider after ``failure_threshold`` consecutive failures
+
+    After ``reset_timeout`` seconds one trial call is let through (half-open);
+    success closes the circuit again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class Provider:
+    """One catalogue: a URL, how to query it and how to read its answer"""
+
+    def __init__(self, name, url, params, parse, timeout=5.0, breaker=None, pool_size=4):
+        self.name = name
+        self.url = url
+        self.params = params  # isbn -> query parameters
+        self.parse = parse  # (isbn, json) -> book_info dict or None
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        # One keep-alive connection pool per provider, shared by all lookups
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.requests = 0
+        self.failures = 0
+
+    def fetch(self, isbn):
+        """Metadata or None (not found); raises ProviderUnavailable on failure. Blocking."""
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+        self.requests += 1
+        try:
+            response = self.session.get(self.url, params=self.params(isbn), timeout=self.timeout)
+            response.raise_for_status()
+            info = self.parse(isbn, response.json())
+        except Exception as e:
+            # Any failure, an odd payload tripping the parser included, must
+            # reach the breaker: a half-open trial is otherwise never closed
+            self.failures += 1
+            self.breaker.record_failure()
+            raise ProviderUnavailable(f"{self.name}: {e}") from e
+        self.breaker.record_success()
+        return info
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "failures": self.failures, "circuit": self.breaker.state}
+
+    def close(self):
+        self.session.close()
+
+
+def default_providers(timeout=5.0, timeouts=None, failure_threshold=5, reset_timeout=60.0):
+    """Open Library first, Google Books as the fallback
+
+    ``timeouts`` overrides ``timeout`` per provider name.
+    """
+    timeouts = timeouts or {}
+
+    def provider(name, url, params, parse):
+        return Provider(name, url, params, parse, timeout=timeouts.get(name, timeout),
+                        breaker=CircuitBreaker(failure_threshold, reset_timeout))
+
+    return [
+        provider("openlibrary", OPEN_LIBRARY_URL,
+                 lambda isbn: {"bibkeys": f"ISBN:{isbn}", "format": "json", "jscmd": "data"}, parse_open_library),
+        provider("google", GOOGLE_BOOKS_URL, lambda isbn: {"q": f"isbn:{isbn}"}, parse_google_books),
+    ]
+
+
+class ISBNCache:
+    """SQLite cache of lookups; ``None`` metadata records a confirmed miss"""
+
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=86400):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS isbn_metadata (
+                isbn TEXT PRIMARY KEY,
+                metadata TEXT,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, isbn):
+        """``(True, metadata or None)`` for a fresh entry, else ``(False, None)``"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM isbn_metadata WHERE isbn = ? AND expires_at >= ?", (isbn, time.time())
+            ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def put(self, isbn, metadata):
+        ttl = self.ttl if metadata is not None else self.negative_ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO isbn_metadata (isbn, metadata, expires_at) VALUES (?, ?, ?)",
+                (isbn, json.dumps(metadata) if metadata is not None else None, time.time() + ttl),
+            )
+
+    def purge(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM isbn_metadata WHERE expires_at < ?", (time.time(),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BookAPIService:
+    def __init__(self, providers=None, cache: ISBNCache = None):
+        self.providers = providers if providers is not None else default_providers()
+        self.cache = cache
+        self._in_flight = {}  # isbn -> asyncio.Task, so concurrent lookups share one
+        self._counters = {"lookups": 0, "cache_hits": 0, "coalesced": 0, "found": 0, "not_found": 0,
+                          "unavailable": 0}
+
+    async def lookup(self, isbn):
+        """Metadata for an ISBN-13, or None when no catalogue knows it (or none answered)"""
+        self._counters["lookups"] += 1
+        if self.cache is not None:
+            hit, metadata = await asyncio.to_thread(self.cache.get, isbn)
+            if hit:
+                self._counters["cache_hits"] += 1
+                return metadata
+
+        task = self._in_flight.get(isbn)
+        if task is None:
+            task = asyncio.create_task(self._fetch(isbn))
+            self._in_flight[isbn] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(isbn, None))
+        else:
+            self._counters["coalesced"] += 1
+        # One caller giving up must not cancel the lookup the others wait for
+        return await asyncio.shield(task)
+
+    async def _fetch(self, isbn):
+        unavailable = 0
+        for provider in self.providers:
+            try:
+                metadata = await asyncio.to_thread(provider.fetch, isbn)
+            except ProviderUnavailable as e:
+                logger.warning(f"ISBN lookup failed: {e}")
+                unavailable += 1
+                continue
+            if metadata is not None:
+                self._counters["found"] += 1
+                await self._store(isbn, metadata)
+                return metadata
+
+        if unavailable:
+            # A provider that didn't answer might know the book; ask again next time
+            self._counters["unavailable"] += 1
+        else:
+            self._counters["not_found"] += 1
+            await self._store(isbn, None)
+        return None
+
+    async def _store(self, isbn, metadata):
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, isbn, metadata)
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "in_flight": len(self._in_flight),
+            "providers": {provider.name: provider.stats() for provider in self.providers},
+        }
+
+    def close(self):
+        for provider in self.providers:
+            provider.close()
+        if self.cache is not None:
+            self.cache.close()
@@ -0,0 +1,178 @@
+# app/services/book_io.py
+"""Streaming import and export of the library as CSV or JSON Lines
+
+Everything is a generator: rows are parsed one at a time from a file
+object, validated ``batch_size`` at a time against ``BookCreate``, and each
+batch of valid books is stored in its own transaction. Memory stays flat
+however long the file is; a failed row never stops the rest. Export walks
+the store with keyset pagination and yields the file in chunks.
+
+Columns are the ``Book`` fields. On import ``id``, ``created_at`` and
+``updated_at`` are ignored (every row becomes a new book), unknown columns
+too, and a blank cell means "not set", so the model default applies.
+"""
+import csv
+import io
+import json
+import re
+from typing import List
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.book import BookCreate
+from app.services.book_store import COLUMNS
+from app.services.sheets_service import cell_value
+
+FORMATS = ("csv", "jsonl")
+IMPORT_BATCH_SIZE = 5000
+
+_book_list = TypeAdapter(List[BookCreate])
+# Bytes that are not UTF-8, as decoded with errors="surrogateescape"
+_UNDECODABLE = re.compile("[\udc80-\udcff]")
+NOT_UTF8 = "Not UTF-8 text; save the file as UTF-8"
+
+
+class ImportFormatError(ValueError):
+    """The file is not in the format it was declared as"""
+
+
+def format_of(filename, default=None):
+    """``csv`` or ``jsonl`` from a file name's extension (``.json``/``.ndjson`` are JSON Lines)"""
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    return default
+
+
+def read_rows(binary_file, fmt):
+    """Yield ``(row number, fields)`` from a binary file object
+
+    The row number is the line a row starts on, as an editor shows it.
+    Blank cells and blank lines are skipped; a JSON line that is not an
+    object, or a row with bytes that are not UTF-8, yields its error message
+    instead of fields. Earlier batches may already be stored by then, so
+    only an unreadable header fails the whole file.
+    """
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    # utf-8-sig drops the byte order mark spreadsheet programs write
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            if reader.fieldnames is None:
+                return
+            if any(_UNDECODABLE.search(name) for name in reader.fieldnames):
+                raise ImportFormatError("The file is not UTF-8 text")
+            if "title" not in reader.fieldnames:
+                raise ImportFormatError("The CSV header has no title column")
+            line = reader.line_num + 1
+            for record in reader:
+                fields = {
+                    name: value.strip() for name, value in record.items()
+                    if name is not None and isinstance(value, str) and value.strip()
+                }
+                if any(_UNDECODABLE.search(value) for value in fields.values()):
+                    yield line, NOT_UTF8
+                else:
+                    yield line, fields
+                line = reader.line_num + 1
+        else:
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+                if _UNDECODABLE.search(raw):
+                    yield line, NOT_UTF8
+                    continue
+                try:
+                    record = json.loads(raw)
+                except json.JSONDecodeError as e:
+                    yield line, f"Invalid JSON: {e.msg}"
+                    continue
+                if not isinstance(record, dict):
+                    yield line, "Expected a JSON object"
+                    continue
+                yield line, {name: value for name, value in record.items() if value not in (None, "")}
+    finally:
+        # Leave the underlying file open for its owner
+        text.detach()
+
+
+def validate_batches(rows, batch_size=IMPORT_BATCH_SIZE):
+    """Yield ``(books, errors)`` per ``batch_size`` rows of ``read_rows``
+
+    ``books`` are the valid rows as ``BookCreate``; ``errors`` are
+    ``{"row": n, "errors": ["field: message", ...]}`` for the rest.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield _validate(batch)
+            batch = []
+    if batch:
+        yield _validate(batch)
+
+
+def _validate(batch):
+    errors = {line: [fields] for line, fields in batch if isinstance(fields, str)}
+    records = [(line, fields) for line, fields in batch if not isinstance(fields, str)]
+    try:
+        books = _book_list.validate_python([fields for _, fields in records])
+    except ValidationError as e:
+        # One pass finds every bad row; the good ones are validated again
+        bad = set()
+        for error in e.errors(include_url=False):
+            index, *location = error["loc"]
+            bad.add(index)
+            message = f"{'.'.join(map(str, location))}: {error['msg']}" if location else error["msg"]
+            errors.setdefault(records[index][0], []).append(message)
+        books = _book_list.validate_python([fields for i, (_, fields) in enumerate(records) if i not in bad])
+    report = [{"row": line, "errors": messages} for line, messages in sorted(errors.items())]
+    return books, report
+
+
+def import_books(binary_file, fmt, save, batch_size=IMPORT_BATCH_SIZE, on_error=None, max_errors=None):
+    """Import a file; ``{"imported": n, "rejected": n, "errors": [...]}``
+
+    ``save(books)`` stores one batch, e.g. ``BookStore.bulk_insert``.
+    ``on_error(report)`` is called for each rejected row; at most
+    ``max_errors`` reports (all when None) are kept in the result.
+    """
+    result = {"imported": 0, "rejected": 0, "errors": []}
+    for books, errors in validate_batches(read_rows(binary_file, fmt), batch_size):
+        if books:
+            save(books)
+        result["imported"] += len(books)
+        result["rejected"] += len(errors)
+        for report in errors:
+            if on_error is not None:
+                on_error(report)
+            if max_errors is None or len(result["errors"]) < max_errors:
+                result["errors"].append(report)
+    return result
+
+
+def export_books(books, fmt):
+    """Yield the text of a CSV or JSON Lines file of ``books`` (``Book`` objects), in chunks"""
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(COLUMNS)
+    for book in books:
+        if fmt == "csv":
+            writer.writerow([cell_value(value).lower() if isinstance(value, bool) else cell_value(value)
+                             for value in (getattr(book, name) for name in COLUMNS)])
+        else:
+            buffer.write(book.model_dump_json())
+            buffer.write("\n")
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,83 @@
+# app/services/book_search.py
+"""Typo-tolerant ranking for library search
+
+The FTS5 trigram index finds candidates (see ``BookStore.search``): books
+containing the query's words, plus for misspelt queries books sharing the
+most of its rarest trigrams, since a misread letter or two (``Harry Pottcr``,
+``rn`` for ``m``) still leaves most of them intact. Candidates are then
+scored here by how much of the query each field contains, weighted by field.
+"""
+import unicodedata
+
+# Searchable BookBase fields and their weight in the final score
+SEARCH_FIELDS = {
+    "title": 1.0,
+    "author": 0.9,
+    "translator": 0.6,
+    "publisher": 0.5,
+    "tags": 0.7,
+    "remarks": 0.4,
+}
+# bm25 column weights, in SEARCH_FIELDS order
+BM25_WEIGHTS = (10.0, 8.0, 4.0, 3.0, 5.0, 1.0)
+# Character sequences OCR mistakes for one another, folded before scoring
+OCR_CONFUSIONS = (("rn", "m"), ("vv", "w"), ("0", "o"), ("1", "l"), ("|", "l"))
+
+
+def normalize(text) -> str:
+    """NFKC, casefolded, whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def fold(text) -> str:
+    """``normalize`` plus OCR look-alikes mapped to one spelling (``rn`` -> ``m``)"""
+    text = normalize(text)
+    for seen, meant in OCR_CONFUSIONS:
+        text = text.replace(seen, meant)
+    return text
+
+
+def trigrams(text) -> set:
+    """Trigrams of each word; words shorter than three characters count whole"""
+    grams = set()
+    for word in text.split():
+        if len(word) < 3:
+            grams.add(word)
+        else:
+            grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+def fts_phrase(text) -> str:
+    """``text`` as one FTS5 string token"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def similarity(query_grams, grams) -> float:
+    """Share of the query's trigrams found in ``grams``, nudged towards shorter texts"""
+    if not query_grams or not grams:
+        return 0.0
+    common = len(query_grams & grams)
+    containment = common / len(query_grams)
+    dice = 2 * common / (len(query_grams) + len(grams))
+    return 0.8 * containment + 0.2 * dice
+
+
+def score(query_grams, fields) -> float:
+    """Relevance in [0, 1] of a book's ``fields`` (any mapping) for ``trigrams(fold(query))``
+
+    The best single field counts, unless the query spans fields
+    (``dune herbert``), where all fields together may score higher. A query
+    word too short for trigrams (``村上``, ``oz``) counts wherever a field
+    contains it, not only as a whole word.
+    """
+    best = 0.0
+    everything = set()
+    short = {gram for gram in query_grams if len(gram) < 3}
+    for name, weight in SEARCH_FIELDS.items():
+        if fields[name]:
+            text = fold(fields[name])
+            grams = trigrams(text) | {gram for gram in short if gram in text}
+            everything |= grams
+            best = max(best, weight * similarity(query_grams, grams))
+    return round(max(best, 0.9 * similarity(query_grams, everything)), 4)
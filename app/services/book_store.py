@@ -0,0 +1,753 @@
+# app/services/book_store.py
+"""Local SQLite store of books, the source of truth for the library
+
+Lists are paged with keyset cursors: a page ends with the sort key and id of
+its last book, and the next page starts strictly after them, so page 500 is
+as cheap as page 1. Tags are kept in a side table so filtering by one tag
+uses an index instead of a LIKE scan.
+
+Search goes through an FTS5 trigram index kept current by triggers; see
+``app/services/book_search.py`` for the ranking. MinHash band keys of each
+title (``app/services/dedup.py``) are stored alongside, so likely duplicates
+of an incoming book are found with a few index lookups.
+
+Shelves are rows of their own, named by the books' ``shelf_number``; a
+shelf is created the first time a book is stored on it. Per-shelf counters
+(``app/services/shelf_stats.py``) are adjusted in the same transaction as
+every insert, update, move and delete.
+"""
+import base64
+import json
+import re
+from collections import Counter
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from app.models.book import Book, BookBase, BookCreate, BookUpdate
+from app.models.shelf import Shelf, ShelfCreate, ShelfStats, ShelfUpdate
+from app.services import shelf_stats
+from app.services.dedup import MinHasher, normalize_text, shingles, duplicate_score
+from app.services.book_search import (
+    SEARCH_FIELDS, BM25_WEIGHTS, normalize, fold, trigrams, fts_phrase, score
+)
+
+FIELDS = list(BookBase.model_fields)
+COLUMNS = ["id", *FIELDS, "created_at", "updated_at"]
+
+# Sort name -> SQL expression; each has an index ending in id
+SORT_KEYS = {
+    "title": "title",
+    "author": "coalesce(author, '') COLLATE NOCASE",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+FILTERS = ("shelf_number", "reading_status", "book_type", "author", "isbn", "on_shelf")
+
+# Typo-tolerant candidates: books sharing the most of the query's rarest
+# trigrams, counting at least this many trigrams' posting lists...
+FUZZY_MIN_TERMS = 4
+# ...and more only while the lists read stay under this many rows in total
+FUZZY_POSTINGS_BUDGET = 30000
+# A one-word query found in more books than this is matched unranked:
+# bm25 over that many rows costs more than it helps
+RANKED_MAX_DOCS = 20000
+# Below this best score the query is taken to be misspelt and trigram
+# neighbours are searched too (an exact substring scores about 0.8-1.0)
+CLOSE_MATCH_SCORE = 0.75
+# Trigram document counts remembered between searches; fts5vocab reads a
+# trigram's whole posting list to count it
+GRAM_CACHE_SIZE = 50000
+# Books read per band key when looking for duplicates; a key shared by more
+# belongs to a title stored that many times, and any of them will do
+BAND_POSTINGS_MAX = 1000
+# SQLite page cache per connection, in KiB
+PAGE_CACHE_KIB = 65536
+
+_SEARCH_COLUMNS = ", ".join(SEARCH_FIELDS)
+_OLD_SEARCH_VALUES = ", ".join(f"old.{name}" for name in SEARCH_FIELDS)
+_NEW_SEARCH_VALUES = ", ".join(f"new.{name}" for name in SEARCH_FIELDS)
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    {_SEARCH_COLUMNS}, content='books', content_rowid='rowid', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts_vocab USING fts5vocab(books_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books BEGIN
+    INSERT INTO books_fts (rowid, {_SEARCH_COLUMNS}) VALUES (new.rowid, {_NEW_SEARCH_VALUES});
+END;
+CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, {_SEARCH_COLUMNS}) VALUES ('delete', old.rowid, {_OLD_SEARCH_VALUES});
+END;
+CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF {_SEARCH_COLUMNS} ON books BEGIN
+    INSERT INTO books_fts (books_fts, rowid, {_SEARCH_COLUMNS}) VALUES ('delete', old.rowid, {_OLD_SEARCH_VALUES});
+    INSERT INTO books_fts (rowid, {_SEARCH_COLUMNS}) VALUES (new.rowid, {_NEW_SEARCH_VALUES});
+END;
+"""
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by the same sort"""
+
+
+class ShelfExists(ValueError):
+    """Raised when creating or renaming to a shelf name already in use"""
+
+
+class ShelfNotEmpty(ValueError):
+    """Raised when deleting a shelf that still holds books and no shelf to move them to was given"""
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def split_tags(tags):
+    """Distinct lower-cased tags of a comma-separated string, in order"""
+    seen = []
+    for tag in (tags or "").split(","):
+        tag = tag.strip().lower()
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+def encode_cursor(sort, value, book_id) -> str:
+    raw = json.dumps([sort, value, book_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """``(value, id)`` of the last book on the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, book_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}") from e
+    if cursor_sort != sort:
+        raise InvalidCursor(f"Cursor was made for sort={cursor_sort}, not sort={sort}")
+    return value, book_id
+
+
+def shelf_sort_key(name):
+    """Natural order, so that Shelf 2 comes before Shelf 10"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def _db_value(value):
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class BookStore:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints under WAL, and much faster for bulk writes
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Inserts land at random places in the title, search and band-key
+        # indexes; SQLite's default 2 MB page cache thrashes past ~100k books
+        self._conn.execute(f"PRAGMA cache_size=-{PAGE_CACHE_KIB}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS books (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL COLLATE NOCASE,
+                author TEXT,
+                translator TEXT,
+                publisher TEXT,
+                language TEXT,
+                original_language TEXT,
+                book_type TEXT NOT NULL,
+                reading_status TEXT NOT NULL,
+                shelf_number TEXT,
+                fiction_type TEXT NOT NULL,
+                on_shelf INTEGER NOT NULL,
+                personal_rating INTEGER,
+                tags TEXT,
+                remarks TEXT,
+                isbn TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_books_title ON books (title, id);
+            CREATE INDEX IF NOT EXISTS idx_books_author ON books (coalesce(author, '') COLLATE NOCASE, id);
+            CREATE INDEX IF NOT EXISTS idx_books_shelf ON books (shelf_number, title, id);
+            CREATE INDEX IF NOT EXISTS idx_books_status ON books (reading_status, title, id);
+            CREATE INDEX IF NOT EXISTS idx_books_created ON books (created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_books_updated ON books (updated_at, id);
+            CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn);
+            CREATE TABLE IF NOT EXISTS book_tags (
+                tag TEXT NOT NULL,
+                book_id TEXT NOT NULL REFERENCES books (id) ON DELETE CASCADE,
+                PRIMARY KEY (tag, book_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_book_tags_book ON book_tags (book_id);
+            -- No foreign key: a second index on book_id would double the
+            -- cost of every insert. Keys are deleted by recomputing them from
+            -- the title, and any left behind only add a candidate that
+            -- find_duplicates scores and drops.
+            CREATE TABLE IF NOT EXISTS book_minhash (
+                band_key INTEGER NOT NULL,
+                book_id TEXT NOT NULL,
+                PRIMARY KEY (band_key, book_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.executescript(shelf_stats.SCHEMA)
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._gram_docs = {}
+        self._minhasher = MinHasher()
+        if self._conn.execute("SELECT NOT EXISTS (SELECT 1 FROM book_minhash)").fetchone()[0]:
+            # Books stored before duplicate detection existed
+            with self._conn:
+                books = self._conn.execute("SELECT id, title FROM books").fetchall()
+                for start in range(0, len(books), 10000):
+                    self._insert_band_keys(books[start:start + 10000])
+        if self._conn.execute("SELECT NOT EXISTS (SELECT 1 FROM shelf_stats)").fetchone()[0]:
+            # Books stored before shelves existed
+            with self._conn:
+                shelf_stats.apply(self._conn, shelf_stats.aggregate(self._conn))
+                self._ensure_shelves(
+                    row[0] for row in self._conn.execute("SELECT DISTINCT shelf_number FROM books")
+                )
+        # The index refers to books by rowid, so it must never be VACUUMed
+        # apart from its table; rebuild_search_index() repairs it if it is
+        indexed = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'").fetchone()
+        self._conn.executescript(SEARCH_SCHEMA)
+        if not indexed:
+            self._conn.execute(
+                "INSERT INTO books_fts (books_fts, rank) VALUES ('rank', ?)",
+                (f"bm25({', '.join(map(str, BM25_WEIGHTS))})",),
+            )
+            self._conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+        self._conn.commit()
+
+    @staticmethod
+    def _book(row) -> Book:
+        data = dict(row)
+        data["on_shelf"] = bool(data["on_shelf"])
+        return Book(**data)
+
+    def _band_keys(self, title) -> list:
+        title = normalize_text(title)
+        return self._minhasher.band_keys(shingles(title)) if title else []
+
+    def _insert_band_keys(self, pairs):
+        """Index ``[(book id, title), ...]``, hashing all titles in one vectorized pass"""
+        pairs = [(book_id, normalize_text(title)) for book_id, title in pairs]
+        pairs = [(book_id, title) for book_id, title in pairs if title]
+        keys = self._minhasher.band_keys_many([shingles(title) for _, title in pairs])
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO book_minhash (band_key, book_id) VALUES (?, ?)",
+            [(key, book_id) for (book_id, _), book_keys in zip(pairs, keys) for key in book_keys],
+        )
+
+    def _delete_band_keys(self, book_id):
+        """Unindex a book's current title; caller holds the lock and transaction"""
+        row = self._conn.execute("SELECT title FROM books WHERE id = ?", (book_id,)).fetchone()
+        if row is not None:
+            self._conn.executemany(
+                "DELETE FROM book_minhash WHERE band_key = ? AND book_id = ?",
+                [(key, book_id) for key in self._band_keys(row["title"])],
+            )
+
+    def _insert(self, books):
+        """INSERT ``Book`` objects, their tags and band keys; caller holds the lock and transaction"""
+        self._forget_unknown_grams()
+        self._conn.executemany(
+            f"INSERT INTO books ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [tuple(_db_value(getattr(book, column)) for column in COLUMNS) for book in books],
+        )
+        self._conn.executemany(
+            "INSERT INTO book_tags (tag, book_id) VALUES (?, ?)",
+            [(tag, book.id) for book in books for tag in split_tags(book.tags)],
+        )
+        self._insert_band_keys([(book.id, book.title) for book in books])
+        counts = Counter()
+        for book in books:
+            shelf_stats.book_counters({field: _db_value(getattr(book, field)) for field in shelf_stats.STAT_FIELDS},
+                                      counts=counts)
+        shelf_stats.apply(self._conn, counts)
+        self._ensure_shelves({book.shelf_number for book in books}, created_at=books[0].created_at if books else None)
+
+    def _ensure_shelves(self, names, created_at=None):
+        """Create the shelves books were just put on; caller holds the lock and transaction"""
+        created_at = created_at or now_iso()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO shelves (name, created_at, updated_at) VALUES (?, ?, ?)",
+            [(name, created_at, created_at) for name in names if name],
+        )
+
+    def _stat_rows(self, book_ids):
+        """``STAT_FIELDS`` of the given books, by id; caller holds the lock"""
+        rows = {}
+        columns = ", ".join(shelf_stats.STAT_FIELDS)
+        book_ids = list(book_ids)
+        for start in range(0, len(book_ids), 500):
+            chunk = book_ids[start:start + 500]
+            for row in self._conn.execute(
+                f"SELECT id, {columns} FROM books WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ):
+                rows[row["id"]] = row
+        return rows
+
+    def create(self, book: BookCreate) -> Book:
+        return self.bulk_insert([book])[0]
+
+    def bulk_insert(self, books, chunk_size=5000) -> list:
+        """Insert many ``BookCreate`` in a single transaction; all or nothing
+
+        Rows go to SQLite in chunks to bound the parameter lists, but nothing
+        is committed until the last chunk succeeds. Returns the new ``Book``s.
+        """
+        timestamp = now_iso()
+        created, chunk = [], []
+        with self._lock, self._conn:
+            for book in books:
+                chunk.append(Book(id=uuid.uuid4().hex, created_at=timestamp, updated_at=timestamp,
+                                  **book.model_dump()))
+                if len(chunk) >= chunk_size:
+                    self._insert(chunk)
+                    created += chunk
+                    chunk = []
+            if chunk:
+                self._insert(chunk)
+                created += chunk
+        return created
+
+    def get(self, book_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+        return self._book(row) if row is not None else None
+
+    def update(self, book_id, update: BookUpdate):
+        """Apply the fields set on ``update``; the updated ``Book``, or None if unknown"""
+        fields = update.model_dump(exclude_unset=True)
+        if fields.get("title", "") is None:
+            del fields["title"]  # a book always keeps its title
+        fields["updated_at"] = now_iso()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        counted = any(name in shelf_stats.STAT_FIELDS for name in fields)
+        with self._lock, self._conn:
+            before = self._stat_rows([book_id]).get(book_id) if counted else None
+            if "title" in fields:
+                self._delete_band_keys(book_id)
+            changed = self._conn.execute(
+                f"UPDATE books SET {assignments} WHERE id = ?",
+                (*(_db_value(value) for value in fields.values()), book_id),
+            ).rowcount
+            if not changed:
+                return None
+            if any(name in SEARCH_FIELDS for name in fields):
+                self._forget_unknown_grams()
+            if "title" in fields:
+                self._insert_band_keys([(book_id, fields["title"])])
+            if "tags" in fields:
+                self._conn.execute("DELETE FROM book_tags WHERE book_id = ?", (book_id,))
+                self._conn.executemany(
+                    "INSERT INTO book_tags (tag, book_id) VALUES (?, ?)",
+                    [(tag, book_id) for tag in split_tags(fields["tags"])],
+                )
+            row = self._conn.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+            if before is not None:
+                counts = shelf_stats.book_counters(before, sign=-1)
+                shelf_stats.apply(self._conn, shelf_stats.book_counters(row, counts=counts))
+                if "shelf_number" in fields:
+                    self._ensure_shelves([row["shelf_number"]], created_at=fields["updated_at"])
+        return self._book(row)
+
+    def delete(self, book_id) -> bool:
+        with self._lock, self._conn:
+            before = self._stat_rows([book_id]).get(book_id)
+            if before is None:
+                return False
+            self._delete_band_keys(book_id)
+            self._conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+            shelf_stats.apply(self._conn, shelf_stats.book_counters(before, sign=-1))
+            return True
+
+    def move_books(self, book_ids, shelf_number):
+        """Put books on a shelf, creating it if needed; ``(moved Books, missing ids)``"""
+        book_ids = list(dict.fromkeys(book_ids))
+        with self._lock, self._conn:
+            books = self._move(book_ids, shelf_number)
+        moved = {book.id for book in books}
+        return books, [book_id for book_id in book_ids if book_id not in moved]
+
+    def _move(self, book_ids, shelf_number):
+        """Moved ``Book``s; caller holds the lock and transaction"""
+        timestamp = now_iso()
+        before = self._stat_rows(book_ids)
+        moved = [book_id for book_id in book_ids if book_id in before]
+        self._conn.executemany(
+            "UPDATE books SET shelf_number = ?, updated_at = ? WHERE id = ?",
+            [(shelf_number, timestamp, book_id) for book_id in moved],
+        )
+        counts = Counter()
+        for row in before.values():
+            shelf_stats.book_counters(row, sign=-1, counts=counts)
+            shelf_stats.book_counters({**dict(row), "shelf_number": shelf_number}, counts=counts)
+        shelf_stats.apply(self._conn, counts)
+        self._ensure_shelves([shelf_number], created_at=timestamp)
+        return self._rows_by_id(moved)
+
+    def _rows_by_id(self, book_ids):
+        books = []
+        for start in range(0, len(book_ids), 500):
+            chunk = book_ids[start:start + 500]
+            books += map(self._book, self._conn.execute(
+                f"SELECT * FROM books WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return books
+
+    # Shelves
+
+    def _counters(self, name=None) -> dict:
+        """``{shelf: {counter: count}}``, of one shelf or all of them; caller holds the lock"""
+        if name is None:
+            rows = self._conn.execute("SELECT shelf, counter, count FROM shelf_stats")
+        else:
+            rows = self._conn.execute("SELECT shelf, counter, count FROM shelf_stats WHERE shelf = ?", (name,))
+        counters = {}
+        for shelf, counter, count in rows:
+            counters.setdefault(shelf, {})[counter] = count
+        return counters
+
+    @staticmethod
+    def _shelf(row, counters) -> Shelf:
+        return Shelf(**dict(row), stats=ShelfStats(**shelf_stats.summarize(counters)))
+
+    def list_shelves(self):
+        """``(shelves, totals, unshelved)``: every ``Shelf`` in natural order, the library's ``ShelfStats``
+        and that of the books without a shelf"""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM shelves").fetchall()
+            counters = self._counters()
+        shelves = sorted((self._shelf(row, counters.get(row["name"], {})) for row in rows),
+                         key=lambda shelf: shelf_sort_key(shelf.name))
+        totals = Counter()
+        for shelf_counters in counters.values():
+            totals.update(shelf_counters)
+        return (shelves, ShelfStats(**shelf_stats.summarize(totals)),
+                ShelfStats(**shelf_stats.summarize(counters.get(shelf_stats.NO_SHELF, {}))))
+
+    def get_shelf(self, name):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM shelves WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            return self._shelf(row, self._counters(name).get(name, {}))
+
+    def create_shelf(self, shelf: ShelfCreate) -> Shelf:
+        timestamp = now_iso()
+        with self._lock, self._conn:
+            try:
+                self._conn.execute(
+                    "INSERT INTO shelves (name, description, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (shelf.name, shelf.description, timestamp, timestamp),
+                )
+            except sqlite3.IntegrityError:
+                raise ShelfExists(f"There is already a shelf named {shelf.name!r}") from None
+        return Shelf(**shelf.model_dump(), created_at=timestamp, updated_at=timestamp)
+
+    def update_shelf(self, name, update: ShelfUpdate):
+        """Rename or describe a shelf; ``(Shelf, Books moved by a rename)``, or ``(None, [])`` if unknown
+
+        A rename carries the shelf's books and counters to the new name.
+        """
+        fields = update.model_dump(exclude_unset=True)
+        if fields.get("name", "") in (None, name):
+            del fields["name"]
+        fields["updated_at"] = now_iso()
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        moved = []
+        with self._lock, self._conn:
+            if "name" in fields and self._conn.execute(
+                "SELECT 1 FROM shelves WHERE name = ?", (fields["name"],)
+            ).fetchone():
+                raise ShelfExists(f"There is already a shelf named {fields['name']!r}")
+            if not self._conn.execute(
+                f"UPDATE shelves SET {assignments} WHERE name = ?", (*fields.values(), name)
+            ).rowcount:
+                return None, []
+            if "name" in fields:
+                book_ids = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM books WHERE shelf_number = ?", (name,)
+                )]
+                self._conn.execute(
+                    "UPDATE books SET shelf_number = ?, updated_at = ? WHERE shelf_number = ?",
+                    (fields["name"], fields["updated_at"], name),
+                )
+                self._conn.execute("UPDATE shelf_stats SET shelf = ? WHERE shelf = ?", (fields["name"], name))
+                moved = self._rows_by_id(book_ids)
+                name = fields["name"]
+            row = self._conn.execute("SELECT * FROM shelves WHERE name = ?", (name,)).fetchone()
+            shelf = self._shelf(row, self._counters(name).get(name, {}))
+        return shelf, moved
+
+    def delete_shelf(self, name, move_to=None):
+        """Remove a shelf; ``(deleted, Books moved to move_to)``
+
+        Raises ``ShelfNotEmpty`` if books are still on it and ``move_to`` is None.
+        """
+        with self._lock, self._conn:
+            if not self._conn.execute("SELECT 1 FROM shelves WHERE name = ?", (name,)).fetchone():
+                return False, []
+            book_ids = [row[0] for row in self._conn.execute("SELECT id FROM books WHERE shelf_number = ?", (name,))]
+            if book_ids and move_to in (None, name):
+                raise ShelfNotEmpty(f"Shelf {name!r} still holds {len(book_ids)} books")
+            moved = self._move(book_ids, move_to) if book_ids else []
+            self._conn.execute("DELETE FROM shelves WHERE name = ?", (name,))
+            self._conn.execute("DELETE FROM shelf_stats WHERE shelf = ?", (name,))
+        return True, moved
+
+    def rebuild_shelf_stats(self, check_only=False) -> dict:
+        """Recount every shelf from the books table and repair stored counters that differ
+
+        Returns ``{shelf: {counter: [stored, recounted]}}`` of the counters
+        that had drifted; with ``check_only`` nothing is written.
+        """
+        with self._lock, self._conn:
+            recounted = shelf_stats.aggregate(self._conn)
+            current = shelf_stats.stored(self._conn)
+            drifted = {}
+            for shelf, counter in sorted(set(recounted) | set(current)):
+                if recounted[shelf, counter] != current[shelf, counter]:
+                    drifted.setdefault(shelf, {})[counter] = [current[shelf, counter], recounted[shelf, counter]]
+            if drifted and not check_only:
+                self._conn.execute("DELETE FROM shelf_stats")
+                shelf_stats.apply(self._conn, recounted)
+            if not check_only:
+                self._ensure_shelves(
+                    row[0] for row in self._conn.execute("SELECT DISTINCT shelf_number FROM books")
+                )
+        return drifted
+
+    def page(self, limit=50, cursor=None, sort="title", descending=False, tag=None, **filters):
+        """One page of books and the cursor of the next page (None on the last)
+
+        ``filters`` match columns in ``FILTERS`` exactly; ``tag`` matches one tag.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort {sort!r}, expected one of {', '.join(SORT_KEYS)}")
+        key = SORT_KEYS[sort]
+        where, params = [], []
+        for name, value in filters.items():
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter {name!r}")
+            if value is not None:
+                where.append(f"{name} = ?")
+                params.append(_db_value(value))
+        if tag:
+            where.append("id IN (SELECT book_id FROM book_tags WHERE tag = ?)")
+            params.append(tag.strip().lower())
+        if cursor:
+            value, book_id = decode_cursor(cursor, sort)
+            op = "<" if descending else ">"
+            # The plain bound lets SQLite seek the expression index (author);
+            # the row-value comparison alone would scan it
+            where.append(f"{key} {op}= ? AND ({key}, id) {op} (?, ?)")
+            params += [value, value, book_id]
+
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT *, {key} AS sort_value FROM books"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + f" ORDER BY {key} {direction}, id {direction} LIMIT ?"
+        )
+        with self._lock:
+            # One extra row tells whether another page follows
+            rows = self._conn.execute(sql, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1]["sort_value"], rows[-1]["id"])
+        books = []
+        for row in rows:
+            data = dict(row)
+            del data["sort_value"]
+            books.append(self._book(data))
+        return books, next_cursor
+
+    def iter_books(self, batch_size=1000, sort="created_at", tag=None, **filters):
+        """Every matching book, read ``batch_size`` at a time; the lock is held per batch only"""
+        cursor = None
+        while True:
+            books, cursor = self.page(limit=batch_size, cursor=cursor, sort=sort, tag=tag, **filters)
+            yield from books
+            if cursor is None:
+                return
+
+    def _forget_unknown_grams(self):
+        """New text may hold trigrams cached as absent; counts of known ones may drift a little"""
+        self._gram_docs = {gram: docs for gram, docs in self._gram_docs.items() if docs}
+
+    def _frequencies(self, grams) -> dict:
+        """Books holding each trigram, 0 for none; caller holds the lock"""
+        if len(self._gram_docs) > GRAM_CACHE_SIZE:
+            self._gram_docs = {}
+        for gram in grams:
+            if gram not in self._gram_docs:
+                row = self._conn.execute("SELECT doc FROM books_fts_vocab WHERE term = ?", (gram,)).fetchone()
+                self._gram_docs[gram] = row[0] if row is not None else 0
+        return {gram: self._gram_docs[gram] for gram in grams}
+
+    def _matches(self, match, limit, ranked=True):
+        return self._conn.execute(
+            "SELECT books.* FROM books_fts JOIN books ON books.rowid = books_fts.rowid "
+            f"WHERE books_fts MATCH ? {'ORDER BY rank' if ranked else ''} LIMIT ?",
+            (match, limit),
+        ).fetchall()
+
+    def _similar(self, grams, frequency, candidates):
+        """Rows sharing the most trigrams with the query (ScanCount over posting lists)"""
+        rarest = sorted((gram for gram in grams if frequency.get(gram)), key=frequency.get)
+        chosen, postings = [], 0
+        for gram in rarest:
+            if len(chosen) >= FUZZY_MIN_TERMS and postings + frequency[gram] > FUZZY_POSTINGS_BUDGET:
+                break
+            chosen.append(gram)
+            postings += frequency[gram]
+        shared = Counter()
+        for gram in chosen:
+            shared.update(row[0] for row in self._conn.execute(
+                "SELECT rowid FROM books_fts WHERE books_fts MATCH ?", (fts_phrase(gram),)
+            ))
+        best = [rowid for rowid, _ in shared.most_common(candidates)]
+        return self._conn.execute(
+            f"SELECT * FROM books WHERE rowid IN ({', '.join('?' * len(best))})", best
+        ).fetchall()
+
+    def search(self, query, limit=20, min_score=0.3, candidates=100):
+        """``[(score, Book), ...]`` best first, tolerating OCR-style misspellings
+
+        Candidates are books containing every query word of three or more
+        characters, ranked by bm25; a word that cannot be in any book (one of
+        its trigrams is unknown) only needs to share some trigrams. Queries
+        of shorter words only are matched by substring (``_search_short``). When none of them is a close
+        match, books sharing the most of the query's rarest trigrams are
+        added. All are scored by ``book_search.score``.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        grams = trigrams(fold(text))
+        # The index holds text as written, so look up both spellings
+        long_grams = sorted(gram for gram in grams | trigrams(text) if len(gram) == 3)
+        if not long_grams:
+            return self._search_short(text, limit, min_score, candidates)
+
+        with self._lock:
+            frequency = self._frequencies(long_grams)
+            clauses = []  # (FTS5 clause, most books it can match)
+            for word in text.split():
+                if len(word) < 3:
+                    continue
+                # At most as many books hold a word as hold its rarest trigram
+                docs = min(frequency[gram] for gram in trigrams(word))
+                if docs:
+                    clauses.append((fts_phrase(word), docs))
+                    continue
+                # A misreading: any of its trigrams (either spelling) will do
+                present = sorted(gram for gram in trigrams(word) | trigrams(fold(word)) if frequency.get(gram))
+                if present:
+                    clauses.append((
+                        "(" + " OR ".join(map(fts_phrase, present)) + ")",
+                        sum(frequency[gram] for gram in present),
+                    ))
+            rows = []
+            if clauses:
+                ranked = len(clauses) > 1 or clauses[0][1] <= RANKED_MAX_DOCS
+                rows = self._matches(" AND ".join(clause for clause, _ in clauses), candidates, ranked)
+
+        scored = {row["id"]: (score(grams, row), row) for row in rows}
+        if max((relevance for relevance, _ in scored.values()), default=0) < CLOSE_MATCH_SCORE:
+            # A misread letter can also make a real but wrong word
+            with self._lock:
+                rows = self._similar(long_grams, frequency, candidates)
+            for row in rows:
+                if row["id"] not in scored:
+                    scored[row["id"]] = (score(grams, row), row)
+        return self._hits(scored.values(), limit, min_score)
+
+    def _search_short(self, text, limit, min_score, candidates):
+        """Queries of words too short for trigrams (``村上``, ``森``, ``oz``)
+
+        Books holding every word anywhere in a searchable field: title
+        prefixes first, which idx_books_title serves, then a scan that stops
+        at ``candidates`` books.
+        """
+        words = text.split()
+        escaped = [word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") for word in words]
+        any_field = "(" + " OR ".join(f"{name} LIKE ? ESCAPE '\\'" for name in SEARCH_FIELDS) + ")"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM books WHERE title LIKE ? ESCAPE '\\' ORDER BY title LIMIT ?",
+                (" ".join(escaped) + "%", candidates),
+            ).fetchall()
+            rows += self._conn.execute(
+                f"SELECT * FROM books WHERE {' AND '.join([any_field] * len(words))} LIMIT ?",
+                (*("%" + word + "%" for word in escaped for _ in SEARCH_FIELDS), candidates),
+            ).fetchall()
+        grams = trigrams(fold(text))
+        return self._hits({row["id"]: (score(grams, row), row) for row in rows}.values(), limit, min_score)
+
+    def _hits(self, scored, limit, min_score):
+        hits = sorted(
+            (hit for hit in scored if hit[0] >= min_score), key=lambda hit: (-hit[0], hit[1]["title"], hit[1]["id"])
+        )
+        return [(relevance, self._book(row)) for relevance, row in hits[:limit]]
+
+    def find_duplicates(self, book, limit=5, min_score=0.8, exclude_id=None, candidates=50):
+        """``[(score, Book), ...]`` of stored books likely to be ``book``, best first
+
+        ``book`` is a model or mapping with ``title`` and optionally ``author``
+        and ``isbn``. Candidates share the ISBN or MinHash bands with the
+        title; the ``candidates`` sharing the most bands are compared.
+        """
+        fields = book if isinstance(book, dict) else book.model_dump()
+        keys = self._band_keys(fields.get("title"))
+        if not keys and not fields.get("isbn"):
+            return []
+        postings = " UNION ALL ".join(
+            "SELECT * FROM (SELECT book_id FROM book_minhash WHERE band_key = ? LIMIT ?)" for _ in keys
+        ) or "SELECT NULL AS book_id"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM books WHERE id IN ("
+                "SELECT id FROM books WHERE isbn = ? UNION SELECT * FROM ("
+                f"SELECT book_id FROM ({postings}) GROUP BY book_id ORDER BY count(*) DESC LIMIT ?))",
+                (fields.get("isbn") or None, *(value for key in keys for value in (key, BAND_POSTINGS_MAX)), candidates),
+            ).fetchall()
+        matches = []
+        for row in rows:
+            if row["id"] == exclude_id:
+                continue
+            relevance = duplicate_score(fields, dict(row))
+            if relevance >= min_score:
+                matches.append((relevance, row))
+        matches.sort(key=lambda match: (-match[0], match[1]["created_at"]))
+        return [(relevance, self._book(row)) for relevance, row in matches[:limit]]
+
+    def rebuild_search_index(self):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
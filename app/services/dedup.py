@@ -0,0 +1,139 @@
+# app/services/dedup.py
+"""Near-duplicate books: normalized keys, MinHash signatures and LSH bands
+
+Titles are normalized (NFKC, casefolded, punctuation stripped) and cut into
+character trigrams. A MinHash signature of those trigrams is split into
+bands; books sharing any band hash are candidates, so finding them is a
+few index lookups however large the library grows. Candidates are then
+compared exactly by ``duplicate_score``.
+
+With 10 bands of 3 rows, titles with trigram Jaccard similarity 0.8 collide
+in practice always (99.9%), 0.5 three times out of four, 0.3 one in four.
+"""
+import functools
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+NUM_BANDS = 10
+ROWS_PER_BAND = 3
+_PRIME = 4294967311  # first prime above 2**32
+_PUNCTUATION = re.compile(r"[\W_]+")
+# Characters OCR reads for one another, mapped to one spelling before comparing
+_OCR_CONFUSIONS = (("rn", "m"), ("vv", "w"), ("0", "o"), ("1", "l"), ("|", "l"))
+
+
+# One side of every comparison is the same book, checked against each candidate
+@functools.lru_cache(maxsize=4096)
+def normalize_text(text) -> str:
+    """NFKC, casefolded, OCR look-alikes folded, punctuation replaced by spaces"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    for seen, meant in _OCR_CONFUSIONS:
+        text = text.replace(seen, meant)
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def author_key(author) -> str:
+    """Name parts in sorted order: "Rowling, J.K." and "J. K. Rowling" agree"""
+    return " ".join(sorted(normalize_text(author).split()))
+
+
+@functools.lru_cache(maxsize=4096)
+def shingles(text) -> frozenset:
+    """Character trigrams of a normalized text, padded so short titles have some"""
+    padded = f" {text} "
+    return frozenset(padded[i:i + 3] for i in range(max(1, len(padded) - 2)))
+
+
+def jaccard(a, b) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def containment(a, b) -> float:
+    """Share of the smaller set found in the larger one"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class MinHasher:
+    """Fixed random permutations, so signatures are comparable across runs"""
+
+    def __init__(self, bands=NUM_BANDS, rows=ROWS_PER_BAND, seed=1):
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        permutations = bands * rows
+        # a < 2**31 keeps a * hash + b below 2**64
+        self._a = rng.integers(1, 2 ** 31, permutations, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 2 ** 32, permutations, dtype=np.uint64)[:, None]
+        # Odd multipliers folding a band's rows into one hash (wrapping uint64)
+        self._mix = rng.integers(0, 2 ** 63, rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._band_ids = np.arange(bands, dtype=np.uint64) << np.uint64(32)
+
+    def signatures(self, gram_sets) -> np.ndarray:
+        """MinHash signature per set of grams, shape (len(gram_sets), bands * rows)"""
+        lengths = [len(grams) for grams in gram_sets]
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode()) for grams in gram_sets for gram in grams), dtype=np.uint64, count=sum(lengths)
+        )
+        values = (self._a * hashes + self._b) % np.uint64(_PRIME)
+        starts = np.cumsum([0] + lengths[:-1])
+        return np.minimum.reduceat(values, starts, axis=1).T
+
+    def band_keys_many(self, gram_sets, chunk_size=1000) -> list:
+        """Band keys for many non-empty gram sets at once; see ``band_keys``"""
+        keys = []
+        for start in range(0, len(gram_sets), chunk_size):
+            signatures = self.signatures(gram_sets[start:start + chunk_size])
+            bands = signatures.reshape(len(signatures), self.bands, self.rows)
+            with np.errstate(over="ignore"):
+                mixed = (bands * self._mix).sum(axis=2, dtype=np.uint64)
+            keys += (self._band_ids | (mixed >> np.uint64(32))).tolist()
+        return keys
+
+    def band_keys(self, grams) -> list:
+        """One key per band: band number in the high bits, band hash in the low 32"""
+        return self.band_keys_many([grams])[0] if grams else []
+
+
+def title_similarity(a, b) -> float:
+    """Trigram similarity of two normalized titles
+
+    A title cut short by OCR or typing ("Dune" for "Dune: Messiah of the
+    Desert") is mostly contained in the full one, so containment counts,
+    slightly discounted, when both start alike and the shorter title is long
+    enough to mean something.
+    """
+    grams_a, grams_b = shingles(a), shingles(b)
+    similarity = jaccard(grams_a, grams_b)
+    if min(len(a), len(b)) >= 12 and a.split()[0] == b.split()[0]:
+        similarity = max(similarity, 0.9 * containment(grams_a, grams_b))
+    return similarity
+
+
+def author_similarity(a, b):
+    """Similarity of two author keys; None when either is unknown"""
+    if not a or not b:
+        return None
+    if a == b:
+        return 1.0
+    return jaccard(shingles(a), shingles(b))
+
+
+def duplicate_score(candidate, book) -> float:
+    """How likely two books (mappings with title, author, isbn) are the same, 0-1
+
+    Equal ISBNs settle it; different ones rule it out. Otherwise the title
+    decides, discounted by up to a quarter when both authors are known and
+    differ, so the same title by someone else is not flagged.
+    """
+    if candidate.get("isbn") and book.get("isbn"):
+        return 1.0 if candidate["isbn"] == book["isbn"] else 0.0
+    title = title_similarity(normalize_text(candidate.get("title")), normalize_text(book.get("title")))
+    author = author_similarity(author_key(candidate.get("author")), author_key(book.get("author")))
+    if author is None:
+        return round(title, 4)
+    return round(title * (0.75 + 0.25 * author), 4)
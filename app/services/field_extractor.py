@@ -0,0 +1,164 @@
+# app/services/field_extractor.py
+"""Title, author, translator and publisher extraction from OCR lines
+
+Field rules are regular expressions loaded from JSON (``field_rules.json``,
+plus ``OCR_FIELD_RULES_PATH`` when set) and compiled into one pattern, so
+each OCR line is matched once. The title is picked from the text geometry:
+cover titles are printed larger, and higher up, than anything else.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+
+FIELDS = ("translator", "publisher", "author")  # precedence when a line matches several
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "field_rules.json")
+
+TITLE_MIN_CONFIDENCE = 0.4
+TITLE_LINE_RATIO = 0.75  # lines at least this tall relative to the title join it
+AUTHOR_MIN_CONFIDENCE = 0.7
+AUTHOR_MAX_WORDS = 4
+
+logger = logging.getLogger(__name__)
+
+
+def load_rules(*paths) -> dict:
+    """``{field: [pattern, ...]}`` from JSON files; later files add to earlier ones"""
+    rules = {field: [] for field in FIELDS}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for field, patterns in data.items():
+            if field.startswith("_"):
+                continue
+            if field not in rules:
+                raise ValueError(f"{path}: unknown field {field!r} (expected one of {', '.join(FIELDS)})")
+            rules[field].extend(patterns)
+    return rules
+
+
+def needs_cjk(pattern) -> bool:
+    """True when ``pattern`` has a literal CJK character, so can't match ASCII-only text"""
+    in_class = escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif not in_class and ord(char) >= 0x2E80:
+            return True
+    return False
+
+
+def compile_rules(rules: dict, ascii_only=False) -> re.Pattern:
+    """One alternation with a ``<field>__<n>`` group per rule
+
+    A single ``search`` finds the leftmost match in the line; rules matching
+    at the same position are tried in ``FIELDS`` order. ``ascii_only`` leaves
+    out the rules that can't match ASCII text.
+    """
+    alternatives = []
+    for field in FIELDS:
+        for n, pattern in enumerate(rules.get(field, ())):
+            if re.compile(pattern).groupindex.keys() != {"value"}:
+                raise ValueError(f"{field} rule {pattern!r} needs exactly one (?P<value>...) group")
+            if ascii_only and needs_cjk(pattern):
+                continue
+            alternatives.append("(?:" + pattern.replace("(?P<value>", f"(?P<{field}__{n}>") + ")")
+    if not alternatives:
+        return re.compile(r"(?!)")  # matches nothing
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+def vertical_extent(bbox):
+    """``(top, height)`` of an EasyOCR box: corners clockwise from top-left"""
+    top = min(bbox[0][1], bbox[1][1])
+    return float(top), float(max(bbox[2][1], bbox[3][1]) - top)
+
+
+class FieldExtractor:
+    def __init__(self, rules: dict):
+        # Digest of the rules, so results cached under other rules are not reused
+        self.version = hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:12]
+        self.pattern = compile_rules(rules)
+        # Most cover text is plain ASCII; skip the CJK rules' whole-line scans for it
+        self.ascii_pattern = compile_rules(rules, ascii_only=True)
+
+    def match(self, text):
+        """``(field, value)`` for the first rule matching ``text``, else None"""
+        m = (self.ascii_pattern if text.isascii() else self.pattern).search(text)
+        if m is None:
+            return None
+        return m.lastgroup.split("__", 1)[0], m.group(m.lastgroup).strip()
+
+    def title_lines(self, text_list):
+        """Indices of the lines forming the title, top to bottom
+
+        The tallest confident line is the title; lines nearly as tall that sit
+        directly above or below it (a title wrapped over several lines) join it.
+        """
+        candidates = [
+            (i, *vertical_extent(item["bbox"])[::-1])
+            for i, item in enumerate(text_list)
+            if item["confidence"] >= TITLE_MIN_CONFIDENCE and item["text"]
+        ]
+        if not candidates:
+            return []
+        # Tallest first; higher on the cover and more confident break ties
+        best, height, top = max(candidates, key=lambda c: (c[1], -c[2], text_list[c[0]]["confidence"]))
+        if height <= 0:
+            return [best]
+
+        lines = {best: top}
+        above, below = top, top + height
+        tall = sorted((c for c in candidates if c[0] != best and c[1] >= height * TITLE_LINE_RATIO),
+                      key=lambda c: c[2])
+        for i, h, t in tall:
+            if 0 <= t - below <= height:  # next line down
+                lines[i] = t
+                below = t + h
+        for i, h, t in reversed(tall):
+            if i not in lines and 0 <= above - (t + h) <= height:  # line above
+                lines[i] = t
+                above = t
+        return sorted(lines, key=lines.get)
+
+    def extract(self, text_list) -> dict:
+        """``parse_book_info`` fields from filtered detections"""
+        info = {"title": "", "author": "", "translator": "", "publisher": ""}
+        title = self.title_lines(text_list)
+        info["title"] = " ".join(text_list[i]["text"] for i in title)
+        title = set(title)
+
+        unmatched = []
+        for i, item in enumerate(text_list):
+            if i in title:
+                continue
+            found = self.match(item["text"])
+            if found is None:
+                unmatched.append(item)
+            elif not info[found[0]]:
+                info[found[0]] = found[1]
+
+        if not info["author"]:
+            # A short, confident line that matched no rule is most likely the author's name
+            for item in sorted(unmatched, key=lambda x: -x["confidence"]):
+                if item["confidence"] > AUTHOR_MIN_CONFIDENCE and len(item["text"].split()) <= AUTHOR_MAX_WORDS:
+                    info["author"] = item["text"]
+                    break
+        return info
+
+
+@lru_cache(maxsize=None)
+def get_extractor(extra_rules_path=None) -> FieldExtractor:
+    """Shared extractor for the bundled rules plus an optional rules file"""
+    paths = [DEFAULT_RULES_PATH] + ([extra_rules_path] if extra_rules_path else [])
+    extractor = FieldExtractor(load_rules(*paths))
+    logger.info(f"Field extraction rules loaded from {', '.join(paths)}")
+    return extractor
@@ -0,0 +1,214 @@
+# app/services/metrics.py
+"""Minimal Prometheus metrics (text exposition format 0.0.4)
+
+Process-wide counters and histograms live in ``REGISTRY``; point-in-time
+values owned by other objects (pool sizes, queue depths) are rendered at
+scrape time with ``gauge_family`` (see ``app/routes/metrics_routes.py``).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def observe_many(self, values, **labels):
+        """``observe`` each of ``values`` under one lock"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for value in values:
+                series[bisect.bisect_left(self.buckets, value)] += 1
+                series[-2] += value
+                series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = self.header()
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+def gauge_family(name, documentation, samples, kind="gauge"):
+    """Render a metric family from ``[(labels dict, value), ...]`` collected at scrape time"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(tuple(labels.items()))} {_format_value(value)}")
+    return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> list:
+        """Exposition lines for every registered metric"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return lines
+
+
+REGISTRY = Registry()
+
+OCR_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "bookkeeper_ocr_stage_seconds", "Time spent in each OCR pipeline stage", ["stage"]
+))
+OCR_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "bookkeeper_ocr_request_seconds", "End-to-end OCR time per cover, including cache lookups", ["outcome"]
+))
+OCR_RESULTS = REGISTRY.register(Counter(
+    "bookkeeper_ocr_results_total", "Processed covers by outcome (success, empty, failure, cache_hit, barcode)", ["outcome"]
+))
+OCR_CONFIDENCE = REGISTRY.register(Histogram(
+    "bookkeeper_ocr_text_confidence", "Recognition confidence of every detected text region",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+))
+
+
+_local = threading.local()
+
+
+class StageTimer:
+    """Per-request breakdown of OCR stage durations
+
+    While ``active()``, every ``stage()`` run on the same thread is added to
+    this timer as well as to ``OCR_STAGE_SECONDS``. OCR jobs run entirely on
+    one executor thread, so services don't need the timer passed around.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def active(self):
+        previous = getattr(_local, "timer", None)
+        _local.timer = self
+        try:
+            yield self
+        finally:
+            _local.timer = previous
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value, durations in milliseconds"""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+
+@contextmanager
+def stage(name):
+    """Time one OCR pipeline stage (see ``StageTimer``)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        OCR_STAGE_SECONDS.observe(elapsed, stage=name)
+        timer = getattr(_local, "timer", None)
+        if timer is not None:
+            timer.add(name, elapsed)
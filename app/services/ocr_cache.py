@@ -0,0 +1,245 @@
+# app/services/ocr_cache.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def image_digest(img: np.ndarray) -> str:
+    """Content hash of the decoded pixels, independent of file encoding/metadata"""
+    digest = hashlib.sha256()
+    digest.update(str(img.shape).encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+
+def perceptual_hash(img: np.ndarray) -> int:
+    """64-bit difference hash (dHash); near-duplicate photos differ in few bits"""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _json_default(value):
+    # easyocr returns numpy scalars inside bboxes and confidences
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MemoryCacheTier:
+    """Size-bounded LRU with per-entry TTL"""
+
+    def __init__(self, max_entries=256, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, config, phash, result)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[3]
+
+    def find_similar(self, config, phash, max_distance):
+        """Closest unexpired entry for the same config within ``max_distance`` bits"""
+        now = time.time()
+        best_key, best_distance = None, max_distance + 1
+        with self._lock:
+            for key, (expires_at, entry_config, entry_phash, _) in self._entries.items():
+                if expires_at < now or entry_config != config or entry_phash is None:
+                    continue
+                distance = hamming_distance(phash, entry_phash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return self.get(best_key) if best_key is not None else None
+
+    def put(self, key, config, phash, result):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, config, phash, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheTier:
+    """Optional on-disk tier so results survive restarts"""
+
+    def __init__(self, path, ttl=86400, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS ocr_cache (
+                key TEXT PRIMARY KEY,
+                config TEXT NOT NULL,
+                phash INTEGER,
+                result TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_expires ON ocr_cache (expires_at)")
+        self._conn.commit()
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, config, phash FROM ocr_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, key, config, phash, result):
+        payload = json.dumps(result, default=_json_default)
+        # SQLite integers are signed 64-bit
+        stored_phash = phash - (1 << 64) if phash is not None and phash >= (1 << 63) else phash
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, config, phash, result, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (key, config, stored_phash, payload, time.time() + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM ocr_cache WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            """DELETE FROM ocr_cache WHERE key IN (
+                SELECT key FROM ocr_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OCRResultCache:
+    """Content-addressed cache of successful ``process_book_cover`` results
+
+    Keys are the SHA-256 of the decoded pixels plus the OCR config (language
+    set, target language, ...), so a hit skips preprocessing, detection and
+    recognition entirely. With ``perceptual=True`` an exact miss falls back
+    to the closest in-memory entry whose dHash is within ``max_distance``
+    bits, catching re-encoded or slightly re-cropped photos of the same cover.
+    """
+
+    def __init__(self, max_entries=256, ttl=86400, disk_path=None, perceptual=False, max_distance=4):
+        self.memory = MemoryCacheTier(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteCacheTier(disk_path, ttl=ttl) if disk_path else None
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "near_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def config_key(**config) -> str:
+        return json.dumps(config, sort_keys=True, default=str)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, img: np.ndarray, config: str):
+        """Cached result for ``img`` under ``config``, or None"""
+        key = self._key(img, config)
+
+        result = self.memory.get(key)
+        if result is not None:
+            self._count("hits")
+            return copy.deepcopy(result)
+
+        if self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error as e:
+                self.logger.error(f"OCR cache read failed: {e}")
+                row = None
+            if row is not None:
+                result, _, phash = row
+                if phash is not None and phash < 0:
+                    phash += 1 << 64
+                self.memory.put(key, config, phash, result)
+                self._count("disk_hits")
+                return copy.deepcopy(result)
+
+        if self.perceptual:
+            result = self.memory.find_similar(config, perceptual_hash(img), self.max_distance)
+            if result is not None:
+                self._count("near_hits")
+                return copy.deepcopy(result)
+
+        self._count("misses")
+        return None
+
+    def put(self, img: np.ndarray, config: str, result: dict):
+        """Store a successful result; failures are never cached"""
+        if not result.get("success"):
+            return
+        key = self._key(img, config)
+        phash = perceptual_hash(img) if self.perceptual else None
+        self.memory.put(key, config, phash, copy.deepcopy(result))
+        if self.disk is not None:
+            try:
+                self.disk.put(key, config, phash, result)
+            except (sqlite3.Error, TypeError) as e:
+                self.logger.error(f"OCR cache write failed: {e}")
+        self._count("stores")
+
+    def _key(self, img, config):
+        return hashlib.sha256(f"{image_digest(img)}|{config}".encode()).hexdigest()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["near_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = lookups - counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None,
+            "perceptual": self.perceptual,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,125 @@
+# app/services/ocr_executor.py
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.ocr_service import OCRCancelled
+
+
+class OCRQueueFull(Exception):
+    """Raised when the admission queue is full; callers should retry later"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("OCR queue is full, please retry later")
+        self.retry_after = retry_after
+
+
+class OCRTimeout(Exception):
+    """Raised when an OCR job exceeds its per-request timeout"""
+
+
+class OCRExecutor:
+    """Runs blocking OCR work on dedicated threads, off the event loop
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a thread. Anything beyond that is rejected immediately with
+    ``OCRQueueFull`` instead of piling up latency.
+    """
+
+    def __init__(self, max_workers=1, max_queue=8, retry_after=5, disconnect_poll_interval=0.5):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after = retry_after
+        self.disconnect_poll_interval = disconnect_poll_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._cancelled = 0
+
+    def _admit(self) -> bool:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def submit(self, fn, *args, timeout=None, request=None, **kwargs):
+        """Run ``fn(*args, cancel=event, **kwargs)`` on a worker thread
+
+        ``cancel`` is a ``threading.Event`` set when the request times out,
+        the client disconnects (when ``request`` is given) or the awaiting
+        task is cancelled; ``fn`` should check it between expensive steps.
+        """
+        if not self._admit():
+            raise OCRQueueFull(self.retry_after)
+
+        cancel = threading.Event()
+
+        def job():
+            # Skip work that was abandoned while still waiting for a thread
+            if cancel.is_set():
+                raise OCRCancelled("OCR job cancelled before it started")
+            return fn(*args, cancel=cancel, **kwargs)
+
+        try:
+            concurrent_future = self._executor.submit(job)
+        except Exception:
+            self._release()
+            raise
+        # The slot is held until the thread actually finishes, even if the caller gave up
+        concurrent_future.add_done_callback(self._release)
+        future = asyncio.wrap_future(concurrent_future)
+        # Don't warn about exceptions of jobs nobody waits for any more
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        watcher = asyncio.ensure_future(self._wait_for_disconnect(request)) if request is not None else None
+        try:
+            waiters = {future} if watcher is None else {future, watcher}
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if future in done:
+                return future.result()
+
+            cancel.set()
+            concurrent_future.cancel()
+            if watcher is not None and watcher in done:
+                with self._lock:
+                    self._cancelled += 1
+                raise OCRCancelled("Client disconnected")
+            with self._lock:
+                self._timeouts += 1
+            raise OCRTimeout(f"OCR did not finish within {timeout}s")
+        except asyncio.CancelledError:
+            cancel.set()
+            concurrent_future.cancel()
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    async def _wait_for_disconnect(self, request):
+        while not await request.is_disconnected():
+            await asyncio.sleep(self.disconnect_poll_interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "cancelled": self._cancelled,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
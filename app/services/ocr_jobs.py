@@ -0,0 +1,400 @@
+# app/services/ocr_jobs.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.services import ocr_runner
+from app.services.ocr_cache import _json_default
+from app.services.ocr_executor import OCRQueueFull, OCRTimeout
+from app.services.ocr_pool import PoolTimeout
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class OCRJobStore:
+    """SQLite persistence for OCR jobs, so pending work survives a restart
+
+    Uploaded image bytes are kept only until their result is stored.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ocr_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                target_language TEXT,
+                total INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS ocr_job_items (
+                job_id TEXT NOT NULL REFERENCES ocr_jobs (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                image BLOB,
+                result TEXT,
+                elapsed_ms REAL,
+                PRIMARY KEY (job_id, position)
+            );
+            -- Photos queued offline by the web client, under IDs the client
+            -- made up; a retried upload finds its capture here instead of
+            -- starting a second OCR run
+            CREATE TABLE IF NOT EXISTS ocr_captures (
+                capture_id TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL REFERENCES ocr_jobs (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ocr_captures_job ON ocr_captures (job_id);
+            """
+        )
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.commit()
+
+    def create(self, images, target_language=None) -> str:
+        with self._lock, self._conn:
+            return self._create(images, target_language)
+
+    def _create(self, images, target_language):
+        """Insert a pending job; caller holds the lock and transaction"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO ocr_jobs (id, status, target_language, total, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, PENDING, target_language, len(images), now, now),
+        )
+        self._conn.executemany(
+            "INSERT INTO ocr_job_items (job_id, position, filename, image) VALUES (?, ?, ?, ?)",
+            [(job_id, position, filename, bytes(image)) for position, (filename, image) in enumerate(images)],
+        )
+        return job_id
+
+    def create_captures(self, captures, target_language=None):
+        """One job for the ``[(capture_id, filename, image bytes), ...]`` not seen before
+
+        Returns the new job's id (None if every capture was already known)
+        and the ids of the captures it holds. The check and the insert share
+        one write transaction, so concurrent retries from several server
+        processes still create each capture once.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                known = self._known_captures([capture_id for capture_id, _, _ in captures])
+                new, seen = [], set(known)
+                for capture in captures:
+                    if capture[0] not in seen:
+                        seen.add(capture[0])
+                        new.append(capture)
+                job_id = None
+                if new:
+                    job_id = self._create([(filename, image) for _, filename, image in new], target_language)
+                    self._conn.executemany(
+                        "INSERT INTO ocr_captures (capture_id, job_id, position) VALUES (?, ?, ?)",
+                        [(capture_id, job_id, position) for position, (capture_id, _, _) in enumerate(new)],
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return job_id, [capture_id for capture_id, _, _ in new]
+
+    def _known_captures(self, capture_ids):
+        known = set()
+        for start in range(0, len(capture_ids), 500):
+            chunk = capture_ids[start:start + 500]
+            known.update(row[0] for row in self._conn.execute(
+                f"SELECT capture_id FROM ocr_captures WHERE capture_id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return known
+
+    def captures(self, capture_ids):
+        """``{capture_id: {job_id, status, error, filename, result, elapsed_ms}}`` of the known captures
+
+        ``status`` is the job's, except that an image whose result is stored
+        is ``completed`` while the rest of its job runs.
+        """
+        found = {}
+        with self._lock:
+            for start in range(0, len(capture_ids), 500):
+                chunk = capture_ids[start:start + 500]
+                rows = self._conn.execute(
+                    "SELECT c.capture_id, c.job_id, j.status, j.error, i.filename, i.result, i.elapsed_ms "
+                    "FROM ocr_captures c JOIN ocr_jobs j ON j.id = c.job_id "
+                    "JOIN ocr_job_items i ON i.job_id = c.job_id AND i.position = c.position "
+                    f"WHERE c.capture_id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    found[row["capture_id"]] = {
+                        "job_id": row["job_id"],
+                        "status": COMPLETED if row["result"] else row["status"],
+                        "error": row["error"],
+                        "filename": row["filename"],
+                        "result": json.loads(row["result"]) if row["result"] else None,
+                        "elapsed_ms": row["elapsed_ms"],
+                    }
+        return found
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ocr_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def pending_images(self, job_id):
+        """``[(position, filename, image bytes), ...]`` still waiting for a result"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, filename, image FROM ocr_job_items "
+                "WHERE job_id = ? AND result IS NULL ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [(row["position"], row["filename"], row["image"]) for row in rows]
+
+    def items(self, job_id, finished_only=True):
+        query = "SELECT position, filename, result, elapsed_ms FROM ocr_job_items WHERE job_id = ?"
+        if finished_only:
+            query += " AND result IS NOT NULL"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY position", (job_id,)).fetchall()
+        return [
+            {
+                "position": row["position"],
+                "filename": row["filename"],
+                "result": json.loads(row["result"]) if row["result"] else None,
+                "elapsed_ms": row["elapsed_ms"],
+            }
+            for row in rows
+        ]
+
+    def save_results(self, job_id, results):
+        """Store ``[(position, result, elapsed_ms), ...]`` and drop their image bytes"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE ocr_job_items SET result = ?, elapsed_ms = ?, image = NULL "
+                "WHERE job_id = ? AND position = ?",
+                [(json.dumps(result, default=_json_default), elapsed_ms, job_id, position)
+                 for position, result, elapsed_ms in results],
+            )
+            self._conn.execute(
+                "UPDATE ocr_jobs SET completed = completed + ?, updated_at = ? WHERE id = ?",
+                (len(results), time.time(), job_id),
+            )
+
+    def set_status(self, job_id, status, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def claim(self, job_id) -> bool:
+        """Mark a pending job running; False if it is not pending (another process may have it)"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE ocr_jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, PENDING),
+            ).rowcount > 0
+
+    def recover(self, interrupted_before=None):
+        """Requeue jobs interrupted by a restart; returns their ids, oldest first
+
+        With several server processes sharing the store, only jobs running
+        since before ``interrupted_before`` (the launch time) were
+        interrupted; later ones belong to a sibling process.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE ocr_jobs SET status = ? WHERE status = ? AND updated_at < ?",
+                (PENDING, RUNNING, interrupted_before if interrupted_before is not None else float("inf")),
+            )
+            rows = self._conn.execute(
+                "SELECT id FROM ocr_jobs WHERE status = ? ORDER BY created_at", (PENDING,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def purge(self, older_than):
+        """Delete finished jobs last updated more than ``older_than`` seconds ago"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM ocr_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (COMPLETED, FAILED, time.time() - older_than),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OCRJobQueue:
+    """In-process queue of OCR jobs, persisted in an ``OCRJobStore``
+
+    Workers run each job's images through the OCR executor a chunk at a time
+    and publish every finished image to subscribers (see ``subscribe``).
+    Jobs yield to interactive uploads: when the executor is saturated they
+    wait and retry instead of failing.
+    """
+
+    def __init__(self, store: OCRJobStore, ocr_pool, ocr_executor, ocr_cache=None,
+                 workers=1, chunk_size=8, max_pending=1000, timeout=600, retention=None, purge_interval=600):
+        self.store = store
+        self.ocr_pool = ocr_pool
+        self.ocr_executor = ocr_executor
+        self.ocr_cache = ocr_cache
+        self.workers = max(1, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retention = retention  # seconds to keep finished jobs, None = forever
+        self.purge_interval = purge_interval
+        self._purged_at = float("-inf")
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._subscribers = {}  # job_id -> set of asyncio.Queue
+
+    async def start(self, interrupted_before=None):
+        await self._purge()
+        for job_id in await asyncio.to_thread(self.store.recover, interrupted_before):
+            self._queue.put_nowait(job_id)
+        if self._queue.qsize():
+            self.logger.info(f"Resuming {self._queue.qsize()} pending OCR jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, images, target_language=None) -> str:
+        """Persist a job for ``[(filename, image bytes), ...]`` and queue it"""
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFull(f"Too many pending OCR jobs (limit {self.max_pending})")
+        job_id = await asyncio.to_thread(self.store.create, images, target_language)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def submit_captures(self, captures, target_language=None):
+        """Queue the ``[(capture_id, filename, image bytes), ...]`` not already stored
+
+        Idempotent by capture id: a capture sent again (a retry after a lost
+        response, or from a second tab) is never OCRed twice. Returns the
+        ids of the captures newly queued.
+        """
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFull(f"Too many pending OCR jobs (limit {self.max_pending})")
+        job_id, created = await asyncio.to_thread(self.store.create_captures, captures, target_language)
+        if job_id is not None:
+            self._queue.put_nowait(job_id)
+        return created
+
+    def subscribe(self, job_id) -> asyncio.Queue:
+        """Queue receiving ``("item", item)`` events and a final ``("status", job)``"""
+        events = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, job_id, events):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(events)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id, event):
+        for events in self._subscribers.get(job_id, ()):
+            events.put_nowait(event)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "workers": self.workers, "subscribers": len(self._subscribers)}
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"OCR job {job_id} failed: {e}")
+                await asyncio.to_thread(self.store.set_status, job_id, FAILED, str(e))
+            finally:
+                self._queue.task_done()
+                job = await asyncio.to_thread(self.store.get, job_id)
+                if job is not None and job["status"] in (COMPLETED, FAILED):
+                    self._publish(job_id, ("status", job))
+                    await self._purge()
+
+    async def _purge(self):
+        """Delete jobs finished longer than ``retention`` ago, at most every ``purge_interval`` seconds"""
+        if self.retention is None or time.monotonic() - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = time.monotonic()
+        try:
+            await asyncio.to_thread(self.store.purge, self.retention)
+        except Exception as e:
+            self.logger.warning(f"Purging old OCR jobs failed: {e}")
+
+    async def _run(self, job_id):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        # Finished already, or taken by another server process
+        if job is None or not await asyncio.to_thread(self.store.claim, job_id):
+            return
+
+        pending = await asyncio.to_thread(self.store.pending_images, job_id)
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            try:
+                outcomes = await self._run_chunk([(filename, image) for _, filename, image in chunk],
+                                                 job["target_language"])
+            except (PoolTimeout, OCRTimeout) as e:
+                # These images fail; the rest of the job still runs
+                self.logger.warning(f"OCR job {job_id}: {len(chunk)} images timed out: {e}")
+                outcomes = [({"success": False, "error": f"OCR timed out: {e}"}, 0.0)] * len(chunk)
+            results = [
+                (position, result, round(elapsed * 1000, 1))
+                for (position, _, _), (result, elapsed) in zip(chunk, outcomes)
+            ]
+            await asyncio.to_thread(self.store.save_results, job_id, results)
+            for (position, filename, _), (_, result, elapsed_ms) in zip(chunk, results):
+                self._publish(job_id, ("item", {
+                    "position": position, "filename": filename, "result": result, "elapsed_ms": elapsed_ms
+                }))
+
+        await asyncio.to_thread(self.store.set_status, job_id, COMPLETED)
+
+    async def _run_chunk(self, images, target_language):
+        while True:
+            try:
+                return await self.ocr_executor.submit(
+                    ocr_runner.run_covers, self.ocr_pool, self.ocr_cache, images, target_language,
+                    timeout=self.timeout
+                )
+            except OCRQueueFull as e:
+                # Interactive uploads have priority; try again shortly
+                await asyncio.sleep(e.retry_after)
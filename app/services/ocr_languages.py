@@ -0,0 +1,185 @@
+# app/services/ocr_languages.py
+"""Language groups for EasyOCR readers and script classification
+
+EasyOCR can only combine a CJK language with English in one reader, so each
+``target_language`` maps to the language set of the reader that serves it.
+Also detects the language of recognised text (``detect_languages``).
+"""
+import re
+from collections import Counter
+
+import numpy as np
+
+AUTO = "auto"
+
+LATIN_LANGUAGES = ("en", "es", "fr", "de", "it", "pt")
+
+LANGUAGE_GROUPS = {
+    "en": ("en",),
+    "es": LATIN_LANGUAGES,
+    "fr": LATIN_LANGUAGES,
+    "de": LATIN_LANGUAGES,
+    "it": LATIN_LANGUAGES,
+    "pt": LATIN_LANGUAGES,
+    "ja": ("ja", "en"),
+    "ko": ("ko", "en"),
+    "zh": ("ch_sim", "en"),
+    "zh-cn": ("ch_sim", "en"),
+    "zh-tw": ("ch_tra", "en"),
+}
+
+# Which script each language group's output should be written in
+GROUP_SCRIPTS = {
+    ("ja", "en"): "ja",
+    ("ko", "en"): "ko",
+    ("ch_sim", "en"): "zh",
+    ("ch_tra", "en"): "zh",
+}
+
+
+def languages_for(target_language):
+    """Reader language set for a target language; None means the default set"""
+    if not target_language or target_language == AUTO:
+        return None
+    try:
+        return LANGUAGE_GROUPS[target_language.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported language: {target_language} (choose from {', '.join(sorted(LANGUAGE_GROUPS))} or auto)"
+        )
+
+
+# Inclusive code point ranges of each coarse script
+SCRIPT_RANGES = {
+    "latin": ((0x41, 0x5A), (0x61, 0x7A), (0xC0, 0xD6), (0xD8, 0xF6), (0xF8, 0x24F), (0x1E00, 0x1EFF),
+              (0xFF21, 0xFF3A), (0xFF41, 0xFF5A)),
+    "ja": ((0x3040, 0x30FF), (0x31F0, 0x31FF), (0xFF66, 0xFF9F)),  # kana
+    "ko": ((0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)),  # hangul
+    "han": ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)),
+}
+SCRIPTS = tuple(SCRIPT_RANGES)
+
+_RANGES = sorted((low, high, column) for column, ranges in enumerate(SCRIPT_RANGES.values()) for low, high in ranges)
+_RANGE_STARTS = np.array([low for low, _, _ in _RANGES], dtype=np.uint32)
+_RANGE_ENDS = np.array([high for _, high, _ in _RANGES], dtype=np.uint32)
+_RANGE_SCRIPTS = np.array([column for _, _, column in _RANGES], dtype=np.int64)
+
+
+def script_counts(texts) -> np.ndarray:
+    """Letters of each script per text, as a ``(len(texts), len(SCRIPTS))`` array
+
+    All texts are classified in one pass over their concatenated code points.
+    """
+    encoded = [text.encode("utf-32-le") for text in texts]
+    lengths = np.array([len(data) // 4 for data in encoded], dtype=np.int64)
+    codes = np.frombuffer(b"".join(encoded), dtype="<u4")
+    owner = np.repeat(np.arange(len(texts)), lengths)
+
+    found = np.searchsorted(_RANGE_STARTS, codes, side="right") - 1
+    inside = (found >= 0) & (codes <= _RANGE_ENDS[np.maximum(found, 0)])
+    cells = owner[inside] * len(SCRIPTS) + _RANGE_SCRIPTS[found[inside]]
+    counts = np.bincount(cells, minlength=len(texts) * len(SCRIPTS))
+    return counts.reshape(len(texts), len(SCRIPTS))
+
+
+def classify_scripts(texts):
+    """``classify_script`` for many texts at once"""
+    latin, kana, hangul, han = script_counts(texts).T
+    cjk = np.maximum(hangul, han)
+    scripts = np.where(latin > 0, "latin", "unknown")
+    scripts = np.where((cjk > 0) & (cjk * 4 >= latin), np.where(hangul >= han, "ko", "zh"), scripts)
+    return np.where(kana > 0, "ja", scripts).tolist()
+
+
+def classify_script(text):
+    """Dominant script of ``text``: latin, ja, ko, zh or unknown
+
+    Any kana makes it Japanese (Japanese mixes kana with han characters);
+    han characters without kana are classed as Chinese.
+    """
+    return classify_scripts([text])[0]
+
+
+# Names reported for langdetect's codes; other codes are reported as-is
+LANGUAGE_NAMES = {
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "zh-cn": "Chinese",
+    "zh-tw": "Chinese",
+    "zh": "Chinese",
+}
+
+# Function words frequent on covers and used by only one of the Latin languages.
+# Words of one or two letters are left out: a stray OCR letter ("y", "o") or a
+# name particle ("da", "di") says nothing about the cover's language.
+STOPWORDS = {
+    "en": ("the", "and", "with", "for", "from", "your", "this", "that", "into"),
+    "es": ("los", "las", "del", "por", "como", "sin", "entre", "sus", "historia"),
+    "fr": ("les", "des", "une", "pour", "avec", "dans", "sur", "aux", "est"),
+    "de": ("der", "und", "von", "mit", "ein", "eine", "dem", "zum", "zur", "eines", "nicht"),
+    "it": ("gli", "della", "delle", "dello", "nel", "nella", "degli", "che", "storia"),
+    "pt": ("dos", "uma", "com", "pela", "pelo", "não", "seu", "sua"),
+}
+STOPWORD_LANGUAGES = {word: language for language, words in STOPWORDS.items() for word in words}
+STOPWORD_MIN_HITS = 2  # distinct function words needed to skip langdetect
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+_detect = None
+
+
+def detect(text):
+    """langdetect's ``detect``, imported on first use and seeded for consistent results"""
+    global _detect
+    if _detect is None:
+        from langdetect import detect as langdetect_detect, DetectorFactory
+        DetectorFactory.seed = 0
+        _detect = langdetect_detect
+    return _detect(text)
+
+
+def stopword_language(text):
+    """Language code when ``text`` has ``STOPWORD_MIN_HITS`` function words of one language and few of others"""
+    hits = Counter(STOPWORD_LANGUAGES[word] for word in set(WORD_RE.findall(text.lower())) if word in STOPWORD_LANGUAGES)
+    ranked = hits.most_common(2)
+    if not ranked or ranked[0][1] < STOPWORD_MIN_HITS:
+        return None
+    if len(ranked) > 1 and ranked[0][1] < 2 * ranked[1][1]:
+        return None
+    return ranked[0][0]
+
+
+def detect_languages(texts, min_length=3):
+    """Language name of each text ("unknown" when it can't be told)
+
+    Cheap rules go first: the script decides CJK text, and Latin text with
+    a clear majority of one language's function words is taken as that
+    language. Only the rest goes through langdetect, each distinct text once.
+    """
+    names = ["unknown"] * len(texts)
+    undecided = {}
+    for index, (text, script) in enumerate(zip(texts, classify_scripts(texts))):
+        if len(text.strip()) < min_length or script == "unknown":
+            continue
+        if script != "latin":
+            names[index] = LANGUAGE_NAMES[script]
+            continue
+        code = stopword_language(text)
+        if code is not None:
+            names[index] = LANGUAGE_NAMES[code]
+        else:
+            undecided.setdefault(text, []).append(index)
+
+    for text, indexes in undecided.items():
+        try:
+            code = detect(text)
+        except Exception:
+            continue  # langdetect finds no features in e.g. lone initials
+        for index in indexes:
+            names[index] = LANGUAGE_NAMES.get(code, code)
+    return names
@@ -0,0 +1,267 @@
+# app/services/ocr_pool.py
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.services.ocr_service import OCRService
+
+
+class PoolTimeout(Exception):
+    """Raised when no warm reader becomes available in time"""
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ReaderPool:
+    """Fixed-size pool of warm OCRService instances for one language set"""
+
+    def __init__(self, languages, size=1, gpu=False, profile="standard", service_factory=None):
+        self.languages = tuple(languages)
+        self.size = max(1, int(size))
+        self.gpu = gpu
+        self.profile = profile
+        self.service_factory = service_factory or (
+            lambda: OCRService(languages=self.languages, gpu=self.gpu, profile=self.profile)
+        )
+        self.logger = logging.getLogger(__name__)
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = 0
+        self._closed = False
+        self.memory_bytes = 0  # measured RSS growth while loading this pool's readers
+        self.last_used = time.monotonic()
+        self._waiting = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded >= self.size
+
+    def warm_up(self):
+        """Load readers until the pool is full"""
+        # Concurrent callers wait here instead of loading extra readers
+        with self._load_lock:
+            while self._loaded < self.size:
+                started = time.perf_counter()
+                rss_before = current_rss()
+                service = self.service_factory()
+                rss_after = current_rss()
+                with self._lock:
+                    self._loaded += 1
+                    self._closed = False
+                    if rss_before is not None and rss_after is not None:
+                        self.memory_bytes += max(0, rss_after - rss_before)
+                self._idle.put(service)
+                self.logger.info(
+                    f"Loaded OCR reader {self._loaded}/{self.size} for {','.join(self.languages)} "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow a warm OCRService, returning it to the pool afterwards"""
+        # Count as waiting before looking at the readers: unload_if_idle leaves
+        # a pool with waiters alone, so they can't be unloaded in between
+        with self._lock:
+            self._waiting += 1
+        started = time.perf_counter()
+        try:
+            if not self.ready:
+                # Never loaded, or unloaded to free memory
+                self.warm_up()
+                started = time.perf_counter()
+            service = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(
+                f"No OCR reader for {','.join(self.languages)} became available within {timeout}s"
+            )
+        finally:
+            waited = time.perf_counter() - started
+            with self._lock:
+                self._waiting -= 1
+
+        with self._lock:
+            self.last_used = time.monotonic()
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            yield service
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                closed = self._closed
+            if not closed:
+                self._idle.put(service)
+
+    def unload_if_idle(self) -> bool:
+        """Drop all readers so their models can be freed, unless one is in use"""
+        with self._load_lock, self._lock:
+            if self._in_use or self._waiting:
+                return False
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            self._loaded = 0
+            self.memory_bytes = 0
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "languages": list(self.languages),
+                "size": self.size,
+                "loaded": self._loaded,
+                "memory_mb": round(self.memory_bytes / 2**20, 1),
+                "in_use": self._in_use,
+                "queue_depth": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+class OCREnginePool:
+    """Process-wide registry of reader pools, one per language set
+
+    Sets listed in ``warm_languages`` are loaded at startup and never
+    unloaded. Any other set is loaded on first use; when loading it would
+    push the readers' memory past ``memory_budget_mb``, the least recently
+    used idle sets are unloaded first.
+    """
+
+    def __init__(self, size=1, gpu=False, warm_languages=(("en",),), default_languages=None,
+                 profile="standard", memory_budget_mb=None, reader_memory_estimate_mb=500,
+                 service_factory=None):
+        self.size = size
+        self.gpu = gpu
+        self.profile = profile
+        self.warm_languages = [tuple(langs) for langs in warm_languages]
+        self.default_languages = tuple(default_languages or self.warm_languages[0])
+        self.memory_budget = memory_budget_mb * 2**20 if memory_budget_mb else None
+        self.reader_memory_estimate = reader_memory_estimate_mb * 2**20
+        self.service_factory = service_factory
+        self.logger = logging.getLogger(__name__)
+
+        self._pools = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+        self._warmed = threading.Event()
+        self._evictions = 0
+        self.warm_up_error = None
+
+    @property
+    def ready(self) -> bool:
+        """True once every startup language set has its readers loaded"""
+        return self._warmed.is_set() and self.warm_up_error is None
+
+    def pool_for(self, languages=None) -> ReaderPool:
+        """Get (or lazily create) the pool serving a language set"""
+        key = tuple(languages) if languages else self.default_languages
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                factory = None
+                if self.service_factory is not None:
+                    factory = lambda: self.service_factory(key)
+                pool = ReaderPool(key, size=self.size, gpu=self.gpu, profile=self.profile,
+                                  service_factory=factory)
+                self._pools[key] = pool
+            self._pools.move_to_end(key)
+        return pool
+
+    def warm_up(self):
+        """Load all startup language sets; called once from the app lifespan"""
+        started = time.perf_counter()
+        try:
+            for languages in self.warm_languages:
+                self.pool_for(languages).warm_up()
+            self.logger.info(f"OCR engine pool warm in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            self.warm_up_error = str(e)
+            self.logger.error(f"OCR engine pool warm-up failed: {e}")
+        finally:
+            self._warmed.set()
+
+    def _reader_memory(self, pools):
+        """Average measured memory per reader, falling back to the configured estimate"""
+        measured = [(p.memory_bytes, p.stats()["loaded"]) for p in pools if p.memory_bytes]
+        readers = sum(loaded for _, loaded in measured)
+        return sum(size for size, _ in measured) / readers if readers else self.reader_memory_estimate
+
+    def _make_room(self, target: ReaderPool):
+        """Unload least recently used idle language sets until ``target`` fits the budget"""
+        if self.memory_budget is None:
+            return
+        with self._lock:
+            pools = list(self._pools.values())
+        per_reader = self._reader_memory(pools)
+        used = sum(p.memory_bytes or p.stats()["loaded"] * per_reader for p in pools)
+        needed = (target.size - target.stats()["loaded"]) * per_reader
+
+        for pool in pools:  # least recently used first
+            if used + needed <= self.memory_budget:
+                return
+            if pool is target or pool.languages in self.warm_languages:
+                continue
+            loaded = pool.stats()["loaded"]
+            freed = pool.memory_bytes or loaded * per_reader
+            if not loaded or not pool.unload_if_idle():
+                continue
+            used -= freed
+            with self._lock:
+                self._evictions += 1
+            self.logger.info(f"Unloaded OCR readers for {','.join(pool.languages)} to stay within the memory budget")
+
+        if used + needed > self.memory_budget:
+            self.logger.warning(
+                f"Loading OCR readers for {','.join(target.languages)} exceeds the memory budget; "
+                "every other language set is busy or pinned"
+            )
+
+    @contextmanager
+    def checkout(self, languages=None, timeout=None):
+        """Borrow a warm OCRService for ``languages`` (default set when None)"""
+        pool = self.pool_for(languages)
+        if not pool.ready:
+            # Sets not warmed at startup are loaded on first use
+            self._make_room(pool)
+            pool.warm_up()
+        with pool.checkout(timeout=timeout) as service:
+            yield service
+
+    def stats(self) -> dict:
+        with self._lock:
+            pools = list(self._pools.values())
+            evictions = self._evictions
+        return {
+            "ready": self.ready,
+            "warm_up_error": self.warm_up_error,
+            "memory_budget_mb": round(self.memory_budget / 2**20) if self.memory_budget else None,
+            "evictions": evictions,
+            "pools": [pool.stats() for pool in pools],
+        }
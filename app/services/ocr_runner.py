@@ -0,0 +1,230 @@
+# app/services/ocr_runner.py
+"""OCR jobs as run on the worker threads (see OCRExecutor.submit)
+
+Shared by the upload routes and the background job queue: decode, consult
+the result cache, and only check out a warm reader for cache misses.
+``target_language`` picks the reader's language set; ``"auto"`` routes each
+cover by script (see ``process_auto``). When ``ocr_pool`` is an
+``OCRWorkerClient`` all of that happens in the OCR worker service instead.
+"""
+import time
+
+from app.config import (
+    OCR_CHECKOUT_TIMEOUT, OCR_BATCH_SIZE, OCR_AUTO_LANGUAGES, OCR_AUTO_MIN_CONFIDENCE, OCR_AUTO_SAMPLE_BOXES,
+    OCR_MIN_CONFIDENCE, OCR_FIELD_RULES_PATH
+)
+from app.services.field_extractor import get_extractor
+from app.services.metrics import stage, StageTimer, OCR_RESULTS, OCR_REQUEST_SECONDS
+from app.services.ocr_cache import OCRResultCache
+from app.services.ocr_languages import AUTO, GROUP_SCRIPTS, languages_for, classify_script
+from app.services.ocr_pool import PoolTimeout
+from app.services.ocr_service import OCRCancelled, check_cancelled
+from app.services.ocr_workers import OCRWorkerClient
+from utils.image_processing import load_image
+
+
+def cache_config(ocr_pool, target_language=None) -> str:
+    """Everything besides the pixels that changes the OCR output"""
+    languages = languages_for(target_language) or ocr_pool.default_languages
+    return OCRResultCache.config_key(
+        languages=languages, target_language=target_language, profile=ocr_pool.profile,
+        min_confidence=OCR_MIN_CONFIDENCE, field_rules=get_extractor(OCR_FIELD_RULES_PATH).version
+    )
+
+
+def outcome_of(result) -> str:
+    """Metrics label for a process_book_cover result"""
+    if result.get("success"):
+        return "success"
+    if result.get("error") == "No text detected in image":
+        return "empty"
+    return "failure"
+
+
+def record(result, elapsed, cached=False):
+    outcome = "cache_hit" if cached else outcome_of(result)
+    OCR_RESULTS.inc(outcome=outcome)
+    OCR_REQUEST_SECONDS.observe(elapsed, outcome=outcome)
+
+
+def recognition_score(detections, expected_script):
+    """Length-weighted mean confidence, halved when the text isn't in the expected script"""
+    total = sum(len(item["text"]) for item in detections)
+    if not total:
+        return 0.0
+    score = sum(item["confidence"] * len(item["text"]) for item in detections) / total
+    script = classify_script(" ".join(item["text"] for item in detections))
+    return score if script == expected_script else score / 2
+
+
+def largest_regions(regions, count):
+    """The ``count`` largest boxes of ``detect_regions`` output, in the same form"""
+    horizontal_list, free_list = regions
+    sized = [((box[1] - box[0]) * (box[3] - box[2]), 0, i) for i, box in enumerate(horizontal_list)]
+    for i, corners in enumerate(free_list):
+        xs, ys = [point[0] for point in corners], [point[1] for point in corners]
+        sized.append(((max(xs) - min(xs)) * (max(ys) - min(ys)), 1, i))
+    keep = sorted(sized, reverse=True)[:count]
+    return ([horizontal_list[i] for _, kind, i in keep if kind == 0],
+            [free_list[i] for _, kind, i in keep if kind == 1])
+
+
+def process_auto(ocr_pool, img, cancel=None):
+    """Script-routed OCR for covers of unknown language
+
+    Detection runs once, with the default reader, which also recognises the
+    text. Confident Latin output is accepted as-is. Otherwise each
+    ``OCR_AUTO_LANGUAGES`` reader recognises only the
+    ``OCR_AUTO_SAMPLE_BOXES`` largest boxes to classify the script, and
+    just the best-scoring reader, if it beats the Latin output, re-runs
+    recognition on all of them.
+    """
+    with ocr_pool.checkout(timeout=OCR_CHECKOUT_TIMEOUT) as base:
+        processed = base.preprocess_image(img)
+        check_cancelled(cancel)
+        regions = base.detect_regions(processed)
+        latin = base.filter_detections(base.recognize_regions(processed, regions))
+        latin_score = recognition_score(latin, "latin")
+        if latin_score >= OCR_AUTO_MIN_CONFIDENCE or not any(regions):
+            return base.build_result(latin)
+
+    sample = largest_regions(regions, OCR_AUTO_SAMPLE_BOXES)
+    winner, winner_score = None, latin_score
+    for target in OCR_AUTO_LANGUAGES:
+        check_cancelled(cancel)
+        languages = languages_for(target)
+        with ocr_pool.checkout(languages, timeout=OCR_CHECKOUT_TIMEOUT) as service:
+            raw = service.recognize_regions(processed, sample)
+        detections = [{"text": text, "confidence": confidence} for _, text, confidence in raw]
+        score = recognition_score(detections, GROUP_SCRIPTS.get(languages, "latin"))
+        if score > winner_score:
+            winner, winner_score = languages, score
+
+    check_cancelled(cancel)
+    with ocr_pool.checkout(winner, timeout=OCR_CHECKOUT_TIMEOUT) as service:
+        if winner is None:
+            return service.build_result(latin)
+        return service.build_result(service.filter_detections(service.recognize_regions(processed, regions)))
+
+
+def process_one(ocr_pool, img, target_language=None, cancel=None):
+    """OCR one decoded cover with the reader for its target language"""
+    if target_language == AUTO:
+        return process_auto(ocr_pool, img, cancel)
+    with ocr_pool.checkout(languages_for(target_language), timeout=OCR_CHECKOUT_TIMEOUT) as ocr_service:
+        return ocr_service.process_book_cover(img, target_language, cancel=cancel)
+
+
+def run_cover(ocr_pool, ocr_cache, image, target_language=None, cancel=None, timer=None):
+    """Process one book cover, returning a process_book_cover result dict
+
+    ``timer`` is an optional ``StageTimer`` collecting this cover's stage times.
+    """
+    if isinstance(ocr_pool, OCRWorkerClient):
+        started = time.perf_counter()
+        result = ocr_pool.run_cover(image, target_language, cancel=cancel, timer=timer)
+        record(result, time.perf_counter() - started)
+        return result
+
+    timer = timer or StageTimer()
+    with timer.active():
+        started = time.perf_counter()
+        try:
+            with stage("decode"):
+                img = load_image(image)
+            config = cache_config(ocr_pool, target_language)
+        except (ValueError, TypeError) as e:
+            result = {"success": False, "error": f"Processing failed: {str(e)}"}
+            record(result, time.perf_counter() - started)
+            return result
+
+        if ocr_cache is not None:
+            with stage("cache_lookup"):
+                cached = ocr_cache.get(img, config)
+            if cached is not None:
+                record(cached, time.perf_counter() - started, cached=True)
+                return cached
+
+        try:
+            result = process_one(ocr_pool, img, target_language, cancel)
+        except Exception:
+            OCR_RESULTS.inc(outcome="failure")
+            raise
+        record(result, time.perf_counter() - started)
+
+        if ocr_cache is not None:
+            ocr_cache.put(img, config, result)
+        return result
+
+
+def run_covers(ocr_pool, ocr_cache, images, target_language=None, cancel=None, timer=None):
+    """Process ``[(filename, image), ...]`` on a single warm reader
+
+    Returns ``[(result, elapsed_seconds), ...]`` in input order. Cache hits and
+    undecodable images are resolved up front; the rest go through
+    ``process_book_covers`` in batches of ``OCR_BATCH_SIZE``. ``timer`` is an
+    optional ``StageTimer`` collecting stage times summed over the batch.
+    """
+    if isinstance(ocr_pool, OCRWorkerClient):
+        outcomes = ocr_pool.run_covers(images, target_language, cancel=cancel, timer=timer)
+        for outcome in outcomes:
+            record(*outcome)
+        return outcomes
+
+    with (timer or StageTimer()).active():
+        return _run_covers(ocr_pool, ocr_cache, images, target_language, cancel)
+
+
+def _run_covers(ocr_pool, ocr_cache, images, target_language=None, cancel=None):
+    outcomes = [None] * len(images)
+    pending = []  # (index, decoded image, seconds spent so far)
+    try:
+        config = cache_config(ocr_pool, target_language)
+    except ValueError as e:
+        return [({"success": False, "error": str(e)}, 0.0)] * len(images)
+
+    for index, (_, image) in enumerate(images):
+        started = time.perf_counter()
+        try:
+            with stage("decode"):
+                img = load_image(image)
+        except (ValueError, TypeError) as e:
+            outcomes[index] = ({"success": False, "error": f"Processing failed: {str(e)}"},
+                               time.perf_counter() - started)
+            record(*outcomes[index])
+            continue
+        with stage("cache_lookup"):
+            cached = ocr_cache.get(img, config) if ocr_cache is not None else None
+        if cached is not None:
+            outcomes[index] = (cached, time.perf_counter() - started)
+            record(*outcomes[index], cached=True)
+        else:
+            pending.append((index, img, time.perf_counter() - started))
+
+    if pending and target_language == AUTO:
+        # Each cover may need a different reader, so auto mode can't batch
+        results = []
+        for _, img, _ in pending:
+            started = time.perf_counter()
+            try:
+                result = process_auto(ocr_pool, img, cancel)
+            except (OCRCancelled, PoolTimeout):
+                raise
+            except Exception as e:
+                result = {"success": False, "error": f"Processing failed: {str(e)}"}
+            results.append((result, time.perf_counter() - started))
+    elif pending:
+        with ocr_pool.checkout(languages_for(target_language), timeout=OCR_CHECKOUT_TIMEOUT) as ocr_service:
+            results = ocr_service.process_book_covers(
+                [img for _, img, _ in pending], target_language,
+                batch_size=OCR_BATCH_SIZE, cancel=cancel
+            )
+
+    if pending:
+        for (index, img, spent), (result, elapsed) in zip(pending, results):
+            outcomes[index] = (result, spent + elapsed)
+            record(result, spent + elapsed)
+            if ocr_cache is not None:
+                ocr_cache.put(img, config, result)
+
+    return outcomes
@@ -1,171 +1,134 @@
 # app/services/ocr_service.py
-import easyocr
 import cv2
-import numpy as np
-from PIL import Image
-import re
-from langdetect import detect, DetectorFactory
 import logging
+import time
+
+import numpy as np
+
+from app.config import OCR_FIELD_RULES_PATH, OCR_MIN_CONFIDENCE
+from app.services.field_extractor import get_extractor
+from app.services.metrics import stage, OCR_CONFIDENCE
+from app.services.ocr_languages import detect_languages
+from utils.image_processing import load_image, preprocess, get_profile
 
-# Set seed for consistent language detection
-DetectorFactory.seed = 0
+class OCRCancelled(Exception):
+    """Raised when an OCR job is abandoned (timeout or client disconnect)"""
+
+def check_cancelled(cancel):
+    """Stop between pipeline stages once the caller has given up"""
+    if cancel is not None and cancel.is_set():
+        raise OCRCancelled("OCR job cancelled")
 
 class OCRService:
-    def __init__(self):
-        """Initialize OCR service with multiple language support"""
-        # Start with common languages, can be expanded
-        # TODO - add more languages to the list
-        self.reader = easyocr.Reader(["en"])
+    def __init__(self, reader=None, languages=("en",), gpu=False, profile="standard", extractor=None):
+        """Initialize OCR service with multiple language support
+
+        A warm ``easyocr.Reader`` can be passed in (see ``ReaderPool``) so the
+        detection and recognition models are not reloaded for every image.
+        ``extractor`` defaults to the shared ``FieldExtractor`` built from the
+        bundled rules and ``OCR_FIELD_RULES_PATH``.
+        """
+        # Language sets are chosen per target language (see ocr_languages.LANGUAGE_GROUPS)
+        self.languages = tuple(languages)
+        self.profile = get_profile(profile)
+        self.extractor = extractor or get_extractor(OCR_FIELD_RULES_PATH)
+        if reader is None:
+            # easyocr pulls in torch: seconds of import time, paid by the first reader only
+            import easyocr
+            reader = easyocr.Reader(list(self.languages), gpu=gpu)
+        self.reader = reader
         self.logger = logging.getLogger(__name__)
         
-    def preprocess_image(self, image_path):
-        """Preprocess image for better OCR results"""
+    def preprocess_image(self, image):
+        """Preprocess image for better OCR results
+
+        ``image`` may be encoded bytes, a binary buffer, a decoded ndarray or a
+        path; it is decoded once, in memory, then run through this service's
+        preprocessing profile (see ``utils.image_processing.PROFILES``).
+        """
+        # Decode image
+        img = load_image(image)
+        
         try:
-            # Read image
-            img = cv2.imread(image_path)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Apply gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            
-            # Apply adaptive thresholding
-            thresh = cv2.adaptiveThreshold(
-                blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-            )
-            
-            return thresh
+            with stage("preprocess"):
+                return preprocess(img, self.profile)
             
         except Exception as e:
             self.logger.error(f"Image preprocessing failed: {e}")
-            return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            # Fall back to the already-decoded image rather than reading it again
+            return img
     
-    def extract_text_from_image(self, image_path, target_language=None):
+    def extract_text_from_image(self, image, target_language=None, cancel=None):
         """Extract text from book cover image"""
         try:
             # Preprocess image
-            processed_img = self.preprocess_image(image_path)
+            processed_img = self.preprocess_image(image)
+            check_cancelled(cancel)
             
             # Perform OCR
-            results = self.reader.readtext(processed_img)
+            with stage("readtext"):
+                results = self.reader.readtext(processed_img)
             
-            # Extract text and confidence scores
-            extracted_text = []
-            for (bbox, text, confidence) in results:
-                if confidence > 0.3:  # Filter low confidence text
-                    extracted_text.append({
-                        "text": text.strip(),
-                        "confidence": confidence,
-                        "bbox": bbox
-                    })
-            
-            return extracted_text
+            return self.filter_detections(results)
             
+        except OCRCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"OCR extraction failed: {e}")
             return []
     
+    def detect_regions(self, processed_img):
+        """Text detection only: the boxes ``recognize_regions`` reads"""
+        with stage("detect"):
+            horizontal_list, free_list = self.reader.detect(processed_img)
+        return horizontal_list[0], free_list[0]
+    
+    def recognize_regions(self, processed_img, regions):
+        """Recognition only, on boxes found by any reader's ``detect_regions``"""
+        horizontal_list, free_list = regions
+        with stage("recognize"):
+            return self.reader.recognize(processed_img, horizontal_list, free_list)
+    
+    def filter_detections(self, results):
+        """Extract text and confidence scores from raw readtext output
+
+        Detections under the profile's ``min_confidence`` (or
+        ``OCR_MIN_CONFIDENCE``) are dropped. Boxes and confidences come back
+        as plain lists and floats, ready for JSON.
+        """
+        if not results:
+            return []
+        bboxes, texts, confidences = zip(*results)
+        confidences = np.asarray(confidences, dtype=np.float64)
+        OCR_CONFIDENCE.observe_many(confidences.tolist())
+        min_confidence = OCR_MIN_CONFIDENCE if OCR_MIN_CONFIDENCE is not None else self.profile.min_confidence
+        keep = np.flatnonzero(confidences > min_confidence)
+        try:
+            # Every box has four corners; converting them together drops numpy scalar types
+            kept_boxes = np.asarray([bboxes[i] for i in keep]).tolist()
+        except ValueError:
+            kept_boxes = [bboxes[i] for i in keep]
+        return [
+            {"text": texts[i].strip(), "confidence": confidence, "bbox": bbox}
+            for i, confidence, bbox in zip(keep.tolist(), confidences[keep].tolist(), kept_boxes)
+        ]
+    
     def detect_language(self, text_list):
         """Detect the primary language of extracted text"""
+        return self.detect_languages([text_list])[0]
+    
+    def detect_languages(self, text_lists):
+        """Primary language of each image's extracted text (see ``ocr_languages.detect_languages``)"""
         try:
-            # Combine all text
-            combined_text = " ".join([item["text"] for item in text_list])
-            
-            if len(combined_text.strip()) < 3:
-                return "unknown"
-                
-            detected_lang = detect(combined_text)
-            
-            # Map language codes to full names
-            lang_map = {
-                "en": "English",
-                "es": "Spanish", 
-                "fr": "French",
-                "de": "German",
-                "it": "Italian",
-                "pt": "Portuguese",
-                "ja": "Japanese",
-                "ko": "Korean",
-                "zh-cn": "Chinese",
-                "zh": "Chinese"
-            }
-            
-            return lang_map.get(detected_lang, detected_lang)
-            
+            return detect_languages([" ".join(item["text"] for item in text_list) for text_list in text_lists])
         except Exception as e:
             self.logger.error(f"Language detection failed: {e}")
-            return "unknown"
+            return ["unknown"] * len(text_lists)
     
     def parse_book_info(self, text_list):
-        """Parse extracted text to identify title, author, etc."""
+        """Parse extracted text to identify title, author, etc. (see ``FieldExtractor``)"""
         try:
-            # Sort by confidence and position (top to bottom)
-            sorted_text = sorted(text_list, key=lambda x: (-x["confidence"], x["bbox"][0][1]))
-            
-            title = ""
-            author = ""
-            translator = ""
-            publisher = ""
-            
-            # Common patterns for identifying different fields
-            author_patterns = [
-                r'^by\s+(.+)$',
-                r'^(.+)\s+author$',
-                r'written\s+by\s+(.+)$'
-            ]
-            
-            translator_patterns = [
-                r'translated\s+by\s+(.+)$',
-                r'translator:\s*(.+)$',
-                r'trans\.\s+(.+)$'
-            ]
-            
-            publisher_patterns = [
-                r'published\s+by\s+(.+)$',
-                r'publisher:\s*(.+)$'
-            ]
-            
-            # First high-confidence, large text is likely the title
-            if sorted_text:
-                title = sorted_text[0]["text"]
-            
-            # Look for author, translator, publisher patterns
-            for item in sorted_text[1:]:  # Skip first item (title)
-                text = item["text"].lower().strip()
-                
-                # Check for author patterns
-                for pattern in author_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match and not author:
-                        author = match.group(1).strip()
-                        break
-                
-                # Check for translator patterns
-                for pattern in translator_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match and not translator:
-                        translator = match.group(1).strip()
-                        break
-                
-                # Check for publisher patterns
-                for pattern in publisher_patterns:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match and not publisher:
-                        publisher = match.group(1).strip()
-                        break
-                
-                # If no patterns match, use heuristics
-                if not author and len(text.split()) <= 4 and item["confidence"] > 0.7:
-                    # Likely an author name
-                    author = item["text"]
-            
-            return {
-                "title": title,
-                "author": author,
-                "translator": translator,
-                "publisher": publisher
-            }
+            return self.extractor.extract(text_list)
             
         except Exception as e:
             self.logger.error(f"Book info parsing failed: {e}")
@@ -176,34 +139,25 @@ class OCRService:
                 "publisher": ""
             }
     
-    def process_book_cover(self, image_path, target_language=None):
-        """Main method to process book cover and extract book information"""
+    def process_book_cover(self, image, target_language=None, cancel=None):
+        """Main method to process book cover and extract book information
+
+        ``image`` is the encoded upload (bytes or buffer), a decoded ndarray or
+        a path. ``cancel`` is an optional ``threading.Event``; once set, processing
+        stops at the next stage boundary with ``OCRCancelled``.
+        """
         try:
-            # Extract text from image
-            extracted_text = self.extract_text_from_image(image_path, target_language)
-            
-            if not extracted_text:
-                return {
-                    "success": False,
-                    "error": "No text detected in image"
-                }
-            
-            # Detect language
-            detected_language = self.detect_language(extracted_text)
-            
-            # Parse book information
-            book_info = self.parse_book_info(extracted_text)
+            # Decode once up front so a bad upload is reported as such
+            image = load_image(image)
             
-            # Add detected language
-            book_info["language"] = detected_language
+            # Extract text from image
+            extracted_text = self.extract_text_from_image(image, target_language, cancel)
+            check_cancelled(cancel)
             
-            return {
-                "success": True,
-                "book_info": book_info,
-                "raw_text": extracted_text,
-                "detected_language": detected_language
-            }
+            return self.build_result(extracted_text)
             
+        except OCRCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"Book cover processing failed: {e}")
             return {
@@ -211,6 +165,123 @@ class OCRService:
                 "error": f"Processing failed: {str(e)}"
             }
 
+    def build_result(self, extracted_text, detected_language=None):
+        """Turn filtered detections into a process_book_cover result
+
+        ``detected_language`` is detected here unless given (batches detect
+        theirs together, see ``process_book_covers``).
+        """
+        if not extracted_text:
+            return {
+                "success": False,
+                "error": "No text detected in image"
+            }
+        
+        # Detect language
+        if detected_language is None:
+            with stage("detect_language"):
+                detected_language = self.detect_language(extracted_text)
+        
+        # Parse book information
+        with stage("parse_book_info"):
+            book_info = self.parse_book_info(extracted_text)
+        
+        # Add detected language
+        book_info["language"] = detected_language
+        
+        return {
+            "success": True,
+            "book_info": book_info,
+            "raw_text": extracted_text,
+            "detected_language": detected_language
+        }
+    
+    def process_book_covers(self, images, target_language=None, batch_size=8, cancel=None):
+        """Process many covers, running detection/recognition on batches of images
+
+        ``images`` is a list of image sources (see ``process_book_cover``).
+        Returns one ``(result, elapsed_seconds)`` pair per image, in order; a
+        failing image gets an error result without affecting the others.
+        """
+        outcomes = [None] * len(images)
+        elapsed = [0.0] * len(images)
+        prepared = []  # (index, preprocessed image)
+        
+        # Decode and preprocess each image on its own so one bad file can't sink the batch
+        for index, image in enumerate(images):
+            check_cancelled(cancel)
+            started = time.perf_counter()
+            try:
+                prepared.append((index, self.preprocess_image(image)))
+            except Exception as e:
+                outcomes[index] = {"success": False, "error": f"Processing failed: {str(e)}"}
+            elapsed[index] += time.perf_counter() - started
+        
+        # Similar sizes share a batch so padding to a common canvas stays cheap
+        prepared.sort(key=lambda item: item[1].shape[:2])
+        for start in range(0, len(prepared), max(1, batch_size)):
+            check_cancelled(cancel)
+            batch = prepared[start:start + batch_size]
+            started = time.perf_counter()
+            try:
+                with stage("readtext_batched"):
+                    batch_results = self.reader.readtext_batched(pad_to_common_size([img for _, img in batch]))
+            except Exception as e:
+                self.logger.error(f"Batched OCR failed, retrying images one by one: {e}")
+                batch_results = []
+                for index, img in batch:
+                    try:
+                        batch_results.append(self.reader.readtext(img))
+                    except Exception as e:
+                        self.logger.error(f"OCR extraction failed: {e}")
+                        batch_results.append(None)
+            share = (time.perf_counter() - started) / len(batch)
+            
+            extracted = {}  # index -> filtered detections
+            for (index, _), results in zip(batch, batch_results):
+                started = time.perf_counter()
+                if results is None:
+                    outcomes[index] = {"success": False, "error": "Processing failed: OCR extraction failed"}
+                else:
+                    try:
+                        extracted[index] = self.filter_detections(results)
+                    except Exception as e:
+                        outcomes[index] = {"success": False, "error": f"Processing failed: {str(e)}"}
+                elapsed[index] += share + time.perf_counter() - started
+            
+            # One language detection call for the whole batch
+            started = time.perf_counter()
+            with stage("detect_language"):
+                languages = self.detect_languages(list(extracted.values()))
+            share = (time.perf_counter() - started) / max(1, len(extracted))
+            for (index, text_list), language in zip(extracted.items(), languages):
+                started = time.perf_counter()
+                try:
+                    outcomes[index] = self.build_result(text_list, language)
+                except Exception as e:
+                    outcomes[index] = {"success": False, "error": f"Processing failed: {str(e)}"}
+                elapsed[index] += share + time.perf_counter() - started
+        
+        return list(zip(outcomes, elapsed))
+
+def pad_to_common_size(images):
+    """Pad images (bottom/right, white) to one shape so they can be batched
+
+    Padding instead of resizing keeps bbox coordinates valid for each image.
+    """
+    height = max(img.shape[0] for img in images)
+    width = max(img.shape[1] for img in images)
+    padded = []
+    for img in images:
+        if img.ndim == 3:
+            # Preprocessing fell back to the colour image; batches must share a layout
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        pad_bottom, pad_right = height - img.shape[0], width - img.shape[1]
+        if pad_bottom or pad_right:
+            img = cv2.copyMakeBorder(img, 0, pad_bottom, 0, pad_right, cv2.BORDER_CONSTANT, value=255)
+        padded.append(img)
+    return padded
+
 # Example usage
 if __name__ == "__main__":
     ocr = OCRService()
@@ -0,0 +1,429 @@
+# app/services/ocr_workers.py
+"""OCR in a separate tier of model-loaded processes, reached over a Unix socket
+
+``OCRWorkerService`` (run by ocr_worker.py) binds the socket and forks a
+fixed number of worker processes. Each worker is pinned to its own slice of
+the cores, caps torch at that many threads, loads its readers and result
+cache once, and then takes connections off the shared socket one at a time,
+so the kernel hands each request to whichever worker is idle.
+
+``OCRWorkerClient`` stands in for ``OCREnginePool`` in the web processes
+(see ``ocr_runner.run_cover``). Image bytes are written once into a POSIX
+shared-memory segment and only its name goes over the socket; the worker
+decodes straight from the mapping. One request per connection: a client
+that gives up (timeout, disconnect) closes its connection, which cancels
+the OCR between pipeline stages.
+"""
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from app.services.metrics import OCR_STAGE_SECONDS
+from app.services.ocr_pool import PoolTimeout
+from app.services.ocr_service import OCRCancelled
+
+HEADER = struct.Struct("!I")  # length prefix of every JSON message
+BACKLOG = 128  # connections waiting for an idle worker
+RESTART_DELAY = 1.0  # seconds before a crashed worker is replaced
+DEFAULT_THREADS = 4  # EasyOCR on CPU gains little from more threads per image
+
+
+class OCRWorkerError(RuntimeError):
+    """An OCR request failed inside a worker process"""
+
+
+def _json_default(value):
+    # numpy scalars and arrays in bboxes and confidences
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def send_message(sock, message):
+    payload = json.dumps(message, default=_json_default).encode()
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_exactly(sock, size, cancel=None):
+    """Read ``size`` bytes; with ``cancel``, the socket's timeout is the polling interval"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        try:
+            count = sock.recv_into(view[received:])
+        except socket.timeout:
+            if cancel is not None and cancel.is_set():
+                raise OCRCancelled("OCR request cancelled")
+            continue
+        if not count:
+            raise ConnectionError("OCR worker connection closed")
+        received += count
+    return buffer
+
+
+def recv_message(sock, cancel=None):
+    (size,) = HEADER.unpack(recv_exactly(sock, HEADER.size, cancel))
+    return json.loads(recv_exactly(sock, size, cancel))
+
+
+def partition_cpus(cpus, processes=0, threads=0):
+    """Split ``cpus`` into one list per worker process
+
+    ``processes`` defaults to one per ``threads`` cores and ``threads`` to an
+    even share of the cores. Slices only overlap when asked for more
+    processes x threads than there are cores.
+    """
+    cpus = list(cpus)
+    if processes <= 0:
+        processes = max(1, len(cpus) // (threads or DEFAULT_THREADS))
+    if threads <= 0:
+        threads = max(1, len(cpus) // processes)
+    return [
+        [cpus[(index * threads + offset) % len(cpus)] for offset in range(threads)]
+        for index in range(processes)
+    ]
+
+
+def pin_to(cpus):
+    """Restrict this process to ``cpus`` and size the math libraries' thread pools to match"""
+    threads = str(len(cpus))
+    # Read by OpenMP and MKL when torch loads them
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = threads
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    import cv2
+    cv2.setNumThreads(len(cpus))
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(len(cpus))
+    torch.set_num_interop_threads(1)
+
+
+class _ImageSegment:
+    """Images packed into one shared-memory block: ``[filename, offset, size]`` spans"""
+
+    def __init__(self, images):
+        sizes = [memoryview(image).nbytes for _, image in images]
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes)))
+        self.spans = []
+        offset = 0
+        for (filename, image), size in zip(images, sizes):
+            self.memory.buf[offset:offset + size] = image
+            self.spans.append([filename, offset, size])
+            offset += size
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class OCRWorkerClient:
+    """The web tier's handle on the OCR worker service
+
+    Has the parts of ``OCREnginePool`` that the app lifespan and the health
+    and metrics routes use. ``ready`` once the service has published its
+    socket, which it does after every worker has loaded its readers.
+    """
+
+    def __init__(self, socket_path, poll_interval=0.5):
+        self.socket_path = socket_path
+        self.poll_interval = poll_interval
+        self.warm_up_error = None
+        self.logger = logging.getLogger(__name__)
+
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = 0
+        self._failures = 0
+        self._unavailable = 0
+
+    @property
+    def ready(self) -> bool:
+        return os.path.exists(self.socket_path)
+
+    def warm_up(self):
+        """Wait for the worker service to come up; returns early on ``close``"""
+        if not self.ready:
+            self.logger.info(f"Waiting for the OCR worker service at {self.socket_path}")
+        while not self.ready:
+            if self._closed.wait(self.poll_interval):
+                return
+        self.logger.info(f"OCR worker service is up at {self.socket_path}")
+
+    def close(self):
+        self._closed.set()
+
+    def run_cover(self, image, target_language=None, cancel=None, timer=None):
+        """``ocr_runner.run_cover`` in a worker process; returns its result dict"""
+        return self._request("cover", [(None, image)], target_language, cancel, timer)
+
+    def run_covers(self, images, target_language=None, cancel=None, timer=None):
+        """``ocr_runner.run_covers`` in a worker process: ``[(result, elapsed_seconds), ...]``"""
+        outcomes = self._request("covers", images, target_language, cancel, timer)
+        return [(result, elapsed) for result, elapsed in outcomes]
+
+    def _request(self, op, images, target_language, cancel, timer):
+        segment = _ImageSegment(images)
+        with self._lock:
+            self._in_flight += 1
+            self._requests += 1
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(self.socket_path)
+                except (FileNotFoundError, ConnectionRefusedError) as e:
+                    with self._lock:
+                        self._unavailable += 1
+                    raise PoolTimeout(f"OCR worker service is not running at {self.socket_path}") from e
+                send_message(sock, {
+                    "op": op, "segment": segment.memory.name, "spans": segment.spans,
+                    "target_language": target_language,
+                })
+                sock.settimeout(self.poll_interval)
+                # Leaving this block closes the connection, which cancels the job in the worker
+                response = recv_message(sock, cancel)
+        except Exception:
+            with self._lock:
+                self._failures += 1
+            raise
+        finally:
+            segment.close()
+            with self._lock:
+                self._in_flight -= 1
+
+        for name, seconds in response.get("stages", {}).items():
+            OCR_STAGE_SECONDS.observe(seconds, stage=name)
+            if timer is not None:
+                timer.add(name, seconds)
+        if response["ok"]:
+            return response["result"]
+        with self._lock:
+            self._failures += 1
+        error = {"PoolTimeout": PoolTimeout, "OCRCancelled": OCRCancelled}.get(response["error"], OCRWorkerError)
+        raise error(response["message"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "warm_up_error": self.warm_up_error,
+                "memory_budget_mb": None,
+                "evictions": 0,
+                "pools": [],  # readers live in the worker processes
+                "worker_socket": self.socket_path,
+                "in_flight": self._in_flight,
+                "requests": self._requests,
+                "failures": self._failures,
+                "unavailable": self._unavailable,
+            }
+
+
+class _Worker:
+    """Body of one worker process: readers and cache for the process lifetime"""
+
+    def __init__(self, index, cpus):
+        self.index = index
+        self.cpus = cpus
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        """Returns the warm-up error, if any"""
+        from app import config
+        from app.services.ocr_pool import OCREnginePool
+        from app.services.ocr_cache import OCRResultCache
+
+        pin_to(self.cpus)
+        # One request at a time per process, so one reader per language set
+        self.ocr_pool = OCREnginePool(
+            size=1,
+            gpu=config.OCR_USE_GPU,
+            warm_languages=config.OCR_WARM_LANGUAGES,
+            default_languages=config.OCR_DEFAULT_LANGUAGES,
+            profile=config.OCR_PREPROCESS_PROFILE,
+            memory_budget_mb=config.OCR_READER_MEMORY_BUDGET_MB,
+            reader_memory_estimate_mb=config.OCR_READER_MEMORY_ESTIMATE_MB
+        )
+        self.ocr_cache = None
+        if config.OCR_CACHE_SIZE > 0:
+            self.ocr_cache = OCRResultCache(
+                max_entries=config.OCR_CACHE_SIZE,
+                ttl=config.OCR_CACHE_TTL,
+                disk_path=config.OCR_CACHE_PATH if config.OCR_CACHE_DISK else None,
+                perceptual=config.OCR_CACHE_PERCEPTUAL,
+                max_distance=config.OCR_CACHE_MAX_DISTANCE
+            )
+        self.ocr_pool.warm_up()
+        return self.ocr_pool.warm_up_error
+
+    def serve(self, listener):
+        while True:
+            conn, _ = listener.accept()
+            with conn:
+                try:
+                    self.handle(conn)
+                except (ConnectionError, OSError) as e:
+                    self.logger.warning(f"OCR worker {self.index}: dropped a connection: {e}")
+
+    def handle(self, conn):
+        from app.services import ocr_runner
+        from app.services.metrics import StageTimer
+
+        request = recv_message(conn)
+        cancel = threading.Event()
+        # The client sends nothing more; EOF means it gave up on the request
+        watcher = threading.Thread(target=self._watch, args=(conn, cancel), daemon=True)
+        watcher.start()
+
+        memory = shared_memory.SharedMemory(name=request["segment"])
+        # Python < 3.13 registers attached segments too; the client owns and unlinks this one
+        resource_tracker.unregister(memory._name, "shared_memory")
+        timer = StageTimer()
+        try:
+            images = [(filename, memory.buf[offset:offset + size]) for filename, offset, size in request["spans"]]
+            if request["op"] == "cover":
+                result = ocr_runner.run_cover(
+                    self.ocr_pool, self.ocr_cache, images[0][1], request["target_language"], cancel=cancel, timer=timer
+                )
+            else:
+                result = ocr_runner.run_covers(
+                    self.ocr_pool, self.ocr_cache, images, request["target_language"], cancel=cancel, timer=timer
+                )
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": type(e).__name__, "message": str(e)}
+        finally:
+            images = None
+            try:
+                memory.close()
+            except BufferError:
+                pass  # a view is still referenced; the mapping goes with it
+        response["stages"] = timer.stages
+
+        try:
+            if not cancel.is_set():
+                send_message(conn, response)
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # the client is gone
+        watcher.join()
+
+    @staticmethod
+    def _watch(conn, cancel):
+        try:
+            conn.recv(1)
+        except OSError:
+            pass
+        cancel.set()
+
+
+def _worker_main(listener, index, cpus, ready):
+    # The supervisor handles Ctrl-C and stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO)
+    worker = _Worker(index, cpus)
+    error = worker.load()
+    ready.put((index, os.getpid(), error))
+    if error:
+        sys.exit(1)
+    worker.serve(listener)
+
+
+class OCRWorkerService:
+    """Supervisor of the OCR worker processes
+
+    The socket is bound under a temporary name and moved into place once
+    every worker has loaded its readers, so its existence means "ready".
+    Workers that die are replaced on the same cores.
+    """
+
+    def __init__(self, socket_path, cpus=None, processes=0, threads=0):
+        self.socket_path = socket_path
+        if cpus is None:
+            cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)
+        self.slots = partition_cpus(cpus, processes, threads)
+        self.logger = logging.getLogger(__name__)
+
+        # The supervisor never loads torch, so forking is cheap and safe
+        self._context = multiprocessing.get_context("fork")
+        self._ready = self._context.Queue()
+        self._processes = {}
+
+    def _start(self, listener, index):
+        process = self._context.Process(
+            target=_worker_main, args=(listener, index, self.slots[index], self._ready),
+            name=f"ocr-worker-{index}", daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _wait_until_loaded(self):
+        loaded = set()
+        while len(loaded) < len(self.slots):
+            try:
+                index, pid, error = self._ready.get(timeout=1)
+            except queue.Empty:
+                for index, process in self._processes.items():
+                    if index not in loaded and process.exitcode is not None:
+                        raise RuntimeError(f"OCR worker {index} exited with code {process.exitcode} while loading")
+                continue
+            if error:
+                raise RuntimeError(f"OCR worker {index} failed to load its readers: {error}")
+            loaded.add(index)
+            self.logger.info(f"OCR worker {index} (pid {pid}) ready on CPUs {self.slots[index]}")
+
+    def serve(self):
+        """Run until SIGTERM or Ctrl-C"""
+        starting = f"{self.socket_path}.starting"
+        for path in (starting, self.socket_path):
+            if os.path.exists(path):
+                os.unlink(path)  # left behind by a previous run
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(starting)
+            # The web tier may run as another user of the same group
+            os.chmod(starting, 0o660)
+            listener.listen(BACKLOG)
+            for index in range(len(self.slots)):
+                self._start(listener, index)
+            self._wait_until_loaded()
+            os.replace(starting, self.socket_path)
+            self.logger.info(f"{len(self.slots)} OCR workers serving {self.socket_path}")
+
+            while True:
+                sentinels = {process.sentinel: index for index, process in self._processes.items()}
+                for sentinel in multiprocessing.connection.wait(list(sentinels)):
+                    index = sentinels[sentinel]
+                    self._processes[index].join()
+                    self.logger.error(
+                        f"OCR worker {index} exited with code {self._processes[index].exitcode}; restarting"
+                    )
+                    time.sleep(RESTART_DELAY)
+                    self._start(listener, index)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in self._processes.values():
+                process.terminate()
+            for process in self._processes.values():
+                process.join()
+            listener.close()
+            for path in (starting, self.socket_path):
+                if os.path.exists(path):
+                    os.unlink(path)
@@ -0,0 +1,492 @@
+# app/services/sheets_service.py
+"""Google Sheets sync: buffered, batched and rate limited
+
+Book changes are appended to a local write-ahead log (SQLite) and returned
+to the caller at once. ``SheetsSync.flush`` later reads the sheet once,
+merges every pending change per book, and writes only the cells that differ:
+one ``batch_update`` for edited rows, one ``delete_rows`` for deleted books
+and one ``append_rows`` for new ones.
+Entries leave the log only after the sheet accepted them; because each flush
+diffs against a fresh read of the sheet, replaying a log after a crash is safe.
+
+Every worker process logs changes, but only the holder of a lease row in the
+log's database flushes them, so the sheet is never read and appended to by
+two processes at once and one token bucket paces all API calls.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+
+# Sheet columns, in order; a sheet with a different header is mapped by name
+COLUMNS = [
+    "id", "title", "author", "translator", "publisher", "language", "original_language", "book_type",
+    "reading_status", "shelf_number", "fiction_type", "on_shelf", "personal_rating", "tags", "remarks",
+    "isbn", "created_at", "updated_at",
+]
+
+
+def cell_value(value) -> str:
+    """Python value as the string the sheet shows (what ``get_all_values`` returns)"""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+def column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class RetryableError(Exception):
+    """Raised by a backend for quota (429) and server (5xx) errors"""
+
+
+class LeaseLost(Exception):
+    """Raised when another process took over flushing in the middle of a flush"""
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SheetsWAL:
+    """Append-only log of book changes not yet written to the sheet"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sheets_wal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                book_id TEXT NOT NULL,
+                op TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sheets_lease (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def acquire_lease(self, owner, ttl, name="flush") -> bool:
+        """Take or renew the lease for ``ttl`` seconds; False while another owner holds it
+
+        The check and the write share one ``BEGIN IMMEDIATE`` transaction, so
+        of several processes sharing the log only one gets a free lease.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT owner, expires_at FROM sheets_lease WHERE name = ?", (name,)
+                ).fetchone()
+                held = row is None or row[0] == owner or row[1] < now
+                if held:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sheets_lease (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, owner, now + ttl),
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return held
+
+    def release_lease(self, owner, name="flush"):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sheets_lease WHERE name = ? AND owner = ?", (name, owner))
+
+    def append(self, entries):
+        """Log ``[(book_id, op, {column: value}), ...]`` in one transaction"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sheets_wal (book_id, op, fields, created_at) VALUES (?, ?, ?, ?)",
+                [(book_id, op, json.dumps(fields), now) for book_id, op, fields in entries],
+            )
+
+    def pending(self, limit=1000):
+        """Oldest entries first: ``[(seq, book_id, op, fields), ...]``"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, book_id, op, fields FROM sheets_wal ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, book_id, op, json.loads(fields)) for seq, book_id, op, fields in rows]
+
+    def ack(self, up_to_seq):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sheets_wal WHERE seq <= ?", (up_to_seq,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sheets_wal").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class GspreadBackend:
+    """A worksheet reached through gspread with service-account credentials"""
+
+    def __init__(self, credentials_path, spreadsheet_key, worksheet="Books"):
+        import gspread
+
+        self._errors = gspread.exceptions.APIError
+        client = gspread.service_account(filename=credentials_path)
+        self.spreadsheet = client.open_by_key(spreadsheet_key)
+        try:
+            self.worksheet = self.spreadsheet.worksheet(worksheet)
+        except gspread.exceptions.WorksheetNotFound:
+            self.worksheet = self.spreadsheet.add_worksheet(worksheet, rows=1000, cols=len(COLUMNS))
+
+    def _call(self, fn, *args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except self._errors as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status == 429 or (status is not None and status >= 500):
+                raise RetryableError(str(e)) from e
+            raise
+
+    def get_all_values(self):
+        return self._call(self.worksheet.get_all_values)
+
+    def batch_update(self, data):
+        # RAW: a title starting with "=" must not become a formula
+        return self._call(self.worksheet.batch_update, data, value_input_option="RAW")
+
+    def append_rows(self, rows):
+        return self._call(self.worksheet.append_rows, rows, value_input_option="RAW")
+
+    def delete_rows(self, numbers):
+        """Remove rows by 1-based number, all in one request"""
+        # Bottom first, so rows still to go keep their numbers
+        requests = [
+            {"deleteDimension": {"range": {
+                "sheetId": self.worksheet.id, "dimension": "ROWS", "startIndex": number - 1, "endIndex": number,
+            }}}
+            for number in sorted(numbers, reverse=True)
+        ]
+        return self._call(self.spreadsheet.batch_update, {"requests": requests})
+
+
+class FakeSheetsBackend:
+    """In-process stand-in for a worksheet, recording the API calls made
+
+    Handy for development without credentials (``GOOGLE_SHEETS_FAKE``) and
+    for exercising the sync engine; ``fail_next`` simulates quota errors.
+    """
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in rows or []]
+        self.calls = []
+        self.fail_next = 0
+
+    def _record(self, name):
+        self.calls.append(name)
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RetryableError("429: Quota exceeded (simulated)")
+
+    def get_all_values(self):
+        self._record("get_all_values")
+        return [list(row) for row in self.rows]
+
+    def batch_update(self, data):
+        self._record("batch_update")
+        for update in data:
+            start, _, _ = update["range"].partition(":")
+            column = 0
+            letters = start.rstrip("0123456789")
+            for char in letters:
+                column = column * 26 + ord(char) - 64
+            row = int(start[len(letters):]) - 1
+            for offset, value in enumerate(update["values"][0]):
+                while len(self.rows) <= row:
+                    self.rows.append([])
+                cells = self.rows[row]
+                while len(cells) <= column - 1 + offset:
+                    cells.append("")
+                cells[column - 1 + offset] = value
+
+    def append_rows(self, rows):
+        self._record("append_rows")
+        self.rows.extend(list(row) for row in rows)
+
+    def delete_rows(self, numbers):
+        self._record("delete_rows")
+        for number in sorted(numbers, reverse=True):
+            del self.rows[number - 1]
+
+
+class SheetsSync:
+    """Write-ahead buffered, diffing, rate-limited sync of books to one worksheet"""
+
+    def __init__(self, backend, wal: SheetsWAL, requests_per_minute=50, burst=5,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0, batch_size=1000, lease_ttl=120.0,
+                 book_lookup=None):
+        self.backend = backend
+        self.wal = wal
+        # book id -> ``Book`` or None, e.g. ``BookStore.get``: completes rows for
+        # updated books the sheet lacks (added by hand, or deleted from the sheet)
+        self.book_lookup = book_lookup
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        # Renewed before every API call, so it only has to outlast one call and its backoff
+        self.lease_ttl = max(lease_ttl, backoff_max + 30)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._flush_lock = threading.Lock()
+        self._task = None
+        self._counters = {"flushes": 0, "requests": 0, "retries": 0, "cells_written": 0, "rows_appended": 0,
+                          "rows_deleted": 0, "failures": 0}
+
+    # Recording changes (cheap, local)
+
+    def record_create(self, book):
+        """Queue a new ``Book`` (all columns)"""
+        self.record_creates([book])
+
+    def record_creates(self, books):
+        self.wal.append([(book.id, CREATE, book.model_dump(mode="json")) for book in books])
+
+    def record_update(self, book_id, update, updated_at=None):
+        """Queue the fields set on a ``BookUpdate``"""
+        fields = update.model_dump(mode="json", exclude_unset=True)
+        if updated_at is not None:
+            fields["updated_at"] = updated_at
+        if fields:
+            self.wal.append([(book_id, UPDATE, fields)])
+
+    def record_delete(self, book_id):
+        """Queue the removal of a deleted book's row"""
+        self.wal.append([(book_id, DELETE, {})])
+
+    # Flushing (talks to the API)
+
+    def _request(self, fn, *args):
+        """One rate-limited API call, retried with exponential backoff and jitter"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            if not self.wal.acquire_lease(self.owner, self.lease_ttl):
+                raise LeaseLost("Another process is flushing to the sheet")
+            self._counters["requests"] += 1
+            try:
+                return fn(*args)
+            except RetryableError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                self._counters["retries"] += 1
+                logger.warning(f"Sheets API busy ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def plan(self, sheet_rows, changes, partial=(), deleted=()):
+        """Header fixes, cell updates, removed and new rows turning ``sheet_rows`` into ``changes``
+
+        ``changes`` maps book id -> merged ``{column: value}``; rows of the
+        books in ``deleted`` go. Returns ``(batch_update data, row numbers to
+        delete, rows to append)``; unchanged cells are left out.
+        Books in ``partial`` have only some columns in ``changes`` (updates
+        without their create); one missing from the sheet is appended
+        whole from ``book_lookup``, or skipped when that can't find it.
+        """
+        header = list(sheet_rows[0]) if sheet_rows else []
+        updates = []
+        missing = [column for column in COLUMNS if column not in header]
+        if missing and header:
+            # Columns added since the sheet was created go on the right
+            updates.append({
+                "range": f"{column_letter(len(header))}1:{column_letter(len(header) + len(missing) - 1)}1",
+                "values": [missing],
+            })
+        header += missing
+        position = {name: i for i, name in enumerate(header)}
+        id_column = position["id"]
+        row_of = {}
+        for number, row in enumerate(sheet_rows[1:], start=2):
+            if len(row) > id_column and row[id_column]:
+                row_of[row[id_column]] = (number, row)
+
+        appends = []
+        for book_id, fields in changes.items():
+            values = {name: cell_value(value) for name, value in fields.items() if name in position}
+            values["id"] = book_id
+            if book_id not in row_of:
+                if book_id in partial:
+                    book = self.book_lookup(book_id) if self.book_lookup is not None else None
+                    if book is None:
+                        logger.warning(f"Book {book_id} is not in the sheet and not stored; update skipped")
+                        continue
+                    # The stored book is at least as new as the logged change
+                    values = {name: cell_value(value) for name, value in book.model_dump(mode="json").items()
+                              if name in position}
+                row = [""] * len(header)
+                for name, value in values.items():
+                    row[position[name]] = value
+                appends.append(row)
+                continue
+
+            number, current = row_of[book_id]
+            by_column = {position[name]: value for name, value in values.items()}
+            changed = sorted(
+                position[name] for name, value in values.items()
+                if (current[position[name]] if position[name] < len(current) else "") != value
+            )
+            # One range per run of adjacent changed cells
+            run = []
+            for column in changed + [None]:
+                if run and (column is None or column != run[-1] + 1):
+                    updates.append({
+                        "range": f"{column_letter(run[0])}{number}:{column_letter(run[-1])}{number}",
+                        "values": [[by_column[c] for c in run]],
+                    })
+                    run = []
+                if column is not None:
+                    run.append(column)
+
+        if not sheet_rows:
+            appends.insert(0, header)
+        deletions = [row_of[book_id][0] for book_id in deleted if book_id in row_of]
+        return updates, sorted(deletions), appends
+
+    def flush(self) -> dict:
+        """Write pending changes; returns what was sent. Blocking, one flush at a time."""
+        with self._flush_lock:
+            entries = self.wal.pending(self.batch_size)
+            if not entries or not self.wal.acquire_lease(self.owner, self.lease_ttl):
+                # Nothing to do, or another process is the flusher
+                return {"entries": 0, "cells": 0, "rows": 0, "deleted": 0}
+
+            changes, created, deleted = {}, set(), set()
+            for _, book_id, op, fields in entries:
+                if op == DELETE:
+                    # Whatever was logged for the book before no longer matters
+                    deleted.add(book_id)
+                    changes.pop(book_id, None)
+                    continue
+                if book_id in deleted:
+                    continue
+                # Creates and later updates of one book collapse into one set of cells
+                changes.setdefault(book_id, {}).update(fields)
+                if op == CREATE:
+                    created.add(book_id)
+
+            try:
+                sheet_rows = self._request(self.backend.get_all_values)
+                updates, deletions, appends = self.plan(
+                    sheet_rows, changes, partial=changes.keys() - created, deleted=deleted
+                )
+                # Cell updates use row numbers read before any row is removed
+                if updates:
+                    self._request(self.backend.batch_update, updates)
+                if deletions:
+                    self._request(self.backend.delete_rows, deletions)
+                if appends:
+                    self._request(self.backend.append_rows, appends)
+            except LeaseLost:
+                raise
+            except Exception:
+                self._counters["failures"] += 1
+                raise
+
+            self.wal.ack(entries[-1][0])
+            cells = sum(len(update["values"][0]) for update in updates)
+            self._counters["flushes"] += 1
+            self._counters["cells_written"] += cells
+            self._counters["rows_appended"] += len(appends)
+            self._counters["rows_deleted"] += len(deletions)
+            return {"entries": len(entries), "cells": cells, "rows": len(appends), "deleted": len(deletions)}
+
+    def flush_all(self):
+        """Flush until the log is empty"""
+        while len(self.wal):
+            if not self.flush()["entries"]:
+                break
+
+    async def start(self, interval):
+        """Flush in the background every ``interval`` seconds"""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.flush_all)
+                except LeaseLost as e:
+                    logger.info(f"Sheets sync handed over: {e}")
+                except Exception as e:
+                    # Entries stay in the log for the next attempt
+                    logger.error(f"Sheets sync failed: {e}")
+
+        self._task = asyncio.create_task(loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush_all)
+        except Exception as e:
+            logger.error(f"Final Sheets sync failed, {len(self.wal)} changes kept for next start: {e}")
+        # A sibling still running takes over without waiting for the lease to expire
+        await asyncio.to_thread(self.wal.release_lease, self.owner)
+
+    def stats(self) -> dict:
+        return {**self._counters, "pending": len(self.wal)}
@@ -0,0 +1,117 @@
+# app/services/shelf_stats.py
+"""Per-shelf counters kept next to the books they count
+
+Each shelf has a handful of rows in ``shelf_stats``, one per counter:
+``books``, ``on_shelf``, ``rated``, ``rating_sum`` and one per value of
+``reading_status``, ``book_type`` and ``fiction_type`` (e.g.
+``reading_status:read``). A book contributes +1 to the counters that
+describe it. Inserts, updates and deletes add or subtract only the counters
+of the rows they touch, so a shelf's statistics are read from a few index
+rows however large the library grows.
+
+``aggregate`` computes the same counters from the books table with GROUP
+BY. It is what ``BookStore.rebuild_shelf_stats`` compares against and
+writes back if they have drifted.
+"""
+from collections import Counter
+
+# Book columns the counters depend on; an update touching none of them leaves them alone
+STAT_FIELDS = ("shelf_number", "reading_status", "book_type", "fiction_type", "on_shelf", "personal_rating")
+GROUPED_FIELDS = ("reading_status", "book_type", "fiction_type")
+
+# Books without a shelf are counted under this name
+NO_SHELF = ""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shelves (
+    name TEXT PRIMARY KEY,
+    description TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shelf_stats (
+    shelf TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (shelf, counter)
+) WITHOUT ROWID;
+"""
+
+
+def shelf_key(shelf_number):
+    return shelf_number if shelf_number else NO_SHELF
+
+
+def book_counters(book, sign=1, counts=None) -> Counter:
+    """Add (``sign=-1``: subtract) one book's contribution to ``counts``
+
+    ``book`` is a mapping of ``STAT_FIELDS`` to their database values.
+    Keys of the result are ``(shelf, counter)``.
+    """
+    counts = Counter() if counts is None else counts
+    shelf = shelf_key(book["shelf_number"])
+    counts[shelf, "books"] += sign
+    if book["on_shelf"]:
+        counts[shelf, "on_shelf"] += sign
+    if book["personal_rating"] is not None:
+        counts[shelf, "rated"] += sign
+        counts[shelf, "rating_sum"] += sign * book["personal_rating"]
+    for field in GROUPED_FIELDS:
+        counts[shelf, f"{field}:{book[field]}"] += sign
+    return counts
+
+
+def apply(conn, counts):
+    """Add ``(shelf, counter) -> delta`` to the stored counters; caller holds the transaction"""
+    conn.executemany(
+        "INSERT INTO shelf_stats (shelf, counter, count) VALUES (?, ?, ?) "
+        "ON CONFLICT (shelf, counter) DO UPDATE SET count = count + excluded.count",
+        [(shelf, counter, delta) for (shelf, counter), delta in counts.items() if delta],
+    )
+
+
+def aggregate(conn) -> Counter:
+    """Every counter recomputed from the books table"""
+    counts = Counter()
+    shelf = f"coalesce(shelf_number, '{NO_SHELF}')"
+    rows = conn.execute(
+        f"SELECT {shelf}, count(*), sum(on_shelf), count(personal_rating), total(personal_rating) "
+        f"FROM books GROUP BY 1"
+    )
+    for name, books, on_shelf, rated, rating_sum in rows:
+        counts[name, "books"] = books
+        counts[name, "on_shelf"] = on_shelf
+        counts[name, "rated"] = rated
+        counts[name, "rating_sum"] = int(rating_sum)
+    for field in GROUPED_FIELDS:
+        for name, value, books in conn.execute(f"SELECT {shelf}, {field}, count(*) FROM books GROUP BY 1, 2"):
+            counts[name, f"{field}:{value}"] = books
+    return +counts  # drop zeros
+
+
+def stored(conn) -> Counter:
+    """Every stored non-zero counter"""
+    return Counter({
+        (shelf, counter): count
+        for shelf, counter, count in conn.execute("SELECT shelf, counter, count FROM shelf_stats WHERE count != 0")
+    })
+
+
+def summarize(counters) -> dict:
+    """``{counter: count}`` of one shelf (or the sum of several) as the fields of ``ShelfStats``"""
+    books = counters.get("books", 0)
+    rated = counters.get("rated", 0)
+    stats = {
+        "books": books,
+        "on_shelf": counters.get("on_shelf", 0),
+        "lent_out": books - counters.get("on_shelf", 0),
+        "rated": rated,
+        "average_rating": round(counters.get("rating_sum", 0) / rated, 2) if rated else None,
+    }
+    for field in GROUPED_FIELDS:
+        stats[field] = {}
+    for counter, count in counters.items():
+        field, _, value = counter.partition(":")
+        if value and count:
+            stats[field][value] = count
+    return stats
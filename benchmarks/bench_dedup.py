@@ -0,0 +1,105 @@
+# benchmarks/bench_dedup.py
+"""Benchmark: duplicate detection accuracy and ingest throughput as the library grows
+
+    python -m benchmarks.bench_dedup                        # 200k books in batches of 20k
+    python -m benchmarks.bench_dedup --books 1000000 --batch 50000 --probes 500
+
+The synthetic library of ``bench_search`` is stored through ``bulk_insert``
+batch by batch; books per second for each batch should stay flat, since the
+MinHash band keys of a new book cost the same however many are stored.
+Each batch also times ``find_duplicates`` for new titles.
+
+Accuracy is then measured on probes: stored books re-entered the way people
+and OCR re-enter them (other case and punctuation, "Rowling, J.K." for
+"J.K. Rowling", a misread letter, a subtitle cut off), which should be
+found, and other stored titles with one word replaced, which should not.
+Results are JSON.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.services.book_store import BookStore
+from benchmarks.bench_search import make_library, ocr_damage, word, percentile
+
+
+def reenter(book, rng):
+    """``book`` as a second, differently written entry of the same book"""
+    title, author = book.title, book.author
+    variant = rng.choice(["case", "punctuation", "author", "ocr", "truncated"])
+    if variant == "case":
+        title = title.upper()
+    elif variant == "punctuation":
+        title = title.replace(" ", ": ", 1) + "."
+    elif variant == "author":
+        first, _, last = author.partition(" ")
+        author = f"{last}, {first}"
+    elif variant == "ocr":
+        title = ocr_damage(title, rng)
+    else:
+        title = title.rsplit(" ", 1)[0]
+    return variant, {"title": title, "author": author}
+
+
+def different(book, rng):
+    """Another book in the same series or by the same author: one title word replaced"""
+    words = book.title.split()
+    words[rng.randrange(len(words))] = word(rng)
+    return {"title": " ".join(words), "author": book.author}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=200000, help="library size")
+    parser.add_argument("--batch", type=int, default=20000, help="books per bulk insert")
+    parser.add_argument("--probes", type=int, default=300, help="duplicate and non-duplicate probes each")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        store = BookStore(os.path.join(directory, "books.sqlite3"))
+        library = make_library(args.books)
+        books, batches = [], []
+        while len(books) < args.books:
+            batch = [next(library) for _ in range(min(args.batch, args.books - len(books)))]
+            started = time.perf_counter()
+            books += store.bulk_insert(batch)
+            elapsed = time.perf_counter() - started
+            timings = []
+            for book in rng.sample(batch, min(100, len(batch))):
+                started = time.perf_counter()
+                store.find_duplicates(different(book, rng))
+                timings.append((time.perf_counter() - started) * 1000)
+            batches.append({"stored": len(books), "books_per_second": round(len(batch) / elapsed),
+                            "check_p50_ms": round(percentile(timings, 0.5), 2),
+                            "check_p95_ms": round(percentile(timings, 0.95), 2)})
+
+        # Titles of two words or fewer are too generic to call duplicates on
+        sample = rng.sample([book for book in books if len(book.title.split()) > 2], args.probes)
+        found, by_variant = 0, {}
+        for book in sample:
+            variant, probe = reenter(book, rng)
+            hit = any(match.id == book.id for _, match in store.find_duplicates(probe, limit=10))
+            found += hit
+            by_variant.setdefault(variant, []).append(hit)
+        false_alarms = sum(bool(store.find_duplicates(different(book, rng))) for book in sample)
+        store.close()
+
+    print(json.dumps({
+        "books": args.books,
+        "batches": batches,
+        "throughput_spread": round(
+            statistics.pstdev(b["books_per_second"] for b in batches) / statistics.mean(b["books_per_second"] for b in batches), 3
+        ),
+        "recall": round(found / len(sample), 3),
+        "recall_by_variant": {variant: round(sum(hits) / len(hits), 3) for variant, hits in sorted(by_variant.items())},
+        "false_alarm_rate": round(false_alarms / len(sample), 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
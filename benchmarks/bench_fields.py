@@ -0,0 +1,145 @@
+# benchmarks/bench_fields.py
+"""Micro-benchmark: parse_book_info field extraction on OCR line fixtures
+
+    python -m benchmarks.bench_fields                     # 20,000 synthetic covers
+    python -m benchmarks.bench_fields --covers 100000
+
+Fixtures are generated from a fixed seed: each cover is the filtered
+detections ``OCRService.filter_detections`` would return (text, confidence,
+bbox), in shuffled order, with the title split over one or two large lines
+and decoy lines (series names, blurbs, prices). The pre-engine regex loop is
+kept here as ``legacy_parse`` for comparison, against the engine with the
+same rules and with the bundled multilingual rules. Results are printed as JSON.
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+
+from app.services.field_extractor import FieldExtractor, get_extractor
+from benchmarks.bench_ocr import normalize
+from benchmarks.make_corpus import BOOKS
+
+# The rules legacy_parse hard-codes, for a like-for-like comparison
+LEGACY_RULES = {
+    "author": [r"^by\s+(?P<value>.+)$", r"^(?P<value>.+)\s+author$", r"written\s+by\s+(?P<value>.+)$"],
+    "translator": [r"translated\s+by\s+(?P<value>.+)$", r"translator:\s*(?P<value>.+)$",
+                   r"trans\.\s+(?P<value>.+)$"],
+    "publisher": [r"published\s+by\s+(?P<value>.+)$", r"publisher:\s*(?P<value>.+)$"],
+}
+
+DECOYS = ["A Novel", "Penguin Classics", "$12.99", "The classic tale of love and money",
+          "Now a major motion picture", "Vintage", "Oxford World's Classics", "Complete and Unabridged"]
+
+
+def legacy_parse(text_list):
+    """parse_book_info as it was before FieldExtractor (author/translator/publisher subset)"""
+    sorted_text = sorted(text_list, key=lambda x: (-x["confidence"], x["bbox"][0][1]))
+    title = author = translator = publisher = ""
+    author_patterns = [r'^by\s+(.+)$', r'^(.+)\s+author$', r'written\s+by\s+(.+)$']
+    translator_patterns = [r'translated\s+by\s+(.+)$', r'translator:\s*(.+)$', r'trans\.\s+(.+)$']
+    publisher_patterns = [r'published\s+by\s+(.+)$', r'publisher:\s*(.+)$']
+    if sorted_text:
+        title = sorted_text[0]["text"]
+    for item in sorted_text[1:]:
+        text = item["text"].lower().strip()
+        for pattern in author_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match and not author:
+                author = match.group(1).strip()
+                break
+        for pattern in translator_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match and not translator:
+                translator = match.group(1).strip()
+                break
+        for pattern in publisher_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match and not publisher:
+                publisher = match.group(1).strip()
+                break
+        if not author and len(text.split()) <= 4 and item["confidence"] > 0.7:
+            author = item["text"]
+    return {"title": title, "author": author, "translator": translator, "publisher": publisher}
+
+
+def line(text, top, height, confidence, left=60):
+    width = int(len(text) * height * 0.55)
+    return {"text": text, "confidence": confidence,
+            "bbox": [[left, top], [left + width, top], [left + width, top + height], [left, top + height]]}
+
+
+def make_fixtures(count, seed=7):
+    """``[(text_list, {"title": ..., "author": ...}), ...]``"""
+    rng = random.Random(seed)
+    fixtures = []
+    for _ in range(count):
+        title, author, author_line, extra = rng.choice(BOOKS)
+        height = rng.randint(48, 90)
+        top = rng.randint(80, 220)
+        words = title.split()
+        if len(words) > 2 and rng.random() < 0.5:
+            cut = len(words) // 2
+            parts = [" ".join(words[:cut]), " ".join(words[cut:])]
+        else:
+            parts = [title]
+        lines = []
+        for part in parts:
+            lines.append(line(part, top, height + rng.randint(-3, 3), rng.uniform(0.55, 0.99)))
+            top += int(height * 1.25)
+        lines.append(line(author_line, rng.randint(650, 760), rng.randint(26, 40), rng.uniform(0.75, 0.99)))
+        if extra:
+            lines.append(line(extra, rng.randint(800, 840), rng.randint(16, 24), rng.uniform(0.6, 0.99)))
+        for decoy in rng.sample(DECOYS, rng.randint(0, 3)):
+            lines.append(line(decoy, rng.randint(300, 620), rng.randint(14, 28), rng.uniform(0.4, 0.99)))
+        rng.shuffle(lines)
+        fixtures.append((lines, {"title": title, "author": author}))
+    return fixtures
+
+
+def measure(parse, fixtures, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        results = [parse(text_list) for text_list, _ in fixtures]
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    accuracy = {
+        field: round(statistics.mean(
+            1.0 if normalize(result[field]) == normalize(truth[field]) else 0.0
+            for result, (_, truth) in zip(results, fixtures)
+        ), 3)
+        for field in ("title", "author")
+    }
+    return {
+        "us_per_cover": round(best / len(fixtures) * 1e6, 2),
+        "covers_per_second": round(len(fixtures) / best),
+        "accuracy": accuracy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--covers", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3, help="timed passes; the fastest is reported")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.covers)
+    extractor = get_extractor()
+    report = {
+        "covers": len(fixtures),
+        "lines": sum(len(text_list) for text_list, _ in fixtures),
+        "legacy": measure(legacy_parse, fixtures, args.rounds),
+        "extractor_legacy_rules": measure(FieldExtractor(LEGACY_RULES).extract, fixtures, args.rounds),
+        "extractor": measure(extractor.extract, fixtures, args.rounds),
+    }
+    report["speedup_legacy_rules"] = round(
+        report["legacy"]["us_per_cover"] / report["extractor_legacy_rules"]["us_per_cover"], 2
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# benchmarks/bench_http.py
+"""Load test: bytes per page view and requests per second, without and with HTTP caching
+
+    python -m benchmarks.bench_http                          # 2,000 books, 10 s per mode
+    python -m benchmarks.bench_http --books 20000 --clients 8 --seconds 30
+
+run.py is launched (WEB_ONLY) on a copy of a synthetic library twice:
+``before`` with HTTP_CACHING=false, as a plain StaticFiles mount with no
+ETags or compression, and ``after`` with the defaults. Run
+``python -m app.cli build-static`` first so the precompressed static files
+exist.
+
+Clients behave like browsers on keep-alive connections. They send
+Accept-Encoding: gzip, br, keep a cache of what they were sent (ETag,
+Last-Modified, max-age) and fetch the /static/ files a page links to.
+Per page, ``cold`` is a first visit and ``warm`` a repeat visit, counting
+status lines, headers and bodies as sent on the wire. Throughput is then
+measured with ``--clients`` warm browsers viewing the pages in turn.
+Results are JSON.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from app.services.book_store import BookStore
+from utils.http_cache import brotli
+from benchmarks.bench_search import make_library
+from benchmarks.bench_startup import free_port
+
+PAGES = ["/", "/books/library", "/shelves/manage", "/books/api?limit=50", "/shelves/api"]
+ASSET = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class Browser:
+    """One keep-alive connection and an HTTP cache, as a browser tab has"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.cache = {}  # url -> (validators, fresh until)
+        self.assets = {}  # page -> static URLs it links to
+        self.requests = 0
+        self.bytes = 0
+
+    def get(self, url):
+        """Decoded body of ``url`` if it was sent, None if answered from the cache or by a 304"""
+        validators, fresh_until = self.cache.get(url, ({}, 0))
+        if time.monotonic() < fresh_until:
+            return None
+        headers = {"Accept-Encoding": "gzip, br" if brotli is not None else "gzip"}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last-modified" in validators:
+            headers["If-Modified-Since"] = validators["last-modified"]
+        self.connection.request("GET", url, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        self.requests += 1
+        self.bytes += (len(f"HTTP/1.1 {response.status} {response.reason}\r\n") + 2 + len(body)
+                       + sum(len(name) + len(value) + 4 for name, value in response.getheaders()))
+        if response.status == 304:
+            return None
+        cache_control = response.getheader("cache-control") or ""
+        max_age = MAX_AGE.search(cache_control)
+        self.cache[url] = (
+            {name: response.getheader(name) for name in ("etag", "last-modified") if response.getheader(name)},
+            time.monotonic() + int(max_age.group(1)) if max_age and "no-cache" not in cache_control else 0,
+        )
+        coding = response.getheader("content-encoding")
+        if coding == "gzip":
+            body = gzip.decompress(body)
+        elif coding == "br":
+            body = brotli.decompress(body)
+        return body
+
+    def view(self, page):
+        """Load a page and the static files it links to"""
+        body = self.get(page)
+        if body is not None:
+            self.assets[page] = ASSET.findall(body.decode("utf-8", "replace"))
+        for url in self.assets.get(page, []):
+            self.get(url)
+
+    def close(self):
+        self.connection.close()
+
+
+def serve(data_dir, caching):
+    port = free_port()
+    env = {**os.environ, "HOST": "127.0.0.1", "PORT": str(port), "WEB_CONCURRENCY": "1", "LOG_LEVEL": "warning",
+           "WEB_ONLY": "true", "BOOKKEEPER_DATA_DIR": data_dir, "HTTP_CACHING": "true" if caching else "false"}
+    process = subprocess.Popen([sys.executable, "run.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.monotonic()
+    while time.monotonic() - started < 60:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health/live", timeout=1).ok:
+                return process, port
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("run.py did not start")
+
+
+def page_views(port):
+    """``{page: {cold_bytes, warm_bytes, cold_requests, warm_requests}}``"""
+    report = {}
+    for page in PAGES:
+        browser = Browser(port)
+        browser.view(page)
+        cold_bytes, cold_requests = browser.bytes, browser.requests
+        browser.view(page)
+        report[page] = {"cold_bytes": cold_bytes, "warm_bytes": browser.bytes - cold_bytes,
+                        "cold_requests": cold_requests, "warm_requests": browser.requests - cold_requests}
+        browser.close()
+    return report
+
+
+def throughput(port, clients, seconds):
+    browsers = [Browser(port) for _ in range(clients)]
+    for browser in browsers:
+        for page in PAGES:
+            browser.view(page)  # warm up: what a returning visitor has cached
+        browser.requests = browser.bytes = 0
+    views = [0] * clients
+    deadline = time.monotonic() + seconds
+
+    def run(index):
+        browser = browsers[index]
+        while time.monotonic() < deadline:
+            browser.view(PAGES[views[index] % len(PAGES)])
+            views[index] += 1
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    total_requests = sum(browser.requests for browser in browsers)
+    total_bytes = sum(browser.bytes for browser in browsers)
+    for browser in browsers:
+        browser.close()
+    return {
+        "page_views_per_second": round(sum(views) / elapsed, 1),
+        "requests_per_second": round(total_requests / elapsed, 1),
+        "bytes_per_page_view": round(total_bytes / max(1, sum(views))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000, help="library size")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent browsers for the throughput run")
+    parser.add_argument("--seconds", type=float, default=10, help="length of each throughput run")
+    args = parser.parse_args()
+
+    report = {"books": args.books}
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = BookStore(os.path.join(data_dir, "books.sqlite3"))
+        store.bulk_insert(make_library(args.books))
+        store.close()
+        for mode, caching in (("before", False), ("after", True)):
+            process, port = serve(data_dir, caching)
+            try:
+                views = page_views(port)
+                report[mode] = {
+                    "pages": views,
+                    "cold_bytes_per_view": round(sum(v["cold_bytes"] for v in views.values()) / len(views)),
+                    "warm_bytes_per_view": round(sum(v["warm_bytes"] for v in views.values()) / len(views)),
+                    **throughput(port, args.clients, args.seconds),
+                }
+            finally:
+                process.terminate()
+                process.wait()
+
+    before, after = report["before"], report["after"]
+    report["cold_bytes_saved"] = round(1 - after["cold_bytes_per_view"] / before["cold_bytes_per_view"], 3)
+    report["warm_bytes_saved"] = round(1 - after["warm_bytes_per_view"] / before["warm_bytes_per_view"], 3)
+    report["throughput_ratio"] = round(after["page_views_per_second"] / before["page_views_per_second"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_language.py
+"""Micro-benchmark: language detection of recognised cover text
+
+    python -m benchmarks.bench_language                  # 2,000 synthetic covers
+    python -m benchmarks.bench_language --covers 10000
+
+Each fixture is the text of one cover, labelled with its language. English
+covers come from the benchmark corpus (plus decoy lines); Spanish, French,
+German, Italian, Portuguese, Japanese, Korean and Chinese ones from short
+title/author lists. ``legacy`` runs langdetect on every cover, as
+``OCRService.detect_language`` did; ``batched`` is
+``ocr_languages.detect_languages`` over all of them. Reported: time per
+cover, accuracy against the labels, and how many covers still needed
+langdetect. Results are JSON.
+"""
+import argparse
+import json
+import random
+import time
+
+from app.services import ocr_languages
+from benchmarks.make_corpus import BOOKS
+
+OTHER_COVERS = {
+    "Spanish": ["Cien años de soledad", "El amor en los tiempos del cólera", "La casa de los espíritus",
+                "Don Quijote de la Mancha", "Crónica de una muerte anunciada", "La sombra del viento"],
+    "French": ["Le Petit Prince", "Les Misérables", "À la recherche du temps perdu", "Le Comte de Monte-Cristo",
+               "L'Étranger", "Les Fleurs du mal et autres poèmes"],
+    "German": ["Der Zauberberg", "Die Verwandlung und andere Erzählungen", "Der Prozess",
+               "Die Leiden des jungen Werther", "Das Parfum: Die Geschichte eines Mörders"],
+    "Italian": ["Il nome della rosa", "La coscienza di Zeno", "I promessi sposi", "Il Gattopardo",
+                "Se una notte d'inverno un viaggiatore"],
+    "Portuguese": ["O Alquimista", "Dom Casmurro", "Memórias Póstumas de Brás Cubas", "Ensaio sobre a cegueira",
+                   "O Primo Basílio"],
+    "Japanese": ["ノルウェイの森 村上春樹", "吾輩は猫である 夏目漱石", "雪国 川端康成", "人間失格 太宰治"],
+    "Korean": ["채식주의자 한강", "82년생 김지영 조남주", "엄마를 부탁해 신경숙"],
+    "Chinese": ["红楼梦 曹雪芹", "三体 刘慈欣", "活着 余华", "围城 钱锺书"],
+}
+AUTHORS = ["Gabriel García Márquez", "Victor Hugo", "Thomas Mann", "Umberto Eco", "José Saramago", "Italo Calvino"]
+DECOYS = ["A Novel", "Penguin Classics", "$12.99", "Vintage", "Complete and Unabridged", "Bestseller"]
+
+
+def make_fixtures(count, seed=1):
+    """``[(cover text, language), ...]``, about half English as in a typical library"""
+    rng = random.Random(seed)
+    fixtures = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            title, _, author_line, extra = rng.choice(BOOKS)
+            lines = [title, author_line] + ([extra] if extra else []) + rng.sample(DECOYS, rng.randint(0, 1))
+            text, language = " ".join(lines), "English"
+        else:
+            language = rng.choice(sorted(OTHER_COVERS))
+            text = rng.choice(OTHER_COVERS[language])
+            if language in ("Spanish", "French", "German", "Italian", "Portuguese"):
+                text += " " + rng.choice(AUTHORS)
+        # A price or catalogue number keeps covers distinct without changing their language
+        fixtures.append((f"{text} {rng.randint(1000, 99999)}", language))
+    return fixtures
+
+
+def legacy_detect(texts):
+    names = []
+    for text in texts:
+        try:
+            code = ocr_languages.detect(text)
+        except Exception:
+            names.append("unknown")
+            continue
+        lang_map = dict(ocr_languages.LANGUAGE_NAMES)  # rebuilt per call, as it was
+        names.append(lang_map.get(code, code))
+    return names
+
+
+def measure(detect_all, fixtures, rounds):
+    texts = [text for text, _ in fixtures]
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        names = detect_all(texts)
+        best = min(best, time.perf_counter() - started)
+    correct = sum(name == language for name, (_, language) in zip(names, fixtures))
+    return {
+        "us_per_cover": round(best / len(texts) * 1e6, 1),
+        "accuracy": round(correct / len(texts), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--covers", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3, help="timed passes; the fastest is reported")
+    args = parser.parse_args()
+
+    fixtures = make_fixtures(args.covers)
+    ocr_languages.detect("warm up langdetect's profiles")
+
+    texts = [text for text, _ in fixtures]
+    scripts = ocr_languages.classify_scripts(texts)
+    needs_langdetect = sum(
+        script == "latin" and ocr_languages.stopword_language(text) is None for text, script in zip(texts, scripts)
+    )
+    report = {
+        "covers": len(fixtures),
+        "legacy": measure(legacy_detect, fixtures, args.rounds),
+        "batched": measure(ocr_languages.detect_languages, fixtures, args.rounds),
+        "langdetect_share": round(needs_langdetect / len(fixtures), 4),
+    }
+    report["speedup"] = round(report["legacy"]["us_per_cover"] / report["batched"]["us_per_cover"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
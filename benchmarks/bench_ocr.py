@@ -0,0 +1,195 @@
+# benchmarks/bench_ocr.py
+"""End-to-end OCR benchmark over the checked-in synthetic cover corpus
+
+    python -m benchmarks.bench_ocr                                  # pool sizes 1 and 2, JSON to stdout
+    python -m benchmarks.bench_ocr --output bench.json              # save a baseline
+    python -m benchmarks.bench_ocr --baseline bench.json            # exit 1 on a regression
+
+Every cover in ``benchmarks/corpus`` (see ``make_corpus``) goes through the
+same path as an upload (``ocr_runner.run_cover``, without the result cache)
+on an ``OCREnginePool`` of each requested size, with as many concurrent
+callers as readers. Reports per-stage p50/p95 latency, images per second,
+peak RSS and title/author accuracy of ``parse_book_info``. Needs the EasyOCR
+models.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import ocr_runner
+from app.services.metrics import StageTimer
+from app.services.ocr_pool import OCREnginePool
+from benchmarks.bench_preprocess import percentile
+from benchmarks.make_corpus import CORPUS_DIR
+
+
+def load_corpus(directory):
+    with open(os.path.join(directory, "truth.json")) as f:
+        truth = json.load(f)
+    corpus = []
+    for filename in sorted(truth):
+        with open(os.path.join(directory, filename), "rb") as f:
+            corpus.append((filename, f.read()))
+    return corpus, truth
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text or "").casefold().split())
+
+
+def token_f1(expected, found):
+    expected, found = normalize(expected).split(), normalize(found).split()
+    common = sum(min(expected.count(w), found.count(w)) for w in set(expected))
+    if not common:
+        return 0.0
+    precision, recall = common / len(found), common / len(expected)
+    return 2 * precision * recall / (precision + recall)
+
+
+def field_accuracy(results, truth, field):
+    """Exact (normalised) match rate and mean token F1 for one book_info field"""
+    exact, f1 = [], []
+    for filename, result in results.items():
+        found = (result.get("book_info") or {}).get(field, "") if result.get("success") else ""
+        expected = truth[filename][field]
+        exact.append(1.0 if normalize(found) == normalize(expected) else 0.0)
+        f1.append(token_f1(expected, found))
+    return {"exact": round(statistics.mean(exact), 3), "token_f1": round(statistics.mean(f1), 3)}
+
+
+def summarize(seconds):
+    return {
+        "p50_ms": round(statistics.median(seconds) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 0.95) * 1000, 2),
+        "count": len(seconds),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pool_size(corpus, size, repeat, profile, gpu, target_language):
+    ocr_pool = OCREnginePool(size=size, gpu=gpu, profile=profile)
+    started = time.perf_counter()
+    ocr_pool.warm_up()
+    warm_up = time.perf_counter() - started
+    if ocr_pool.warm_up_error:
+        raise RuntimeError(f"Could not load the OCR readers: {ocr_pool.warm_up_error}")
+
+    def one(item):
+        filename, image = item
+        timer = StageTimer()
+        started = time.perf_counter()
+        result = ocr_runner.run_cover(ocr_pool, None, image, target_language, timer=timer)
+        return filename, result, time.perf_counter() - started, timer.stages
+
+    work = [item for _ in range(repeat) for item in corpus]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=size) as workers:
+        outcomes = list(workers.map(one, work))
+    wall = time.perf_counter() - started
+
+    stages = {}
+    for _, _, _, timings in outcomes:
+        for name, seconds in timings.items():
+            stages.setdefault(name, []).append(seconds)
+    return {
+        "pool_size": size,
+        "warm_up_s": round(warm_up, 2),
+        "images_per_second": round(len(work) / wall, 3),
+        "latency_ms": summarize([elapsed for _, _, elapsed, _ in outcomes]),
+        "stages": {name: summarize(seconds) for name, seconds in sorted(stages.items())},
+    }, {filename: result for filename, result, _, _ in outcomes}
+
+
+def regressions(report, baseline, max_slowdown, max_accuracy_drop):
+    """Human-readable list of metrics that got worse than ``baseline`` allows"""
+    failures = []
+    previous_runs = {run["pool_size"]: run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        before = previous_runs.get(run["pool_size"])
+        if before is None:
+            continue
+        size = run["pool_size"]
+        for key in ("p50_ms", "p95_ms"):
+            limit = before["latency_ms"][key] * (1 + max_slowdown)
+            if run["latency_ms"][key] > limit:
+                failures.append(f"pool {size}: latency {key} {run['latency_ms'][key]} > {limit:.2f}")
+        limit = before["images_per_second"] / (1 + max_slowdown)
+        if run["images_per_second"] < limit:
+            failures.append(f"pool {size}: {run['images_per_second']} images/s < {limit:.3f}")
+    for field, scores in report["accuracy"].items():
+        for key, value in scores.items():
+            previous = baseline.get("accuracy", {}).get(field, {}).get(key)
+            if previous is not None and value < previous - max_accuracy_drop:
+                failures.append(f"{field} {key} accuracy {value} < {previous} - {max_accuracy_drop}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="directory with covers and truth.json")
+    parser.add_argument("--pool-sizes", default="1,2", help="comma-separated reader pool sizes")
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the corpus per pool size")
+    parser.add_argument("--profile", default="standard", help="preprocessing profile")
+    parser.add_argument("--target-language", default="en")
+    parser.add_argument("--gpu", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against; exit 1 on a regression")
+    parser.add_argument("--max-slowdown", type=float, default=0.2,
+                        help="allowed latency/throughput regression as a fraction (default 0.2)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                        help="allowed drop of any accuracy score (default 0.02)")
+    args = parser.parse_args()
+
+    corpus, truth = load_corpus(args.corpus)
+    report = {
+        "commit": git_commit(),
+        "images": len(corpus),
+        "repeat": args.repeat,
+        "profile": args.profile,
+        "gpu": args.gpu,
+        "runs": [],
+    }
+    results = {}
+    for size in (int(s) for s in args.pool_sizes.split(",")):
+        run, results = run_pool_size(corpus, size, args.repeat, args.profile, args.gpu, args.target_language)
+        report["runs"].append(run)
+    report["peak_rss_mb"] = peak_rss_mb()
+    report["accuracy"] = {field: field_accuracy(results, truth, field) for field in ("title", "author")}
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(report, json.load(f), args.max_slowdown, args.max_accuracy_drop)
+        for failure in failures:
+            print(f"REGRESSION: {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_preprocess.py
+"""Compare preprocessing profiles on latency and (optionally) OCR quality
+
+    python -m benchmarks.bench_preprocess                 # synthetic 12 MP photo, preprocessing only
+    python -m benchmarks.bench_preprocess --ocr           # also run EasyOCR and score the text found
+    python -m benchmarks.bench_preprocess --images covers/ --truth covers/truth.json --ocr
+
+``--truth`` maps file names to the expected title; quality is the share of
+title words found in the OCR output. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from utils.image_processing import PROFILES, load_image, preprocess
+
+SYNTHETIC_TITLE = "THE MIDNIGHT LIBRARY"
+
+
+def synthetic_photo(width=4000, height=3000, title=SYNTHETIC_TITLE):
+    """A tilted white cover with a printed title on a cluttered background"""
+    rng = np.random.default_rng(0)
+    img = rng.integers(40, 120, size=(height, width, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (21, 21), 0)
+
+    cover_w, cover_h = 1400, 2100
+    cover = np.full((cover_h, cover_w, 3), 245, dtype=np.uint8)
+    words = title.split()
+    for line, word in enumerate(words):
+        cv2.putText(cover, word, (120, 500 + line * 260), cv2.FONT_HERSHEY_DUPLEX, 5, (20, 20, 20), 12)
+    cv2.putText(cover, "MATT HAIG", (120, 1800), cv2.FONT_HERSHEY_DUPLEX, 3, (60, 60, 60), 6)
+
+    src = np.float32([[0, 0], [cover_w, 0], [cover_w, cover_h], [0, cover_h]])
+    dst = np.float32([[1200, 420], [2650, 520], [2560, 2640], [1080, 2560]])
+    warped = cv2.warpPerspective(cover, cv2.getPerspectiveTransform(src, dst), (width, height))
+    mask = cv2.warpPerspective(np.full((cover_h, cover_w), 255, np.uint8),
+                               cv2.getPerspectiveTransform(src, dst), (width, height))
+    img[mask > 0] = warped[mask > 0]
+    return img
+
+
+def word_recall(expected, texts):
+    expected_words = {w.lower() for w in expected.split()}
+    found = {w.lower() for text in texts for w in text.split()}
+    return len(expected_words & found) / len(expected_words) if expected_words else 0.0
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="directory of cover photos (default: one synthetic 12 MP photo)")
+    parser.add_argument("--truth", help="JSON file mapping file name -> expected title")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma-separated profile names")
+    parser.add_argument("--repeat", type=int, default=5, help="preprocessing runs per image and profile")
+    parser.add_argument("--ocr", action="store_true", help="also run EasyOCR (needs the models)")
+    args = parser.parse_args()
+
+    if args.images:
+        names = sorted(n for n in os.listdir(args.images) if n.rsplit(".", 1)[-1].lower() in
+                       {"png", "jpg", "jpeg", "bmp", "tiff", "webp"})
+        images = [(n, load_image(os.path.join(args.images, n))) for n in names]
+    else:
+        images = [("synthetic.png", synthetic_photo())]
+    truth = {}
+    if args.truth:
+        with open(args.truth) as f:
+            truth = json.load(f)
+    elif not args.images:
+        truth = {"synthetic.png": SYNTHETIC_TITLE}
+
+    reader = None
+    if args.ocr:
+        import easyocr
+        reader = easyocr.Reader(["en"], gpu=False)
+
+    report = {"images": len(images), "profiles": {}}
+    for name in args.profiles.split(","):
+        timings, ocr_timings, recalls, confidences = [], [], [], []
+        for filename, img in images:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                processed = preprocess(img, name)
+                timings.append(time.perf_counter() - started)
+            if reader is not None:
+                started = time.perf_counter()
+                results = reader.readtext(processed)
+                ocr_timings.append(time.perf_counter() - started)
+                confidences.extend(conf for _, _, conf in results)
+                if filename in truth:
+                    recalls.append(word_recall(truth[filename], [text for _, text, _ in results]))
+
+        entry = {
+            "output_shape": list(processed.shape),
+            "preprocess_ms_p50": round(statistics.median(timings) * 1000, 2),
+            "preprocess_ms_p95": round(percentile(timings, 0.95) * 1000, 2),
+        }
+        if reader is not None:
+            entry.update({
+                "readtext_ms_p50": round(statistics.median(ocr_timings) * 1000, 1),
+                "mean_confidence": round(statistics.mean(confidences), 3) if confidences else 0.0,
+                "title_word_recall": round(statistics.mean(recalls), 3) if recalls else None,
+            })
+        report["profiles"][name] = entry
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
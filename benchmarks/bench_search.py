@@ -0,0 +1,148 @@
+# benchmarks/bench_search.py
+"""Benchmark: library search latency and typo tolerance at growing sizes
+
+    python -m benchmarks.bench_search                      # 10k, 100k and 1M books
+    python -m benchmarks.bench_search --sizes 10000,100000 --queries 100
+
+Each size gets a fresh BookStore in a temporary directory, filled through
+``bulk_insert`` from a synthetic library (fixed seed, made-up words so the
+vocabulary grows with the library). Queries are drawn from stored books:
+exact titles, one title word, titles and authors with OCR-style damage
+(``rn`` for ``m``, ``1`` for ``l``, dropped or swapped letters). Reported per
+query kind: latency percentiles and recall, i.e. the share of queries whose
+book (or author, for author queries) is in the top 10. Results are JSON.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.models.book import BookCreate, BookUpdate
+from app.services.book_store import BookStore
+
+SYLLABLES = ["ka", "ri", "to", "mo", "la", "ne", "shi", "ver", "an", "dor", "el", "wyn", "ta", "ru", "mi", "so",
+             "bel", "gar", "in", "or", "th", "us", "ca", "lo", "fen", "ix", "ma", "ro", "sa", "de", "qu", "ley"]
+COMMON = ["the", "of", "and", "a", "in", "last", "night", "house", "secret", "world", "river", "winter", "city",
+          "king", "dark", "light", "garden", "stone", "war", "love", "time", "little", "lost", "star"]
+TAGS = ["fiction", "classic", "fantasy", "history", "sci-fi", "poetry", "travel", "gift", "signed", "cooking"]
+
+
+def word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_library(count, seed=42):
+    """Yield ``count`` BookCreate with made-up titles and authors"""
+    rng = random.Random(seed)
+    authors = [f"{word(rng).title()} {word(rng).title()}" for _ in range(max(10, count // 8))]
+    for _ in range(count):
+        words = [rng.choice(COMMON) if rng.random() < 0.4 else word(rng) for _ in range(rng.randint(1, 6))]
+        yield BookCreate(
+            title=" ".join(words).capitalize(),
+            author=rng.choice(authors),
+            publisher=f"{word(rng).title()} Press" if rng.random() < 0.5 else None,
+            tags=", ".join(rng.sample(TAGS, rng.randint(0, 2))) or None,
+            shelf_number=f"Shelf {rng.randint(1, 40)}",
+        )
+
+
+def ocr_damage(text, rng, edits=1):
+    """``text`` with OCR-like errors: look-alike swaps, drops and substitutions"""
+    for _ in range(edits):
+        if "m" in text and rng.random() < 0.3:
+            text = text.replace("m", "rn", 1)
+            continue
+        if "l" in text and rng.random() < 0.3:
+            text = text.replace("l", "1", 1)
+            continue
+        positions = [i for i, char in enumerate(text) if char.isalpha()]
+        if not positions:
+            break
+        i = rng.choice(positions)
+        if rng.random() < 0.5:
+            text = text[:i] + text[i + 1:]
+        else:
+            text = text[:i] + rng.choice("aceinorsu") + text[i + 1:]
+    return text
+
+
+def make_queries(books, count, seed=7):
+    """``{kind: [(query, book), ...]}`` drawn from stored books"""
+    rng = random.Random(seed)
+    # Titles too short to damage meaningfully make poor typo probes
+    sample = rng.sample([book for book in books if len(book.title) >= 8], count)
+    return {
+        "exact_title": [(book.title, book) for book in sample],
+        "title_word": [(max(book.title.split(), key=len), book) for book in sample],
+        "typo_title": [(ocr_damage(book.title, rng, edits=1 + len(book.title) // 15), book) for book in sample],
+        "author": [(book.author, book) for book in sample],
+        "typo_author": [(ocr_damage(book.author, rng), book) for book in sample],
+    }
+
+
+def found(kind, query, book, hits):
+    """Did the top hits answer the query? Titles may repeat, so any copy counts."""
+    if kind in ("author", "typo_author"):
+        return any(hit.author == book.author for _, hit in hits)
+    if kind == "title_word":
+        return any(query.lower() in hit.title.lower() for _, hit in hits)
+    return any(hit.id == book.id or hit.title == book.title for _, hit in hits)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_size(size, queries_per_kind):
+    with tempfile.TemporaryDirectory() as directory:
+        store = BookStore(os.path.join(directory, "books.sqlite3"))
+        started = time.perf_counter()
+        books = []
+        library = make_library(size)
+        while len(books) < size:
+            # 50k books per transaction, as a large import would
+            books += store.bulk_insert(next(library) for _ in range(min(50000, size - len(books))))
+        build = time.perf_counter() - started
+        db_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 2 ** 20
+
+        report = {"books": size, "build_seconds": round(build, 1), "books_per_second": round(size / build),
+                  "db_megabytes": round(db_mb, 1), "queries": {}}
+        for kind, queries in make_queries(books, queries_per_kind).items():
+            timings, hits = [], 0
+            for query, book in queries:
+                started = time.perf_counter()
+                results = store.search(query, limit=10)
+                timings.append((time.perf_counter() - started) * 1000)
+                hits += found(kind, query, book, results)
+            report["queries"][kind] = {
+                "p50_ms": round(percentile(timings, 0.5), 2),
+                "p95_ms": round(percentile(timings, 0.95), 2),
+                "mean_ms": round(statistics.mean(timings), 2),
+                "recall_at_10": round(hits / len(queries), 3),
+            }
+
+        # Incremental index maintenance: single-book writes with search triggers
+        started = time.perf_counter()
+        for book in books[:200]:
+            store.update(book.id, BookUpdate(title=book.title + " x"))
+        report["update_ms"] = round((time.perf_counter() - started) / 200 * 1000, 2)
+        store.close()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="comma-separated library sizes")
+    parser.add_argument("--queries", type=int, default=200, help="queries per kind and size")
+    args = parser.parse_args()
+
+    report = [run_size(int(size), args.queries) for size in args.sizes.split(",")]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
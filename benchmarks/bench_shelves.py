@@ -0,0 +1,102 @@
+# benchmarks/bench_shelves.py
+"""Benchmark: per-shelf statistics, precomputed against recounted, as the library grows
+
+    python -m benchmarks.bench_shelves                       # 200k books in batches of 50k
+    python -m benchmarks.bench_shelves --books 1000000 --batch 100000
+
+The synthetic library of ``bench_search`` (40 shelves) is stored through
+``bulk_insert`` batch by batch, with random ratings, statuses and lent-out
+books. After each batch the shelf dashboard is read both ways:
+``list_shelves`` from the stored counters, and ``shelf_stats.aggregate``
+recounting the books table with GROUP BY, as a dashboard without counters
+would have to. The first should stay flat while the second grows with the
+library. Each batch also times single-book updates that change a counted
+field (status, rating, shelf), which pay for the counters.
+
+At the end ``rebuild_shelf_stats`` is timed and must find nothing to
+repair. Results are JSON.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from app.models.book import BookUpdate, ReadingStatus
+from app.services import shelf_stats
+from app.services.book_store import BookStore
+from benchmarks.bench_search import make_library, percentile
+
+
+def timed(fn, repeat):
+    """Milliseconds of each of ``repeat`` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def vary(book, rng):
+    """A library book: some read, some rated, some lent out"""
+    book.reading_status = rng.choice(list(ReadingStatus))
+    book.personal_rating = rng.choice([None, None, 1, 2, 3, 4, 5])
+    book.on_shelf = rng.random() < 0.9
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=200000, help="library size")
+    parser.add_argument("--batch", type=int, default=50000, help="books per bulk insert")
+    parser.add_argument("--reads", type=int, default=20, help="dashboard reads per batch (recounts: a fifth of that)")
+    parser.add_argument("--updates", type=int, default=200, help="single-book updates timed per batch")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as directory:
+        store = BookStore(os.path.join(directory, "books.sqlite3"))
+        library = make_library(args.books)
+        ids, batches = [], []
+        while len(ids) < args.books:
+            batch = [vary(next(library), rng) for _ in range(min(args.batch, args.books - len(ids)))]
+            started = time.perf_counter()
+            ids += [book.id for book in store.bulk_insert(batch)]
+            elapsed = time.perf_counter() - started
+
+            updates = timed(lambda: store.update(rng.choice(ids), BookUpdate(
+                reading_status=rng.choice(list(ReadingStatus)), personal_rating=rng.randint(1, 5),
+                shelf_number=f"Shelf {rng.randint(1, 40)}"
+            )), args.updates)
+            precomputed = timed(store.list_shelves, args.reads)
+            recounted = timed(lambda: shelf_stats.aggregate(store._conn), max(1, args.reads // 5))
+            batches.append({
+                "stored": len(ids),
+                "insert_books_per_second": round(len(batch) / elapsed),
+                "update_p50_ms": round(percentile(updates, 0.5), 3),
+                "update_p95_ms": round(percentile(updates, 0.95), 3),
+                "dashboard_precomputed_ms": round(percentile(precomputed, 0.5), 3),
+                "dashboard_recount_ms": round(percentile(recounted, 0.5), 1),
+            })
+
+        started = time.perf_counter()
+        drifted = store.rebuild_shelf_stats(check_only=True)
+        rebuild_ms = (time.perf_counter() - started) * 1000
+        shelves = len(store.list_shelves()[0])
+        store.close()
+
+    last = batches[-1]
+    print(json.dumps({
+        "books": args.books,
+        "shelves": shelves,
+        "batches": batches,
+        "dashboard_speedup": round(last["dashboard_recount_ms"] / last["dashboard_precomputed_ms"], 1),
+        "rebuild_check_ms": round(rebuild_ms, 1),
+        "consistent": not drifted,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_startup.py
+"""Benchmark: startup time, module by module, with and without OCR
+
+    python -m benchmarks.bench_startup                  # both modes, 3 runs each
+    python -m benchmarks.bench_startup --modes web --runs 5 --top 20
+
+For each mode (``full``, and ``web`` = WEB_ONLY) a fresh interpreter runs
+``import app.main; app.main.create_app()`` under ``python -X importtime``.
+Reported per mode:
+- the median wall time;
+- whether torch, easyocr and cv2 were imported;
+- the modules taking the most import time, cumulative (with everything
+  they import) and self (their own code).
+
+With ``--serve``, run.py is also launched on a free port, and the time
+until /health/live first answers is reported. The OCR models keep loading
+in the background after that. Results are JSON.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+HEAVY = ("torch", "easyocr", "cv2", "PIL", "langdetect", "pyzbar")
+MODES = {"full": {"WEB_ONLY": "false"}, "web": {"WEB_ONLY": "true"}}
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app.main
+app.main.create_app()
+elapsed = time.perf_counter() - started
+print(f"{elapsed:.6f}", *(name for name in sys.argv[1:] if name in sys.modules))
+"""
+
+
+def parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us)}`` from ``-X importtime`` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def probe(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, *HEAVY],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed, *loaded = result.stdout.split()
+    return float(elapsed), loaded, parse_importtime(result.stderr)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(env, timeout=120):
+    """Seconds from launching run.py until /health/live answers"""
+    port = free_port()
+    env = {**env, "HOST": "127.0.0.1", "PORT": str(port), "WEB_CONCURRENCY": "1", "LOG_LEVEL": "warning"}
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "run.py"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f"http://127.0.0.1:{port}/health/live", timeout=1).ok:
+                    return round(time.perf_counter() - started, 3)
+            except requests.ConnectionError:
+                time.sleep(0.02)
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="full,web", help="comma-separated: full, web")
+    parser.add_argument("--runs", type=int, default=3, help="runs per mode; the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules listed")
+    parser.add_argument("--serve", action="store_true", help="also time run.py until /health/live answers")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for mode in args.modes.split(","):
+            env = {**os.environ, **MODES[mode], "BOOKKEEPER_DATA_DIR": data_dir}
+            runs = [probe(env) for _ in range(args.runs)]
+            elapsed, loaded, modules = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+            slowest = lambda key: [
+                {"module": name, "ms": round(times[key] / 1000, 1)}
+                for name, times in sorted(modules.items(), key=lambda item: -item[1][key])[:args.top]
+            ]
+            report[mode] = {
+                "create_app_seconds": round(statistics.median(run[0] for run in runs), 3),
+                "heavy_modules_loaded": loaded,
+                "modules_imported": len(modules),
+                "slowest_cumulative": slowest(1),
+                "slowest_self": slowest(0),
+            }
+            if args.serve:
+                report[mode]["first_response_seconds"] = serve(env)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/make_corpus.py
+"""Regenerate the synthetic cover corpus used by ``bench_ocr``
+
+    python -m benchmarks.make_corpus                     # writes benchmarks/corpus/
+
+Covers are rendered with PIL's bundled font from a fixed seed, so the output
+is identical on every machine and no network access is needed. ``truth.json``
+records the title and author printed on each cover.
+"""
+import argparse
+import json
+import os
+import random
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+# (title, author, author line as printed, extra line or None)
+BOOKS = [
+    ("Pride and Prejudice", "Jane Austen", "by Jane Austen", None),
+    ("Moby Dick", "Herman Melville", "Herman Melville", None),
+    ("The Time Machine", "H. G. Wells", "by H. G. Wells", "A Novel"),
+    ("Great Expectations", "Charles Dickens", "Charles Dickens", None),
+    ("Little Women", "Louisa May Alcott", "by Louisa May Alcott", None),
+    ("Dracula", "Bram Stoker", "Bram Stoker", "Published by Archibald Constable"),
+    ("War and Peace", "Leo Tolstoy", "Leo Tolstoy", "Translated by Louise Maude"),
+    ("The Odyssey", "Homer", "Homer", "Translated by Samuel Butler"),
+    ("Frankenstein", "Mary Shelley", "by Mary Shelley", None),
+    ("The Secret Garden", "Frances Hodgson Burnett", "Frances Hodgson Burnett", None),
+    ("Treasure Island", "Robert Louis Stevenson", "by Robert Louis Stevenson", None),
+    ("Emma", "Jane Austen", "Jane Austen", "Penguin Classics"),
+    ("The Jungle Book", "Rudyard Kipling", "by Rudyard Kipling", None),
+    ("Walden", "Henry David Thoreau", "Henry David Thoreau", None),
+    ("Anna Karenina", "Leo Tolstoy", "by Leo Tolstoy", "Translated by Constance Garnett"),
+    ("Heart of Darkness", "Joseph Conrad", "Joseph Conrad", None),
+]
+
+BACKGROUNDS = [(245, 240, 225), (30, 45, 80), (120, 20, 30), (235, 235, 235), (20, 70, 50), (250, 215, 120)]
+
+
+def ink_for(background):
+    """Dark text on light covers, light text on dark ones"""
+    return (20, 20, 20) if sum(background) > 380 else (245, 245, 240)
+
+
+def wrap(draw, text, font, max_width):
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}".strip()
+        if line and draw.textlength(candidate, font=font) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    return lines + [line] if line else lines
+
+
+def draw_centered(draw, lines, font, top, width, fill, spacing=1.2):
+    for line in lines:
+        x = (width - draw.textlength(line, font=font)) / 2
+        draw.text((x, top), line, font=font, fill=fill)
+        top += int(font.size * spacing)
+    return top
+
+
+def render_cover(title, author_line, extra, rng, width=600, height=900):
+    background = rng.choice(BACKGROUNDS)
+    ink = ink_for(background)
+    cover = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(cover)
+
+    # A frame, as on many classic editions
+    inset = rng.randint(18, 36)
+    draw.rectangle([inset, inset, width - inset, height - inset], outline=ink, width=3)
+
+    title_font = ImageFont.load_default(size=rng.randint(58, 72))
+    top = draw_centered(draw, wrap(draw, title, title_font, width - 140), title_font, rng.randint(120, 200), width, ink)
+    if extra and not extra.lower().startswith(("translated", "published")):
+        draw_centered(draw, [extra], ImageFont.load_default(size=30), top + 20, width, ink)
+
+    author_font = ImageFont.load_default(size=rng.randint(34, 42))
+    draw_centered(draw, [author_line], author_font, height - rng.randint(230, 290), width, ink)
+    if extra and extra.lower().startswith(("translated", "published")):
+        draw_centered(draw, [extra], ImageFont.load_default(size=24), height - 140, width, ink)
+
+    # Camera-like degradations: slight tilt and softness
+    cover = cover.rotate(rng.uniform(-2.5, 2.5), resample=Image.BICUBIC, expand=False, fillcolor=background)
+    return cover.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 0.9)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=CORPUS_DIR, help="directory to write covers and truth.json into")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    truth = {}
+    for number, (title, author, author_line, extra) in enumerate(BOOKS, start=1):
+        filename = f"cover_{number:02d}.png"
+        render_cover(title, author_line, extra, rng).save(os.path.join(args.output, filename), optimize=True)
+        truth[filename] = {"title": title, "author": author}
+
+    with open(os.path.join(args.output, "truth.json"), "w") as f:
+        json.dump(truth, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {len(truth)} covers to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
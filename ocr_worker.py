@@ -0,0 +1,30 @@
+# ocr_worker.py
+"""OCR worker service: the EasyOCR readers in their own processes
+
+    OCR_WORKER_SOCKET=/run/bookkeeper/ocr.sock python ocr_worker.py
+    OCR_WORKER_SOCKET=/run/bookkeeper/ocr.sock WEB_CONCURRENCY=4 python run.py
+
+With the same OCR_WORKER_SOCKET, every web process sends its OCR here
+instead of loading readers of its own, so model memory no longer grows with
+WEB_CONCURRENCY. OCR_WORKER_PROCESSES processes each load the readers once
+and run OCR_WORKER_THREADS torch threads pinned to their own cores (from
+OCR_WORKER_CPUS, default all of them). The OCR_* reader, preprocessing and
+cache settings apply here rather than in the web tier.
+"""
+import logging
+import sys
+
+from app import config
+from app.services.ocr_workers import OCRWorkerService
+
+
+if __name__ == "__main__":
+    if not config.OCR_WORKER_SOCKET:
+        sys.exit("Set OCR_WORKER_SOCKET to the Unix socket path to serve")
+    logging.basicConfig(level=config.LOG_LEVEL.upper())
+    OCRWorkerService(
+        config.OCR_WORKER_SOCKET,
+        cpus=config.OCR_WORKER_CPUS,
+        processes=config.OCR_WORKER_PROCESSES,
+        threads=config.OCR_WORKER_THREADS
+    ).serve()
@@ -1,22 +1,55 @@
 # run.py
-import uvicorn
+"""Production launcher
+
+    python run.py                       # OCR on, one worker process
+    WEB_ONLY=true python run.py         # library only: no OCR, starts in well under a second
+    WEB_CONCURRENCY=4 python run.py     # explicit number of worker processes
+    RELOAD=true python run.py           # development: restart on code changes
+    OCR_WORKER_SOCKET=... python run.py # OCR in the worker service, see ocr_worker.py
+
+Settings are read from the environment, see the "Server" section of
+app/config.py. Behind a reverse proxy, list it in FORWARDED_ALLOW_IPS so
+client addresses and https are taken from X-Forwarded-* headers.
+"""
 import os
+import time
+
+# Shared by every worker, so each can tell jobs interrupted by a restart from
+# jobs a sibling is running (see OCRJobStore.recover); set before app.config loads
+os.environ.setdefault("BOOKKEEPER_STARTED_AT", str(time.time()))
+
+import uvicorn
+
+from app import config
 from app.main import create_app
 
-# Create the FastAPI app
+# For ``uvicorn run:app`` and other ASGI servers
 app = create_app()
 
+
+def worker_count() -> int:
+    if config.WEB_CONCURRENCY > 0:
+        return config.WEB_CONCURRENCY
+    if config.WEB_ONLY or config.OCR_WORKER_SOCKET:
+        # Requests are short and mostly SQLite reads, OCR runs elsewhere: one process per core
+        return os.cpu_count() or 1
+    # Each process loads its own OCR readers (~500 MB per language set), and
+    # one process already keeps every core busy while reading text
+    return 1
+
+
 if __name__ == "__main__":
-    # Create upload directory if it doesn't exist
-    os.makedirs("static/uploads", exist_ok=True)
-    
-    # Run the application with uvicorn
-    port = int(os.environ.get("PORT", 5000))
-    
-    uvicorn.run(
-        "run:app",  # app module
-        host="0.0.0.0",
-        port=port,
-        reload=True,  # Auto-reload on code changes
-        log_level="info"
-    )
\ No newline at end of file
+    if config.RELOAD:
+        uvicorn.run("run:app", host=config.HOST, port=config.PORT, reload=True, log_level=config.LOG_LEVEL)
+    else:
+        uvicorn.run(
+            "app.main:create_app",
+            factory=True,
+            host=config.HOST,
+            port=config.PORT,
+            workers=worker_count(),
+            log_level=config.LOG_LEVEL,
+            proxy_headers=True,
+            forwarded_allow_ips=config.FORWARDED_ALLOW_IPS,
+            timeout_keep_alive=config.KEEP_ALIVE_TIMEOUT,
+        )
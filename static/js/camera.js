@@ -0,0 +1,65 @@
+// static/js/camera.js
+// Shrinking cover photos in the browser before they are uploaded.
+//
+// A phone camera takes 12+ megapixel photos, but OCR preprocessing scales
+// them down to its profile's long edge (1600 px by default) anyway. Doing
+// that here, and re-encoding as JPEG, cuts the upload to a few hundred KB
+// and saves the server the decode and resize of the full-size image.
+
+function loadBitmap(blob) {
+    // Decode a photo, rotated as its EXIF orientation says
+    if (window.createImageBitmap) {
+        return createImageBitmap(blob, { imageOrientation: "from-image" })
+            .catch(() => createImageBitmap(blob));
+    }
+    return new Promise((resolve, reject) => {
+        const url = URL.createObjectURL(blob);
+        const img = new Image();
+        img.onload = () => { URL.revokeObjectURL(url); resolve(img); };
+        img.onerror = () => { URL.revokeObjectURL(url); reject(new Error("Could not read the image")); };
+        img.src = url;
+    });
+}
+
+function canvasToBlob(canvas, quality) {
+    if (canvas.convertToBlob) {
+        return canvas.convertToBlob({ type: "image/jpeg", quality });
+    }
+    return new Promise((resolve, reject) => {
+        canvas.toBlob(blob => blob ? resolve(blob) : reject(new Error("Could not encode the image")),
+                      "image/jpeg", quality);
+    });
+}
+
+// Scale a photo so its longer side is at most maxEdge pixels (0: keep the
+// size) and encode it as JPEG. Resolves to the original blob when that is
+// already a JPEG no larger than the result.
+async function resizeImage(blob, maxEdge, quality = 0.85) {
+    const bitmap = await loadBitmap(blob);
+    const width = bitmap.width, height = bitmap.height;
+    const scale = maxEdge && Math.max(width, height) > maxEdge ? maxEdge / Math.max(width, height) : 1;
+    const targetWidth = Math.max(1, Math.round(width * scale));
+    const targetHeight = Math.max(1, Math.round(height * scale));
+
+    const canvas = window.OffscreenCanvas
+        ? new OffscreenCanvas(targetWidth, targetHeight)
+        : Object.assign(document.createElement("canvas"), { width: targetWidth, height: targetHeight });
+    const ctx = canvas.getContext("2d");
+    ctx.imageSmoothingQuality = "high";
+    ctx.drawImage(bitmap, 0, 0, targetWidth, targetHeight);
+    if (bitmap.close) {
+        bitmap.close();
+    }
+
+    const resized = await canvasToBlob(canvas, quality);
+    if (scale === 1 && blob.type === "image/jpeg" && blob.size <= resized.size) {
+        return blob;
+    }
+    return resized;
+}
+
+// A File named like the original, for form uploads
+function jpegFile(blob, name) {
+    const base = (name || "cover").replace(/\.[^.]*$/, "");
+    return new File([blob], `${base}.jpg`, { type: blob.type || "image/jpeg" });
+}
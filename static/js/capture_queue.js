@@ -0,0 +1,229 @@
+// static/js/capture_queue.js
+// Offline queue for cover photos, kept in IndexedDB until the server has them.
+//
+// Each capture gets an ID made up here. Syncing first asks the server which
+// IDs it already has (GET /ocr/api/captures), then uploads only the rest, a
+// batch per request (POST /ocr/api/captures). The server ignores IDs it has
+// seen, so a sync repeated after a lost response or from a second tab never
+// OCRs a photo twice. Photos are dropped from the queue as soon as the
+// server holds them; the record stays to show the result.
+
+const CAPTURE_DB = "tsundoku-captures";
+const CAPTURE_STORE = "captures";
+// Finished statuses; queued (not uploaded yet), pending and running still need the server
+const CAPTURE_DONE = ["completed", "failed", "rejected"];
+const STATUS_LOOKUP_BATCH = 100;
+const POLL_INTERVAL = 3000;
+const MAX_BACKOFF = 5 * 60 * 1000;
+
+function newCaptureId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    return Array.from(bytes, b => b.toString(16).padStart(2, "0")).join("");
+}
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+class CaptureQueue extends EventTarget {
+    // options: batch (photos per upload request), retention (ms to keep finished captures)
+    constructor(options = {}) {
+        super();
+        this.batch = Math.max(1, options.batch || 8);
+        this.retention = options.retention || 24 * 3600 * 1000;
+        this.backoff = 0;
+        this.timer = null;
+        this.syncing = null;
+        this.db = null;
+    }
+
+    async open() {
+        if (!this.db) {
+            const request = indexedDB.open(CAPTURE_DB, 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(CAPTURE_STORE, { keyPath: "id" });
+            };
+            this.db = await idbRequest(request);
+        }
+        return this.db;
+    }
+
+    async store(mode) {
+        const db = await this.open();
+        return db.transaction(CAPTURE_STORE, mode).objectStore(CAPTURE_STORE);
+    }
+
+    async all() {
+        const records = await idbRequest((await this.store("readonly")).getAll());
+        return records.sort((a, b) => a.createdAt - b.createdAt);
+    }
+
+    async put(records) {
+        if (!records.length) {
+            return;
+        }
+        const store = await this.store("readwrite");
+        await Promise.all(records.map(record => idbRequest(store.put(record))));
+        this.dispatchEvent(new Event("change"));
+    }
+
+    async remove(id) {
+        await idbRequest((await this.store("readwrite")).delete(id));
+        this.dispatchEvent(new Event("change"));
+    }
+
+    // Queue a (resized) photo; it is uploaded on the next sync
+    async add(blob, filename, targetLanguage) {
+        const record = {
+            id: newCaptureId(),
+            blob,
+            filename: filename || "cover.jpg",
+            targetLanguage: targetLanguage || null,
+            createdAt: Date.now(),
+            status: "queued",
+            result: null,
+            error: null
+        };
+        await this.put([record]);
+        this.sync();
+        return record;
+    }
+
+    // Sync now, on reconnect and when the page is shown again
+    start() {
+        window.addEventListener("online", () => { this.backoff = 0; this.sync(); });
+        document.addEventListener("visibilitychange", () => {
+            if (document.visibilityState === "visible") {
+                this.sync();
+            }
+        });
+        return this.sync();
+    }
+
+    schedule(delay) {
+        clearTimeout(this.timer);
+        this.timer = setTimeout(() => this.sync(), delay);
+    }
+
+    sync() {
+        // One sync at a time per page; the server copes with other tabs
+        if (!this.syncing) {
+            this.syncing = this.run().finally(() => { this.syncing = null; });
+        }
+        return this.syncing;
+    }
+
+    async run() {
+        await this.prune();
+        const open = (await this.all()).filter(record => !CAPTURE_DONE.includes(record.status));
+        if (!open.length || !navigator.onLine) {
+            return;
+        }
+        try {
+            const unknown = await this.refresh(open);
+            await this.upload(unknown);
+            this.backoff = 0;
+        } catch (err) {
+            // Offline, server down or overloaded: try again later, backing off
+            this.backoff = Math.min(MAX_BACKOFF, Math.max(err.retryAfter || 0, this.backoff * 2 || 5000));
+            console.warn("Capture sync failed, retrying in", this.backoff / 1000, "s:", err);
+            this.schedule(this.backoff);
+            return;
+        }
+        if ((await this.all()).some(record => !CAPTURE_DONE.includes(record.status))) {
+            this.schedule(POLL_INTERVAL);
+        }
+    }
+
+    async request(url, options) {
+        const response = await fetch(url, { credentials: "same-origin", ...options });
+        if (!response.ok) {
+            const err = new Error(`HTTP ${response.status}`);
+            err.retryAfter = (parseInt(response.headers.get("Retry-After"), 10) || 0) * 1000;
+            throw err;
+        }
+        return response.json();
+    }
+
+    // Update records from the server's view; returns those it has never received
+    async refresh(records) {
+        const unknown = [];
+        for (let i = 0; i < records.length; i += STATUS_LOOKUP_BATCH) {
+            const chunk = records.slice(i, i + STATUS_LOOKUP_BATCH);
+            const query = chunk.map(record => "ids=" + encodeURIComponent(record.id)).join("&");
+            const reply = await this.request(`/ocr/api/captures?${query}`);
+            const byId = new Map(reply.items.map(item => [item.capture_id, item]));
+            const changed = [];
+            for (const record of chunk) {
+                const item = byId.get(record.id);
+                if (!item || item.status === "unknown") {
+                    if (record.blob) {
+                        unknown.push(record);
+                    } else {
+                        // Sent before, but the server no longer has it (expired)
+                        changed.push(Object.assign(record, { status: "failed", error: "No longer on the server" }));
+                    }
+                } else {
+                    changed.push(this.apply(record, item));
+                }
+            }
+            await this.put(changed);
+        }
+        return unknown;
+    }
+
+    apply(record, item) {
+        record.status = item.status;
+        record.updatedAt = Date.now();
+        record.result = item.result;
+        record.error = item.error || (item.result && !item.result.success ? item.result.error : null);
+        if (item.status !== "rejected") {
+            record.blob = null;  // the server has the photo now
+        }
+        return record;
+    }
+
+    async upload(records) {
+        const groups = new Map();  // target language -> records; one language per request
+        for (const record of records) {
+            const key = record.targetLanguage || "";
+            groups.set(key, (groups.get(key) || []).concat([record]));
+        }
+        for (const [targetLanguage, group] of groups) {
+            for (let i = 0; i < group.length; i += this.batch) {
+                const chunk = group.slice(i, i + this.batch);
+                const form = new FormData();
+                for (const record of chunk) {
+                    form.append("photos", record.blob, record.filename);
+                    form.append("capture_ids", record.id);
+                }
+                if (targetLanguage) {
+                    form.append("target_language", targetLanguage);
+                }
+                const reply = await this.request("/ocr/api/captures", { method: "POST", body: form });
+                if (!reply.success) {
+                    throw new Error(reply.error);
+                }
+                const byId = new Map(reply.items.map(item => [item.capture_id, item]));
+                await this.put(chunk.filter(record => byId.has(record.id))
+                                    .map(record => this.apply(record, byId.get(record.id))));
+            }
+        }
+    }
+
+    // Forget finished captures once the server has forgotten them too
+    async prune() {
+        const cutoff = Date.now() - this.retention;
+        for (const record of await this.all()) {
+            if (CAPTURE_DONE.includes(record.status) && (record.updatedAt || record.createdAt) < cutoff) {
+                await this.remove(record.id);
+            }
+        }
+    }
+}
@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import tempfile
+
+import pytest
+
+# app.config reads the environment once, at import
+os.environ.setdefault("BOOKKEEPER_DATA_DIR", tempfile.mkdtemp(prefix="bookkeeper-tests-"))
+os.environ.setdefault("WEB_ONLY", "true")
+for name in ("GOOGLE_SHEETS_CREDENTIALS", "GOOGLE_SHEET_ID", "GOOGLE_SHEETS_FAKE", "OCR_WORKER_SOCKET"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def book_store(tmp_path):
+    from app.services.book_store import BookStore
+    store = BookStore(str(tmp_path / "books.sqlite3"))
+    yield store
+    store.close()
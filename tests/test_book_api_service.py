@@ -0,0 +1,136 @@
+# tests/test_book_api_service.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.book_api_service import (
+    BookAPIService, CircuitBreaker, ISBNCache, Provider, parse_google_books, parse_open_library
+)
+
+ISBN = "9780441013593"
+
+
+class StubCatalogue:
+    """Local HTTP server answering every GET with ``status`` and ``payload`` after ``delay``"""
+
+    def __init__(self):
+        self.status, self.payload, self.delay = 200, {}, 0.0
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.calls += 1
+                time.sleep(stub.delay)
+                body = json.dumps(stub.payload).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/books"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    catalogue = StubCatalogue()
+    yield catalogue
+    catalogue.close()
+
+
+def provider(stub, parse=parse_open_library, failure_threshold=5, reset_timeout=60.0):
+    return Provider("stub", stub.url, lambda isbn: {"isbn": isbn}, parse, timeout=5,
+                    breaker=CircuitBreaker(failure_threshold, reset_timeout))
+
+
+def test_concurrent_lookups_share_one_upstream_call(stub, tmp_path):
+    stub.payload = {f"ISBN:{ISBN}": {"title": "Dune", "authors": [{"name": "Frank Herbert"}]}}
+    stub.delay = 0.2
+    service = BookAPIService(providers=[provider(stub)], cache=ISBNCache(str(tmp_path / "isbn.sqlite3")))
+
+    async def lookups():
+        return await asyncio.gather(*(service.lookup(ISBN) for _ in range(10)))
+
+    results = asyncio.run(lookups())
+    assert stub.calls == 1
+    assert all(result["title"] == "Dune" for result in results)
+    assert service.stats()["coalesced"] == 9
+    service.close()
+
+
+def test_not_found_is_cached(stub, tmp_path):
+    service = BookAPIService(providers=[provider(stub)], cache=ISBNCache(str(tmp_path / "isbn.sqlite3")))
+    assert asyncio.run(service.lookup(ISBN)) is None
+    assert asyncio.run(service.lookup(ISBN)) is None
+    assert stub.calls == 1
+    assert service.cache.get(ISBN) == (True, None)
+    service.close()
+
+
+def test_unavailable_answer_is_not_cached(stub, tmp_path):
+    stub.status = 503
+    service = BookAPIService(providers=[provider(stub)], cache=ISBNCache(str(tmp_path / "isbn.sqlite3")))
+    assert asyncio.run(service.lookup(ISBN)) is None
+    assert service.cache.get(ISBN) == (False, None)
+    service.close()
+
+
+def test_breaker_opens_then_half_opens(stub):
+    stub.status = 500
+    source = provider(stub, failure_threshold=2, reset_timeout=0.3)
+    service = BookAPIService(providers=[source])
+    for _ in range(2):
+        asyncio.run(service.lookup(ISBN))
+    assert source.breaker.state == "open"
+
+    asyncio.run(service.lookup(ISBN))
+    assert stub.calls == 2  # the open circuit kept the third lookup off the wire
+
+    time.sleep(0.35)
+    assert source.breaker.state == "half_open"
+    stub.status, stub.payload = 200, {f"ISBN:{ISBN}": {"title": "Dune"}}
+    assert asyncio.run(service.lookup(ISBN))["title"] == "Dune"
+    assert stub.calls == 3
+    assert source.breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit(stub):
+    stub.status = 500
+    source = provider(stub, failure_threshold=1, reset_timeout=0.2)
+    service = BookAPIService(providers=[source])
+    asyncio.run(service.lookup(ISBN))
+    time.sleep(0.25)
+    asyncio.run(service.lookup(ISBN))  # the trial fails
+    assert source.breaker.state == "open"
+    assert stub.calls == 2
+
+
+def test_parser_error_during_trial_does_not_leave_the_circuit_stuck(stub):
+    stub.status = 500
+    source = provider(stub, parse=parse_google_books, failure_threshold=1, reset_timeout=0.2)
+    service = BookAPIService(providers=[source])
+    asyncio.run(service.lookup(ISBN))
+
+    time.sleep(0.25)
+    stub.status, stub.payload = 200, {"items": ["not an object"]}  # AttributeError in the parser
+    assert asyncio.run(service.lookup(ISBN)) is None
+    assert source.breaker.state == "open"
+
+    time.sleep(0.25)
+    stub.payload = {"items": [{"volumeInfo": {"title": "Dune"}}]}
+    assert asyncio.run(service.lookup(ISBN))["title"] == "Dune"
+    assert source.breaker.state == "closed"
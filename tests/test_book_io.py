@@ -0,0 +1,32 @@
+# tests/test_book_io.py
+import io
+
+import pytest
+
+from app.services.book_io import NOT_UTF8, ImportFormatError, import_books
+
+
+def import_bytes(data, fmt, book_store, batch_size=100):
+    return import_books(io.BytesIO(data), fmt, book_store.bulk_insert, batch_size=batch_size)
+
+
+def test_bad_byte_late_in_csv_rejects_only_its_row(book_store):
+    rows = b"".join(b"Book %d,Author\n" % i for i in range(250))
+    data = b"title,author\n" + rows + b"Caf\xe9,Someone\n" + b"Last,Author\n"
+    result = import_bytes(data, "csv", book_store)
+    assert (result["imported"], result["rejected"]) == (251, 1)
+    assert result["errors"] == [{"row": 252, "errors": [NOT_UTF8]}]
+    assert book_store.count() == 251
+
+
+def test_bad_byte_in_jsonl_rejects_only_its_line(book_store):
+    data = b'{"title": "Dune"}\n{"title": "Caf\xe9"}\n{"title": "Emma"}\n'
+    result = import_bytes(data, "jsonl", book_store)
+    assert (result["imported"], result["rejected"]) == (2, 1)
+    assert result["errors"][0]["row"] == 2
+
+
+def test_undecodable_csv_header_fails_before_anything_is_stored(book_store):
+    with pytest.raises(ImportFormatError):
+        import_bytes(b"t\xeftle,author\nDune,Herbert\n", "csv", book_store)
+    assert book_store.count() == 0
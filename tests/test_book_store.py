@@ -0,0 +1,62 @@
+# tests/test_book_store.py
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.main import create_app
+from app.models.book import BookCreate, BookUpdate
+
+
+@pytest.mark.parametrize("field", ["book_type", "reading_status", "fiction_type", "on_shelf"])
+def test_update_rejects_null_for_required_fields(field):
+    with pytest.raises(ValidationError):
+        BookUpdate(**{field: None})
+
+
+def test_update_keeps_omitted_fields(book_store):
+    book = book_store.create(BookCreate(title="Dune", book_type="manga", on_shelf=False))
+    updated = book_store.update(book.id, BookUpdate(author="Frank Herbert"))
+    assert (updated.author, updated.book_type, updated.on_shelf) == ("Frank Herbert", "manga", False)
+
+
+def test_patch_with_null_required_field_is_422():
+    with TestClient(create_app()) as client:
+        book = client.post("/books/api", json={"title": "Dune"}).json()
+        response = client.patch(f"/books/api/{book['id']}", json={"book_type": None})
+        assert response.status_code == 422
+        assert client.get(f"/books/api/{book['id']}").json()["book_type"] == "book"
+
+
+def titles(hits):
+    return [book.title for _, book in hits]
+
+
+def test_search_short_words_match_inside_any_field(book_store):
+    book_store.create(BookCreate(title="ノルウェイの森", author="村上春樹"))
+    book_store.create(BookCreate(title="森", author="村上春樹"))
+    book_store.create(BookCreate(title="The Muppet Movie", author="Frank Oz"))
+    book_store.create(BookCreate(title="Dune", author="Frank Herbert"))
+
+    assert set(titles(book_store.search("村上"))) == {"森", "ノルウェイの森"}
+    assert set(titles(book_store.search("春樹"))) == {"森", "ノルウェイの森"}
+    assert titles(book_store.search("森"))[0] == "森"
+    assert titles(book_store.search("Oz")) == ["The Muppet Movie"]
+    assert titles(book_store.search("村上 ノルウェイ")) == ["ノルウェイの森"]
+
+
+def test_search_tolerates_misreadings(book_store):
+    book_store.create(BookCreate(title="Harry Potter and the Philosopher's Stone", author="J. K. Rowling"))
+    book_store.create(BookCreate(title="The Hobbit", author="J. R. R. Tolkien"))
+
+    assert titles(book_store.search("Harry Pottcr")) == ["Harry Potter and the Philosopher's Stone"]
+    assert titles(book_store.search("Hobblt Tolkein"))[0] == "The Hobbit"
+
+
+def test_search_index_follows_updates_and_deletes(book_store):
+    book = book_store.create(BookCreate(title="Neuromancer"))
+    book_store.update(book.id, BookUpdate(title="Count Zero"))
+    assert titles(book_store.search("Neuromancer")) == []
+    assert titles(book_store.search("Count Zero")) == ["Count Zero"]
+
+    book_store.delete(book.id)
+    assert titles(book_store.search("Count Zero")) == []
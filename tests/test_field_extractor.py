@@ -0,0 +1,113 @@
+# tests/test_field_extractor.py
+import pytest
+
+from app.services.field_extractor import (
+    FieldExtractor, DEFAULT_RULES_PATH, compile_rules, load_rules, needs_cjk
+)
+
+
+def line(text, top=0, height=20, confidence=0.9, left=0, width=200):
+    bbox = [[left, top], [left + width, top], [left + width, top + height], [left, top + height]]
+    return {"text": text, "confidence": confidence, "bbox": bbox}
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return FieldExtractor(load_rules(DEFAULT_RULES_PATH))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Translated by Jay Rubin", ("translator", "Jay Rubin")),
+    ("Published by Vintage", ("publisher", "Vintage")),
+    ("by Frank Herbert", ("author", "Frank Herbert")),
+    ("BY FRANK HERBERT", ("author", "FRANK HERBERT")),       # matched in any case, kept as printed
+    ("村上春樹 著", ("author", "村上春樹")),
+    ("柴田元幸 訳", ("translator", "柴田元幸")),
+    ("The Spice Must Flow", None),
+])
+def test_bundled_rules(extractor, text, expected):
+    assert extractor.match(text) == expected
+
+
+def test_rules_matching_at_the_same_place_go_by_field_precedence():
+    rules = {"author": [r"^(?P<value>.+)$"], "publisher": [r"^(?P<value>.+)$"], "translator": []}
+    assert FieldExtractor(rules).match("Anyone") == ("publisher", "Anyone")
+    rules["translator"] = [r"^(?P<value>.+)$"]
+    assert FieldExtractor(rules).match("Anyone") == ("translator", "Anyone")
+
+
+def test_leftmost_match_wins_over_precedence():
+    rules = {"author": [r"^(?P<value>\w+) wrote"], "translator": [r"rendered by (?P<value>\w+)"]}
+    assert FieldExtractor(rules).match("Tolstoy wrote it, rendered by Maude") == ("author", "Tolstoy")
+
+
+def test_rules_need_one_value_group():
+    with pytest.raises(ValueError, match="value"):
+        FieldExtractor({"author": [r"^by (.+)$"]})
+
+
+def test_title_is_the_tallest_line_not_the_most_confident(extractor):
+    info = extractor.extract([
+        line("A Novel", top=0, height=15, confidence=0.99),
+        line("DUNE", top=40, height=80, confidence=0.6),
+        line("by Frank Herbert", top=300, height=25, confidence=0.95),
+    ])
+    assert info["title"] == "DUNE"
+    assert info["author"] == "Frank Herbert"
+
+
+def test_wrapped_title_lines_are_joined_top_to_bottom(extractor):
+    info = extractor.extract([
+        line("Stone", top=170, height=55),
+        line("Harry Potter and the", top=40, height=60),
+        line("Philosopher's", top=105, height=58),
+        line("J.K. Rowling", top=400, height=30),
+        line("Bloomsbury", top=500, height=55),      # tall, but far below
+    ])
+    assert info["title"] == "Harry Potter and the Philosopher's Stone"
+    assert info["author"] == "J.K. Rowling"
+
+
+def test_unconfident_lines_are_not_titles(extractor):
+    info = extractor.extract([
+        line("~~ smudge ~~", top=0, height=120, confidence=0.2),
+        line("Emma", top=150, height=60),
+    ])
+    assert info["title"] == "Emma"
+
+
+def test_one_line_fills_one_field(extractor):
+    info = extractor.extract([
+        line("by Way of Deception", top=0, height=90),   # the title, though it looks like an author line
+        line("by Victor Ostrovsky", top=200),
+        line("by Claire Hoy", top=230),                  # a second author rule match is not used
+        line("Translated by Nobody", top=260),
+    ])
+    assert info["title"] == "by Way of Deception"
+    assert info["author"] == "Victor Ostrovsky"
+    assert info["translator"] == "Nobody"
+    assert info["publisher"] == ""
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"^(?P<value>.+?)\s*訳$", True),
+    (r"^(?P<value>.+?)\s*[訳著]$", False),       # a class may hold other characters too
+    (r"translated\s+by\s+(?P<value>.+)$", False),
+    (r"^(?P<value>.+?)\s*\옮김$", True),
+])
+def test_needs_cjk(pattern, expected):
+    assert needs_cjk(pattern) is expected
+
+
+def test_ascii_lines_skip_cjk_rules(extractor):
+    rules = load_rules(DEFAULT_RULES_PATH)
+    ascii_groups = set(compile_rules(rules, ascii_only=True).groupindex)
+    all_groups = set(compile_rules(rules).groupindex)
+    skipped = {f"{field}__{n}" for field, patterns in rules.items() for n, p in enumerate(patterns) if needs_cjk(p)}
+    assert skipped and ascii_groups == all_groups - skipped
+
+    # Same answers either way for ASCII text; CJK lines still reach the CJK rules
+    for text in ("Translated by Jay Rubin", "by Frank Herbert", "Editions Gallimard", "Penguin"):
+        m = extractor.pattern.search(text)
+        assert extractor.match(text) == (m and (m.lastgroup.split("__")[0], m.group(m.lastgroup).strip()))
+    assert extractor.match("新潮社出版") == ("publisher", "新潮社")
@@ -0,0 +1,13 @@
+# tests/test_image_processing.py
+import cv2
+import numpy as np
+
+from utils.image_processing import preprocess
+
+
+def test_cover_is_cropped_before_downscaling():
+    # A 2000 px cover in a 4000 px frame: cropped first it keeps the full long edge
+    frame = np.full((3000, 4000, 3), 40, np.uint8)
+    cv2.rectangle(frame, (1000, 500), (3000, 2500), (230, 230, 230), -1)
+    assert max(preprocess(frame, "cover").shape[:2]) == 1600
+    assert preprocess(frame, "standard").shape[:2] == (1200, 1600)
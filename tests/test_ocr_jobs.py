@@ -0,0 +1,57 @@
+# tests/test_ocr_jobs.py
+import asyncio
+import time
+
+from app.services.ocr_executor import OCRTimeout
+from app.services.ocr_jobs import COMPLETED, OCRJobQueue, OCRJobStore
+
+
+class FakeExecutor:
+    """Answers each chunk at once; a chunk holding "slow.jpg" times out"""
+
+    def __init__(self):
+        self.chunks = []
+
+    async def submit(self, fn, ocr_pool, ocr_cache, images, target_language, timeout=None):
+        self.chunks.append([filename for filename, _ in images])
+        if any(filename == "slow.jpg" for filename, _ in images):
+            raise OCRTimeout("OCR took longer than 1s")
+        return [({"success": True, "book_info": {"title": filename}, "raw_text": []}, 0.01)
+                for filename, _ in images]
+
+
+async def run_job(queue, images):
+    await queue.start()
+    job_id = await queue.submit(images)
+    for _ in range(200):
+        job = await asyncio.to_thread(queue.store.get, job_id)
+        if job["status"] == COMPLETED:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+    return job_id
+
+
+def test_timed_out_chunk_fails_its_images_not_the_job(tmp_path):
+    store = OCRJobStore(str(tmp_path / "jobs.sqlite3"))
+    executor = FakeExecutor()
+    queue = OCRJobQueue(store, None, executor, chunk_size=2)
+    images = [(name, b"image") for name in ("a.jpg", "slow.jpg", "c.jpg", "d.jpg")]
+    job_id = asyncio.run(run_job(queue, images))
+
+    assert store.get(job_id)["status"] == COMPLETED
+    results = {item["filename"]: item["result"] for item in store.items(job_id)}
+    assert not results["a.jpg"]["success"] and "timed out" in results["slow.jpg"]["error"]
+    assert results["c.jpg"]["success"] and results["d.jpg"]["success"]
+    assert executor.chunks == [["a.jpg", "slow.jpg"], ["c.jpg", "d.jpg"]]
+
+
+def test_finished_jobs_are_purged_while_running(tmp_path):
+    store = OCRJobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = OCRJobQueue(store, None, FakeExecutor(), retention=0.05, purge_interval=0)
+    first = asyncio.run(run_job(queue, [("a.jpg", b"image")]))
+    time.sleep(0.1)
+    second = asyncio.run(run_job(queue, [("b.jpg", b"image")]))
+
+    assert store.get(first) is None
+    assert store.get(second) is not None
@@ -0,0 +1,35 @@
+# tests/test_ocr_languages.py
+import pytest
+
+from app.services.ocr_languages import classify_script, detect_languages, stopword_language
+
+
+@pytest.mark.parametrize("text", [
+    "Harry Potter y",                                   # a stray OCR letter
+    "Leonardo da Vinci Walter Isaacson",                # a name particle
+    "Die Hard",
+    "The Hobbit",                                       # one function word is not enough
+    "O Alquimista",
+])
+def test_particles_and_single_words_leave_it_to_langdetect(text):
+    assert stopword_language(text) is None
+
+
+@pytest.mark.parametrize("text, language", [
+    ("The Girl with the Dragon Tattoo", "en"),
+    ("Der Name der Rose, ein Roman von Umberto Eco", "de"),
+    ("Le Petit Prince, avec des aquarelles de l'auteur", "fr"),
+    ("Historia de los dos que soñaron", "es"),
+    ("Il nome della rosa, storia di un monaco", "it"),
+])
+def test_two_function_words_decide(text, language):
+    assert stopword_language(text) == language
+
+
+def test_detect_languages_uses_the_script_for_cjk():
+    assert detect_languages(["ノルウェイの森", "채식주의자", "红楼梦"]) == ["Japanese", "Korean", "Chinese"]
+    assert classify_script("Dune") == "latin"
+
+
+def test_a_stray_letter_does_not_make_a_cover_spanish():
+    assert detect_languages(["The Lord of the Rings y"]) != ["Spanish"]
@@ -0,0 +1,44 @@
+# tests/test_ocr_pool.py
+from app.services.ocr_pool import ReaderPool
+
+
+def test_reader_is_not_unloaded_between_warm_up_and_checkout():
+    pool = ReaderPool(("en",), size=1, service_factory=object)
+    pool.warm_up()
+    unloaded = []
+    warm_up = pool.warm_up
+
+    def warm_up_then_race():
+        warm_up()
+        # Another thread tries to free the pool right after the readers loaded
+        unloaded.append(pool.unload_if_idle())
+
+    pool.unload_if_idle()
+    pool.warm_up = warm_up_then_race
+    with pool.checkout(timeout=1) as service:
+        assert service is not None
+    assert unloaded == [False]
+    assert pool.ready
+
+
+def test_idle_pool_is_unloaded_and_reloaded_on_demand():
+    pool = ReaderPool(("en",), size=1, service_factory=object)
+    pool.warm_up()
+    assert pool.unload_if_idle() and not pool.ready
+    with pool.checkout(timeout=1):
+        assert pool.stats()["in_use"] == 1
+        assert not pool.unload_if_idle()
+    assert pool.ready and pool.stats()["queue_depth"] == 0
+
+
+def test_waiting_is_released_when_loading_fails():
+    def broken():
+        raise RuntimeError("model download failed")
+
+    pool = ReaderPool(("en",), size=1, service_factory=broken)
+    try:
+        with pool.checkout(timeout=1):
+            pass
+    except RuntimeError:
+        pass
+    assert pool.stats()["queue_depth"] == 0
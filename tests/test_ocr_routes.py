@@ -0,0 +1,44 @@
+# tests/test_ocr_routes.py
+import io
+import zipfile
+
+import cv2
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import ocr_routes
+
+PNG = cv2.imencode(".png", np.full((32, 24, 3), 255, dtype=np.uint8))[1].tobytes()
+
+
+async def fake_batch_ocr(request, ocr_pool, ocr_executor, images, target_language, ocr_cache, timer):
+    return [({"success": True, "book_info": {"title": filename}, "raw_text": []}, 0.01) for filename, _ in images]
+
+
+def ocr_app():
+    """Just the OCR routes (the shared app leaves them out when WEB_ONLY), with OCR faked"""
+    app = FastAPI()
+    app.include_router(ocr_routes.router, prefix="/ocr")
+    app.state.ocr_pool = app.state.ocr_executor = app.state.ocr_cache = app.state.ocr_jobs = None
+    return app
+
+
+def test_batch_items_follow_upload_order(monkeypatch):
+    monkeypatch.setattr(ocr_routes, "run_batch_ocr", fake_batch_ocr)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("d.png", b"not an image")
+        zf.writestr("e.png", PNG)
+    files = [
+        ("photos", ("a.png", PNG, "image/png")),
+        ("photos", ("b.jpg", b"plain text", "image/jpeg")),
+        ("photos", ("c.png", PNG, "image/png")),
+        ("archive", ("shelf.zip", archive.getvalue(), "application/zip")),
+    ]
+    with TestClient(ocr_app()) as client:
+        reply = client.post("/ocr/api/process-batch", files=files).json()
+
+    assert [item["filename"] for item in reply["items"]] == ["a.png", "b.jpg", "c.png", "d.png", "e.png"]
+    assert [item["result"]["success"] for item in reply["items"]] == [True, False, True, False, True]
+    assert reply["items"][2]["result"]["book_info"]["title"] == "c.png"
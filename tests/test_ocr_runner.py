@@ -0,0 +1,89 @@
+# tests/test_ocr_runner.py
+from contextlib import contextmanager
+
+from app.services import ocr_runner
+from app.services.field_extractor import FieldExtractor, load_rules, DEFAULT_RULES_PATH
+
+
+class Pool:
+    default_languages = ("en",)
+    profile = "standard"
+
+
+def test_cache_key_changes_with_min_confidence(monkeypatch):
+    before = ocr_runner.cache_config(Pool(), "en")
+    monkeypatch.setattr(ocr_runner, "OCR_MIN_CONFIDENCE", 0.5)
+    assert ocr_runner.cache_config(Pool(), "en") != before
+
+
+def test_cache_key_changes_with_field_rules(monkeypatch):
+    before = ocr_runner.cache_config(Pool(), "en")
+    rules = load_rules(DEFAULT_RULES_PATH)
+    rules["publisher"].append(r"^Imprint:\s*(?P<value>.+)$")
+    monkeypatch.setattr(ocr_runner, "get_extractor", lambda path=None: FieldExtractor(rules))
+    assert ocr_runner.cache_config(Pool(), "en") != before
+
+
+class AutoService:
+    """Reads every box as its language's sample text; build_result checks it is checked out"""
+
+    TEXT = {("en",): ("Xq7 lk", 0.2), ("ja", "en"): ("ノルウェイの森", 0.9),
+            ("ko", "en"): ("노르웨이", 0.3), ("ch_sim", "en"): ("挪威的森林", 0.4)}
+
+    def __init__(self, pool, languages):
+        self.pool, self.languages = pool, languages
+
+    def preprocess_image(self, img):
+        return img
+
+    def detect_regions(self, processed):
+        return [[0, 10, 0, 10], [0, 50, 0, 40], [0, 20, 0, 5], [0, 90, 0, 30]], []
+
+    def recognize_regions(self, processed, regions):
+        self.pool.recognized.append((self.languages, len(regions[0]) + len(regions[1])))
+        text, confidence = self.TEXT[self.languages]
+        return [(box, text, confidence) for box in regions[0] + regions[1]]
+
+    def filter_detections(self, results):
+        return [{"text": text, "confidence": confidence, "bbox": box} for box, text, confidence in results]
+
+    def build_result(self, detections):
+        assert self.pool.out == self.languages, "result built after the reader went back to the pool"
+        return {"success": True, "languages": self.languages, "raw_text": detections}
+
+
+class AutoPool(Pool):
+    def __init__(self):
+        self.recognized = []
+        self.out = None
+
+    @contextmanager
+    def checkout(self, languages=None, timeout=None):
+        self.out = languages or self.default_languages
+        try:
+            yield AutoService(self, self.out)
+        finally:
+            self.out = None
+
+
+def test_auto_classifies_on_a_sample_then_reads_once_with_the_winner(monkeypatch):
+    monkeypatch.setattr(ocr_runner, "OCR_AUTO_SAMPLE_BOXES", 2)
+    pool = AutoPool()
+    result = ocr_runner.process_auto(pool, "image")
+
+    assert result["languages"] == ("ja", "en")
+    assert pool.recognized == [(("en",), 4), (("ja", "en"), 2), (("ko", "en"), 2), (("ch_sim", "en"), 2),
+                               (("ja", "en"), 4)]
+
+
+def test_auto_keeps_confident_latin_text(monkeypatch):
+    monkeypatch.setitem(AutoService.TEXT, ("en",), ("Norwegian Wood", 0.9))
+    pool = AutoPool()
+    assert ocr_runner.process_auto(pool, "image")["languages"] == ("en",)
+    assert pool.recognized == [(("en",), 4)]
+
+
+def test_largest_regions_keeps_the_biggest_boxes():
+    horizontal = [[0, 10, 0, 10], [0, 50, 0, 40], [0, 20, 0, 5]]
+    free = [[[0, 0], [30, 0], [30, 30], [0, 30]]]
+    assert ocr_runner.largest_regions((horizontal, free), 2) == ([[0, 50, 0, 40]], free)
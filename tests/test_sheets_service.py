@@ -0,0 +1,186 @@
+# tests/test_sheets_service.py
+import threading
+import time
+
+import pytest
+
+from app.models.book import Book, BookCreate, BookUpdate
+from app.routes.book_routes import save_books, save_delete
+from app.services.sheets_service import COLUMNS, FakeSheetsBackend, RetryableError, SheetsSync, SheetsWAL, TokenBucket
+
+
+def make_book(book_id, title, **fields):
+    return Book(id=book_id, title=title, created_at="2024-01-01T00:00:00", updated_at="2024-01-01T00:00:00",
+                **fields)
+
+
+@pytest.fixture
+def wal_path(tmp_path):
+    return str(tmp_path / "sheets_wal.sqlite3")
+
+
+def test_one_process_flushes_at_a_time(wal_path):
+    # Worker processes share the log but each has its own SheetsSync
+    backend = FakeSheetsBackend()
+    syncs = [SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000) for _ in range(4)]
+    syncs[0].record_create(make_book("b1", "Dune"))
+    syncs[1].record_create(make_book("b2", "Emma"))
+
+    threads = [threading.Thread(target=sync.flush_all) for sync in syncs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [row[0] for row in backend.rows[1:]] == ["b1", "b2"]
+    assert sum(1 for sync in syncs if sync.stats()["requests"]) == 1
+    assert backend.calls == ["get_all_values", "append_rows"]
+
+
+def test_released_lease_passes_to_a_sibling(wal_path):
+    first, second = SheetsWAL(wal_path), SheetsWAL(wal_path)
+    assert first.acquire_lease("a", 60)
+    assert not second.acquire_lease("b", 60)
+    first.release_lease("a")
+    assert second.acquire_lease("b", 60)
+
+
+def test_expired_lease_is_taken_over(wal_path):
+    wal = SheetsWAL(wal_path)
+    assert wal.acquire_lease("a", -1)
+    assert wal.acquire_lease("b", 60)
+
+
+def sheet(backend):
+    """The fake sheet's rows as ``{book id: {column: cell}}``"""
+    header, *rows = backend.rows
+    return {row[0]: dict(zip(header, row)) for row in rows}
+
+
+def test_log_is_replayed_after_a_failed_flush(wal_path):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000, max_retries=0)
+    sync.record_creates([make_book("b1", "Dune"), make_book("b2", "Emma")])
+    backend.fail_next = 1
+    with pytest.raises(RetryableError):
+        sync.flush()
+    sync.wal.release_lease(sync.owner)  # as when the crashed process's lease expires
+    sync.wal.close()
+
+    # A restarted process finds the changes still logged
+    restarted = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    assert len(restarted.wal) == 2
+    restarted.flush_all()
+    assert sorted(sheet(backend)) == ["b1", "b2"]
+    assert len(restarted.wal) == 0
+
+
+def test_replay_after_a_crash_before_ack_writes_nothing_twice(wal_path, monkeypatch):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    sync.record_create(make_book("b1", "Dune"))
+
+    def crash(up_to_seq):
+        raise RuntimeError("killed before the log was acknowledged")
+
+    monkeypatch.setattr(sync.wal, "ack", crash)
+    with pytest.raises(RuntimeError):
+        sync.flush()
+    monkeypatch.undo()
+
+    # The sheet has the row already; the replay diffs to nothing
+    assert sync.flush() == {"entries": 1, "cells": 0, "rows": 0, "deleted": 0}
+    assert len(backend.rows) == 2
+
+
+def test_only_changed_cells_are_written(wal_path):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    sync.record_create(make_book("b1", "Dune", author="Frank Herbert"))
+    sync.flush_all()
+    backend.calls.clear()
+
+    sync.record_update("b1", BookUpdate(author="Frank Herbert", reading_status="read", personal_rating=5))
+    assert sync.flush() == {"entries": 1, "cells": 2, "rows": 0, "deleted": 0}  # author is unchanged
+    assert backend.calls == ["get_all_values", "batch_update"]
+    row = sheet(backend)["b1"]
+    assert (row["reading_status"], row["personal_rating"]) == ("read", "5")
+
+    backend.calls.clear()
+    sync.record_update("b1", BookUpdate(reading_status="read"))
+    assert sync.flush()["cells"] == 0
+    assert backend.calls == ["get_all_values"]
+
+
+def test_update_of_a_book_missing_from_the_sheet_appends_the_whole_row(wal_path):
+    backend = FakeSheetsBackend(rows=[COLUMNS])
+    stored = make_book("b1", "Dune", author="Frank Herbert", reading_status="read")
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000,
+                      book_lookup={"b1": stored}.get)
+    sync.record_update("b1", BookUpdate(reading_status="read"))
+    sync.record_update("gone", BookUpdate(reading_status="read"))
+    sync.flush_all()
+
+    rows = sheet(backend)
+    assert list(rows) == ["b1"]
+    assert (rows["b1"]["title"], rows["b1"]["author"]) == ("Dune", "Frank Herbert")
+    assert len(sync.wal) == 0
+
+
+def test_update_without_a_lookup_is_skipped_not_written_partially(wal_path):
+    backend = FakeSheetsBackend(rows=[COLUMNS])
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    sync.record_update("b1", BookUpdate(reading_status="read"))
+    sync.flush_all()
+    assert backend.rows == [COLUMNS]
+
+
+def test_deleted_books_lose_their_rows(wal_path):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    sync.record_creates([make_book("b1", "Dune"), make_book("b2", "Emma"), make_book("b3", "Ulysses")])
+    sync.flush_all()
+    backend.calls.clear()
+
+    sync.record_delete("b1")
+    sync.record_update("b3", BookUpdate(reading_status="read"))
+    sync.record_create(make_book("b4", "Beloved"))
+    sync.record_delete("b4")
+    assert sync.flush() == {"entries": 4, "cells": 1, "rows": 0, "deleted": 1}
+    assert backend.calls == ["get_all_values", "batch_update", "delete_rows"]
+    rows = sheet(backend)
+    assert list(rows) == ["b2", "b3"]
+    assert rows["b3"]["reading_status"] == "read"
+
+
+def test_deleting_a_stored_book_queues_its_row(wal_path, book_store):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=6000)
+    book, = save_books(book_store, sync, [BookCreate(title="Dune")])
+    assert save_delete(book_store, sync, book.id)
+    assert not save_delete(book_store, sync, book.id)
+    sync.flush_all()
+    assert backend.rows == [COLUMNS]
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # Two from the burst, four more at 20 per second
+    assert time.monotonic() - started >= 0.19
+
+
+def test_quota_errors_are_retried_within_the_rate(wal_path):
+    backend = FakeSheetsBackend()
+    sync = SheetsSync(backend, SheetsWAL(wal_path), requests_per_minute=600, burst=1,
+                      backoff_base=0.01, backoff_max=0.01)
+    sync.record_create(make_book("b1", "Dune"))
+    backend.fail_next = 2
+    started = time.monotonic()
+    sync.flush_all()
+    # get_all_values three times, append_rows once, 0.1 s apart after the first
+    assert sync.stats()["requests"] == 4 and sync.stats()["retries"] == 2
+    assert time.monotonic() - started >= 0.29
+    assert list(sheet(backend)) == ["b1"]
@@ -0,0 +1,49 @@
+# tests/test_shelf_stats.py
+import random
+
+from app.models.book import BookCreate, BookType, BookUpdate, FictionType, ReadingStatus
+from app.models.shelf import ShelfUpdate
+
+SHELVES = ["Shelf 1", "Shelf 2", "Hall", None]
+
+
+def random_fields(rng):
+    return {
+        "shelf_number": rng.choice(SHELVES),
+        "reading_status": rng.choice(list(ReadingStatus)),
+        "book_type": rng.choice(list(BookType)),
+        "fiction_type": rng.choice(list(FictionType)),
+        "on_shelf": rng.random() < 0.8,
+        "personal_rating": rng.choice([None, 1, 3, 5]),
+    }
+
+
+def test_incremental_counters_match_a_recount(book_store):
+    rng = random.Random(7)
+    books = book_store.bulk_insert([BookCreate(title=f"Book {i}", **random_fields(rng)) for i in range(200)])
+    ids = [book.id for book in books]
+
+    for step in range(600):
+        action = rng.random()
+        if action < 0.1:
+            ids.append(book_store.create(BookCreate(title=f"New {step}", **random_fields(rng))).id)
+        elif action < 0.6:
+            fields = random_fields(rng)
+            chosen = rng.sample(sorted(fields), rng.randint(1, 3))
+            book_store.update(rng.choice(ids), BookUpdate(**{name: fields[name] for name in chosen}))
+        elif action < 0.7:
+            book_store.update(rng.choice(ids), BookUpdate(title=f"Renamed {step}"))  # no counter changes
+        elif action < 0.85:
+            book_store.move_books(rng.sample(ids, 5), rng.choice(SHELVES[:3] + ["Attic"]))
+        elif ids:
+            book_store.delete(ids.pop(rng.randrange(len(ids))))
+
+    book_store.update_shelf("Hall", ShelfUpdate(name="Landing"))
+    book_store.delete_shelf("Attic", move_to="Shelf 2")
+    book_store.delete(ids.pop())
+    book_store.delete("no such book")
+
+    assert book_store.rebuild_shelf_stats(check_only=True) == {}
+    shelves, totals, _ = book_store.list_shelves()
+    assert totals.books == len(ids) == book_store.count()
+    assert "Landing" in [shelf.name for shelf in shelves] and "Attic" not in [shelf.name for shelf in shelves]
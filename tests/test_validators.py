@@ -0,0 +1,141 @@
+# tests/test_validators.py
+import asyncio
+import io
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
+
+from utils.validators import (
+    RequestSizeLimit, UploadRejected, check_image, read_image_upload, sniff_image, _jpeg_size, _tiff_size
+)
+
+
+def encode(ext, width=40, height=30, params=()):
+    pixels = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode(ext, pixels, list(params))[1].tobytes()
+
+
+@pytest.mark.parametrize("ext, fmt, params", [
+    (".png", "png", ()),
+    (".jpg", "jpeg", ()),
+    (".bmp", "bmp", ()),
+    (".tiff", "tiff", ()),
+    (".webp", "webp", (cv2.IMWRITE_WEBP_QUALITY, 80)),    # VP8
+    (".webp", "webp", (cv2.IMWRITE_WEBP_QUALITY, 101)),   # VP8L, lossless
+])
+def test_header_sizes(ext, fmt, params):
+    assert sniff_image(encode(ext, params=params)) == (fmt, (40, 30))
+
+
+def test_truncated_headers():
+    png = encode(".png")
+    # Not enough yet while streaming; a whole file that short is corrupt
+    assert check_image(png[:20], final=False) == ("png", None)
+    with pytest.raises(UploadRejected, match="Truncated"):
+        check_image(png[:20])
+    assert check_image(png[:3], final=False) is None
+
+    jpeg = encode(".jpg")
+    assert _jpeg_size(jpeg[:40]) is None
+    # A JPEG without its frame header is left for the decoder to judge
+    assert check_image(jpeg[:40]) == ("jpeg", None)
+
+
+def test_corrupt_headers_do_not_raise_struct_errors():
+    jpeg = bytearray(encode(".jpg"))
+    jpeg[2] = 0x00  # not at a marker
+    assert _jpeg_size(bytes(jpeg)) is None
+
+    tiff = bytearray(encode(".tiff"))
+    tiff[4:8] = (10 ** 6).to_bytes(4, "little")  # directory past the end of the data
+    assert _tiff_size(bytes(tiff)) is None
+    assert _tiff_size(b"II*\x00\x08\x00\x00\x00\xff\xff") is None  # entries cut off
+
+    webp = b"RIFF\x00\x00\x00\x00WEBPVP8 "
+    with pytest.raises(UploadRejected, match="Truncated"):
+        check_image(webp)
+    with pytest.raises(UploadRejected, match="dimensions"):
+        check_image(webp + bytes(16), max_pixels=10 ** 6)
+
+
+@pytest.mark.parametrize("ext", [".png", ".jpg"])
+def test_too_many_pixels(ext):
+    data = encode(ext, width=2000, height=1000)
+    check_image(data, max_pixels=2_000_000)
+    with pytest.raises(UploadRejected) as raised:
+        check_image(data, max_pixels=1_999_999)
+    assert raised.value.status_code == 413
+
+
+def test_zero_dimensions_are_rejected():
+    png = bytearray(encode(".png"))
+    png[16:20] = bytes(4)
+    with pytest.raises(UploadRejected, match="dimensions"):
+        check_image(bytes(png), max_pixels=10 ** 6)
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+def upload(data, filename):
+    return UploadFile(file=CountingFile(data), filename=filename)
+
+
+def test_non_image_with_an_image_extension():
+    with pytest.raises(UploadRejected) as raised:
+        asyncio.run(read_image_upload(upload(b"%PDF-1.7 " + bytes(100), "cover.jpg"), max_bytes=10 ** 6))
+    assert raised.value.status_code == 415
+
+
+def test_oversized_header_is_refused_after_one_chunk():
+    data = encode(".png", width=2000, height=1000) + bytes(10 ** 6)
+    photo = upload(data, "cover.png")
+    with pytest.raises(UploadRejected):
+        asyncio.run(read_image_upload(photo, max_bytes=None, max_pixels=10 ** 6, chunk_size=1024))
+    assert photo.file.reads == 1
+
+
+def test_upload_over_the_byte_limit():
+    photo = upload(encode(".png") + bytes(5000), "cover.png")
+    with pytest.raises(UploadRejected) as raised:
+        asyncio.run(read_image_upload(photo, max_bytes=4096, chunk_size=1024))
+    assert raised.value.status_code == 413
+
+
+def limited_client(max_bytes):
+    app = FastAPI()
+
+    @app.post("/ocr/echo")
+    async def echo(request: Request):
+        return {"received": len(await request.body())}
+
+    app.add_middleware(RequestSizeLimit, max_bytes=max_bytes, prefixes=("/ocr/",))
+    return TestClient(app)
+
+
+def chunks(count, size=1024):
+    for _ in range(count):
+        yield bytes(size)
+
+
+def test_request_size_limit():
+    client = limited_client(4096)
+    assert client.post("/ocr/echo", content=bytes(4096)).json() == {"received": 4096}
+    assert client.post("/ocr/echo", content=bytes(4097)).status_code == 413
+
+    # Chunked: no Content-Length, counted as it streams in
+    assert client.post("/ocr/echo", content=chunks(4)).json() == {"received": 4096}
+    response = client.post("/ocr/echo", content=chunks(8))
+    assert response.status_code == 413
+    assert "larger than" in response.json()["detail"]
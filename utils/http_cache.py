@@ -0,0 +1,340 @@
+# utils/http_cache.py
+"""HTTP caching and compression for the web UI and the JSON API
+
+Static files are linked through ``static_url("css/style.css")``, which adds
+a digest of the file's content to its name (``css/style.1a2b3c4d5e.css``).
+``CachedStaticFiles`` serves such names with a year-long immutable
+Cache-Control: the URL changes whenever the file does, so browsers never
+need to ask again. It also serves the ``.br`` / ``.gz`` files that
+``precompress`` writes next to each asset at build time, when the client
+accepts them.
+
+Rendered pages and API responses go through ``ConditionalGet``. It tags
+complete responses with an ETag of their body and answers a matching
+If-None-Match with 304. ``Compress`` then brotli- or gzip-encodes the
+responses worth it. Streamed bodies (exports, job events) are compressed
+chunk by chunk and never buffered.
+"""
+import gzip
+import hashlib
+import os
+import re
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+DIGEST_LENGTH = 10
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Media types worth compressing; images, archives and fonts already are
+COMPRESSIBLE = re.compile(r"^(text/(?!event-stream)|application/(json|javascript|xml|x-ndjson)|image/svg\+xml)")
+PRECOMPRESS_SUFFIXES = (".css", ".js", ".html", ".json", ".svg", ".txt", ".map")
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_HASHED = re.compile(rf"^(?P<stem>.+)\.(?P<digest>[0-9a-f]{{{DIGEST_LENGTH}}})(?P<suffix>\.[^./]+)$")
+
+
+def accepted_encodings(headers) -> set:
+    """Content codings the client accepts (q > 0) from its Accept-Encoding header"""
+    accepted = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(headers):
+    """``"br"``, ``"gzip"`` or None: the best coding both sides support"""
+    accepted = accepted_encodings(headers)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class StaticAssets:
+    """Content-hashed URLs for the files under ``directory``
+
+    Digests are cached by file size and modification time, so an edited
+    file gets a new URL without a restart. With ``hashed`` off, plain URLs
+    are returned.
+    """
+
+    def __init__(self, directory, prefix="/static", hashed=True):
+        self.directory = directory
+        self.prefix = prefix.rstrip("/")
+        self.hashed = hashed
+        self._digests = {}
+
+    def digest(self, path):
+        """Content digest of ``path`` (relative to the directory), or None if there is no such file"""
+        full_path = os.path.join(self.directory, path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._digests.get(path)
+        if cached is None or cached[0] != key:
+            with open(full_path, "rb") as file:
+                cached = key, hashlib.sha256(file.read()).hexdigest()[:DIGEST_LENGTH]
+            self._digests[path] = cached
+        return cached[1]
+
+    def url(self, path) -> str:
+        """URL of a static file; use from templates as ``static_url("js/camera.js")``"""
+        path = path.lstrip("/")
+        digest = self.digest(path) if self.hashed else None
+        if digest is None:
+            return f"{self.prefix}/{path}"
+        stem, suffix = os.path.splitext(path)
+        return f"{self.prefix}/{stem}.{digest}{suffix}"
+
+    def resolve(self, path):
+        """``(file path, immutable)`` for a requested path, hashed or not
+
+        A digest that no longer matches (a page cached from before a deploy)
+        still gets the current file, but without the immutable lifetime.
+        """
+        match = _HASHED.match(path)
+        if match is None:
+            return path, False
+        original = match["stem"] + match["suffix"]
+        digest = self.digest(original)
+        if digest is None:
+            return path, False  # a file whose own name looks hashed
+        return original, digest == match["digest"]
+
+
+assets = StaticAssets("static")
+static_url = assets.url
+
+
+class CachedStaticFiles(StaticFiles):
+    """``StaticFiles`` with content-hashed URLs and precompressed variants"""
+
+    def __init__(self, *args, assets: StaticAssets, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.assets = assets
+
+    async def get_response(self, path, scope):
+        path, immutable = self.assets.resolve(path)
+        response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+        return response
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Vary"] = "Accept-Encoding"
+        if not isinstance(response, FileResponse):
+            return response  # 304, answered from the headers of the plain file
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers)
+        for coding, extension in ENCODINGS.items():  # smallest first
+            if coding not in accepted:
+                continue
+            variant = str(full_path) + extension
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            if variant_stat.st_mtime < stat_result.st_mtime:
+                continue  # older than its source: left over from a previous build
+            variant_response = FileResponse(
+                variant, status_code=status_code, stat_result=variant_stat, method=scope["method"],
+                media_type=response.media_type,
+                headers={"Content-Encoding": coding, "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(variant_response.headers, request_headers):
+                return NotModifiedResponse(variant_response.headers)
+            return variant_response
+        return response
+
+
+def precompress(directory, min_size=256):
+    """Write ``.gz`` (and, with the brotli package, ``.br``) next to each compressible file
+
+    Run at build/deploy time; variants are only rewritten when their source
+    is newer, and stale ones whose source is gone are removed. Returns the
+    paths written.
+    """
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            base, suffix = os.path.splitext(path)
+            if suffix in ENCODINGS.values():
+                if not os.path.exists(base):
+                    os.remove(path)
+                continue
+            if not name.endswith(PRECOMPRESS_SUFFIXES) or os.path.getsize(path) < min_size:
+                continue
+            with open(path, "rb") as file:
+                data = file.read()
+            variants = {".gz": lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = lambda: brotli.compress(data, quality=11)
+            for extension, compress in variants.items():
+                target = path + extension
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                compressed = compress()
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, "wb") as file:
+                    file.write(compressed)
+                written.append(target)
+    return written
+
+
+class ConditionalGet:
+    """ASGI middleware: ETag and 304 Not Modified for complete GET responses
+
+    Responses that are streamed, not 200, or already carry an ETag (static
+    files) pass through untouched. The rest get a weak ETag of their body
+    and ``cache_control`` unless they set their own.
+    """
+
+    def __init__(self, app, cache_control="private, no-cache"):
+        self.app = app
+        self.cache_control = cache_control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start = None
+
+        async def tagged_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] != 200 or "etag" in headers:
+                    return await send(message)
+                start = message  # held until the body shows whether it is complete
+                return
+            if start is None or message["type"] != "http.response.body":
+                return await send(message)
+            held, start = start, None
+            headers = MutableHeaders(raw=held["headers"])
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = self.cache_control
+            if message.get("more_body", False):
+                # Streamed: no ETag without reading it all
+                await send(held)
+                return await send(message)
+            etag = 'W/"' + hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest() + '"'
+            headers["ETag"] = etag
+            if if_none_match and _etag_matches(if_none_match, etag):
+                not_modified = MutableHeaders()
+                for name in ("etag", "cache-control", "vary"):
+                    if name in headers:
+                        not_modified[name] = headers[name]
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+                return await send({"type": "http.response.body", "body": b""})
+            await send(held)
+            await send(message)
+
+        await self.app(scope, receive, tagged_send)
+
+
+def _etag_matches(if_none_match, etag) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class Compress:
+    """ASGI middleware: brotli or gzip response compression, negotiated per request
+
+    Skips small bodies, media types that don't shrink, responses already
+    encoded (precompressed static files) and Server-Sent Events. Streamed
+    bodies are flushed chunk by chunk so nothing waits for the end.
+    """
+
+    def __init__(self, app, minimum_size=500, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, coding):
+        """``(compress(chunk), finish())`` for one response"""
+        if coding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = choose_encoding(Headers(scope=scope))
+        if coding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compress = finish = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, compress, finish, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or not COMPRESSIBLE.match(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    return await send(message)
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                held, start = start, None
+                headers = MutableHeaders(raw=held["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(held)
+                    return await send(message)
+                compress, finish = self._compressor(coding)
+                headers["Content-Encoding"] = coding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compress(body) + finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(held)
+                    return await send({"type": "http.response.body", "body": body})
+                await send(held)
+            chunk = compress(body) if body else b""
+            if not more_body:
+                chunk += finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,178 @@
+# utils/image_processing.py
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def load_image(source):
+    """Decode an image into a BGR ndarray without touching the disk
+
+    Accepts raw bytes (bytes/bytearray/memoryview), a binary file-like object,
+    an already-decoded ndarray (returned as-is) or a filesystem path.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+
+    if isinstance(source, str):
+        img = cv2.imread(source)
+        if img is None:
+            raise ValueError(f"Could not read image: {source}")
+        return img
+
+    if hasattr(source, "read"):
+        source = source.read()
+
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        raise TypeError(f"Unsupported image source: {type(source).__name__}")
+
+    buffer = np.frombuffer(source, dtype=np.uint8)
+    img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if img is not None:
+        return img
+
+    # OpenCV can't decode some formats (e.g. GIF); fall back to PIL
+    try:
+        with Image.open(io.BytesIO(bytes(source))) as pil_img:
+            rgb = np.asarray(pil_img.convert("RGB"))
+    except Exception:
+        raise ValueError("Could not decode image: unsupported or corrupt file")
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+class PreprocessProfile:
+    """Named set of preprocessing steps applied before text detection
+
+    ``max_long_edge`` downscales (never upscales) so the longer side is at
+    most that many pixels; ``crop_cover`` looks for the book's outline and
+    warps it to a flat rectangle; ``blur_kernel`` (0 = off) and
+    ``threshold`` ("adaptive", "otsu" or None) run on the grayscale image.
+    ``min_confidence`` is the recognition confidence below which detected
+    text is dropped, since how much noise gets through depends on the steps.
+    """
+
+    def __init__(self, name, max_long_edge=None, crop_cover=False, grayscale=True,
+                 blur_kernel=0, threshold=None, threshold_block_size=11, threshold_c=2, min_confidence=0.3):
+        self.name = name
+        self.max_long_edge = max_long_edge
+        self.crop_cover = crop_cover
+        self.grayscale = grayscale
+        self.blur_kernel = blur_kernel
+        self.threshold = threshold
+        self.threshold_block_size = threshold_block_size
+        self.threshold_c = threshold_c
+        self.min_confidence = min_confidence
+
+    def __repr__(self):
+        return f"PreprocessProfile({self.name!r})"
+
+
+PROFILES = {
+    # The original pipeline: full resolution, blur + adaptive threshold
+    "legacy": PreprocessProfile("legacy", blur_kernel=5, threshold="adaptive"),
+    # Same steps on a phone photo scaled down to a size EasyOCR handles well
+    "standard": PreprocessProfile("standard", max_long_edge=1600, blur_kernel=5, threshold="adaptive"),
+    # Downscale + grayscale only; EasyOCR normalises contrast itself
+    "fast": PreprocessProfile("fast", max_long_edge=1280),
+    # Crop to the cover and undo perspective before downscaling
+    "cover": PreprocessProfile("cover", max_long_edge=1600, crop_cover=True),
+}
+
+
+def get_profile(profile) -> PreprocessProfile:
+    """Resolve a profile name (or pass a PreprocessProfile through)"""
+    if isinstance(profile, PreprocessProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown preprocessing profile: {profile} (choose from {', '.join(PROFILES)})")
+
+
+def downscale(img, max_long_edge):
+    """Shrink so the longer side is at most ``max_long_edge`` pixels"""
+    height, width = img.shape[:2]
+    long_edge = max(height, width)
+    if not max_long_edge or long_edge <= max_long_edge:
+        return img
+    scale = max_long_edge / long_edge
+    return cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def _order_corners(points):
+    """Order four points as top-left, top-right, bottom-right, bottom-left"""
+    points = points.reshape(4, 2).astype(np.float32)
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def find_cover_quad(img, min_area_ratio=0.25, detect_long_edge=500):
+    """Corners of the largest four-sided outline covering enough of the frame, or None"""
+    small = downscale(img, detect_long_edge)
+    scale = img.shape[0] / small.shape[0]
+    gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * gray.shape[0] * gray.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return _order_corners(approx) * scale
+    return None
+
+
+def crop_cover(img):
+    """Warp the detected cover to a flat rectangle; the input is returned if none is found"""
+    quad = find_cover_quad(img)
+    if quad is None:
+        return img
+    top_left, top_right, bottom_right, bottom_left = quad
+    width = int(max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left)))
+    height = int(max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right)))
+    if width < 10 or height < 10:
+        return img
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad, target)
+    return cv2.warpPerspective(img, matrix, (width, height))
+
+
+def preprocess(img, profile="standard"):
+    """Run a decoded BGR image through a preprocessing profile"""
+    profile = get_profile(profile)
+
+    # Crop first, so the cover rather than the whole frame gets the
+    # max_long_edge pixels (the outline is found on a small copy anyway),
+    # then shrink before every later step so they work on fewer pixels
+    if profile.crop_cover:
+        img = crop_cover(img)
+    img = downscale(img, profile.max_long_edge)
+
+    if profile.grayscale and img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if profile.blur_kernel:
+        img = cv2.GaussianBlur(img, (profile.blur_kernel, profile.blur_kernel), 0)
+
+    if profile.threshold and img.ndim == 2:
+        if profile.threshold == "adaptive":
+            img = cv2.adaptiveThreshold(
+                img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                profile.threshold_block_size, profile.threshold_c
+            )
+        elif profile.threshold == "otsu":
+            _, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        else:
+            raise ValueError(f"Unknown threshold method: {profile.threshold}")
+
+    return img
@@ -0,0 +1,225 @@
+# utils/validators.py
+"""Upload checks that run before any image is decoded
+
+Starlette spools each multipart file to a temporary file while it parses
+the form. ``read_image_upload`` then takes it back in chunks. It rejects
+the upload as soon as the size limit is crossed, or as soon as the first
+bytes show that it isn't an image or that its header declares too many
+pixels. OpenCV never sees such files. ``RequestSizeLimit`` caps the whole
+request body while it streams in, before the form is parsed at all.
+"""
+import struct
+
+from starlette.responses import JSONResponse
+
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "tiff", "webp"}
+
+CHUNK_SIZE = 256 * 1024
+HEADER_MAX = 256 * 1024  # bytes searched for the dimensions; JPEG metadata can push them back
+
+
+class UploadRejected(ValueError):
+    """An upload that fails validation; ``status_code`` is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _megabytes(size):
+    return f"{size / 2**20:.3g} MB"
+
+
+def allowed_file(filename: str) -> bool:
+    """Check if file extension is allowed"""
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def check_size(size, max_bytes):
+    if max_bytes is not None and size > max_bytes:
+        raise UploadRejected(f"Image is larger than {_megabytes(max_bytes)}", 413)
+
+
+def _jpeg_size(data):
+    offset = 2
+    while offset + 9 <= len(data):
+        if data[offset] != 0xFF:
+            return None  # not at a marker: corrupt, let the decoder decide
+        marker = data[offset + 1]
+        if marker == 0xFF:  # fill byte
+            offset += 1
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack_from(">HH", data, offset + 5)
+            return width, height
+        (length,) = struct.unpack_from(">H", data, offset + 2)
+        offset += 2 + length
+    return None
+
+
+def _tiff_size(data):
+    endian = "<" if data[:2] == b"II" else ">"
+    (ifd,) = struct.unpack_from(endian + "I", data, 4)
+    if ifd + 2 > len(data):
+        return None  # the directory is stored after the pixels
+    (count,) = struct.unpack_from(endian + "H", data, ifd)
+    size = {}
+    for entry in range(ifd + 2, min(ifd + 2 + 12 * count, len(data) - 11), 12):
+        tag, kind = struct.unpack_from(endian + "HH", data, entry)
+        if tag in (256, 257):  # ImageWidth, ImageLength
+            size[tag] = struct.unpack_from(endian + ("H" if kind == 3 else "I"), data, entry + 8)[0]
+    return (size[256], size[257]) if len(size) == 2 else None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        b0, b1, b2, b3 = data[21:25]
+        return 1 + (((b1 & 0x3F) << 8) | b0), 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+    if chunk == b"VP8X" and len(data) >= 30:
+        return 1 + int.from_bytes(data[24:27], "little"), 1 + int.from_bytes(data[27:30], "little")
+    return None
+
+
+def sniff_image(data):
+    """``(format, (width, height) or None)`` from the first bytes of a file, or None if not an image
+
+    The size is None while more of the file is needed to find it.
+    """
+    data = bytes(data[:HEADER_MAX])
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png", struct.unpack_from(">II", data, 16) if data[12:16] == b"IHDR" and len(data) >= 24 else None
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpeg", _jpeg_size(data)
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif", struct.unpack_from("<HH", data, 6) if len(data) >= 10 else None
+    if data.startswith(b"BM") and len(data) >= 26:
+        (header_size,) = struct.unpack_from("<I", data, 14)
+        if header_size == 12:
+            return "bmp", struct.unpack_from("<HH", data, 18)
+        width, height = struct.unpack_from("<ii", data, 18)
+        return "bmp", (abs(width), abs(height))
+    if data[:4] in (b"II*\x00", b"MM\x00*") and len(data) >= 8:
+        return "tiff", _tiff_size(data)
+    if data.startswith(b"RIFF") and data[8:12] == b"WEBP":
+        return "webp", _webp_size(data)
+    return None
+
+
+def check_image(data, max_bytes=None, max_pixels=None, final=True):
+    """Validate an image's size and header; returns ``sniff_image``'s ``(format, size)``
+
+    With ``final=False`` ``data`` is only the start of the file, and a
+    header that doesn't show the dimensions yet passes.
+    """
+    check_size(len(data), max_bytes)
+    if final and not len(data):
+        raise UploadRejected("Empty file")
+    sniffed = sniff_image(data)
+    if sniffed is None:
+        if not final and len(data) < 32:
+            return None  # too short to tell yet
+        raise UploadRejected("Not a supported image (PNG, JPG, GIF, BMP, TIFF, WEBP)", 415)
+    fmt, size = sniffed
+    if size is None and final and fmt in ("png", "gif", "bmp", "webp"):
+        # These always declare their size in the first few bytes
+        raise UploadRejected("Truncated or corrupt image")
+    if size is not None and max_pixels is not None:
+        width, height = size
+        if not width or not height:
+            raise UploadRejected(f"Invalid image dimensions {width}x{height}")
+        if width * height > max_pixels:
+            raise UploadRejected(
+                f"Image is {width}x{height}, more than {max_pixels // 1_000_000} megapixels", 413
+            )
+    return sniffed
+
+
+async def read_image_upload(upload, max_bytes, max_pixels=None, chunk_size=CHUNK_SIZE) -> bytes:
+    """Read an ``UploadFile`` that must be an image, rejecting it as early as possible
+
+    Raises ``UploadRejected`` for a disallowed extension, a declared size
+    over ``max_bytes``, leading bytes that aren't an image or a header over
+    ``max_pixels``. All of these are found before the whole file has been
+    read. Only the size is checked again as chunks arrive.
+    """
+    if not upload.filename or not allowed_file(upload.filename):
+        raise UploadRejected("Invalid file type", 415)
+    if upload.size is not None:
+        check_size(upload.size, max_bytes)
+
+    chunks, received = [], 0
+    header = b""  # grows until the header has been judged, then None
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        received += len(chunk)
+        check_size(received, max_bytes)
+        chunks.append(chunk)
+        if header is not None:
+            header += chunk
+            sniffed = check_image(header, max_pixels=max_pixels, final=False)
+            if sniffed is not None and (sniffed[1] is not None or len(header) >= HEADER_MAX):
+                header = None
+    if header is not None:
+        # The file ended before its header could be judged
+        check_image(header, max_pixels=max_pixels)
+    return b"".join(chunks)
+
+
+class RequestSizeLimit:
+    """ASGI middleware answering 413 to request bodies over ``max_bytes``
+
+    Only for paths under ``prefixes``. A declared Content-Length is refused
+    before anything is read; chunked bodies are counted as they stream in.
+    """
+
+    def __init__(self, app, max_bytes, prefixes=("/",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            return await self.app(scope, receive, send)
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(scope, receive, send)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadRejected("Request body too large", 413)
+            return message
+
+        async def guarded_send(message):
+            # The form parser turns the error into a 400; answer 413 instead
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadRejected:
+            if not exceeded:
+                raise
+        if exceeded:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            {"detail": f"Request body is larger than {_megabytes(self.max_bytes)}"}, status_code=413,
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)